@@ -0,0 +1,249 @@
+import bisect
+import datetime
+from collections import Counter
+
+from amz_scheduler import ALL, DAY, parse_timestamp
+
+OVERDUE_AFTER = DAY  # a card this long past its due time is overdue, not just due
+
+
+def day_number(when):
+    # Local calendar day of a timestamp, as consecutive integers
+    return datetime.date.fromtimestamp(when).toordinal()
+
+
+class ProgressAnalytics:
+    # Practice rollups kept current one review at a time: reviews per day,
+    # grade counts, recording count and length, streaks, and per-LP question
+    # coverage, review counts and recency. Due times are kept in one sorted
+    # list per LP (plus one over all cards), so due, overdue and new counts
+    # are a bisect. Every read is independent of the size of the history.
+    # Per-LP figures follow the question's current LPs: editing or deleting a
+    # question moves its reviews, so they match a fresh load of the log.
+    def __init__(self, leadership_principles):
+        self.leadership_principles = list(leadership_principles)
+        self.question_lps = {}  # question id -> LPs
+        self.due = {}  # question id -> due time (0.0 for never-practiced cards)
+        self.due_times = {lp: [] for lp in [ALL] + self.leadership_principles}
+        self.reviewed = set()  # current question ids with at least one review
+        self.question_reviews = Counter()  # question id -> reviews, deleted questions included
+        self.question_last = {}  # question id -> time of its latest review
+        self.lp_questions = Counter()
+        self.lp_practiced = Counter()  # LP -> reviewed questions
+        self.lp_reviews = Counter()
+        self.lp_last = {}  # LP -> time of its latest review
+        self.stale_lps = set()  # LPs whose lp_last went with a deleted question
+        self.daily = Counter()  # day number -> reviews
+        self.grades = Counter()
+        self.reviews = 0
+        self.recordings = 0
+        self.recorded_seconds = 0.0
+        self.last_review = None
+        self.last_day = None  # latest day with a review
+        self.streak = 0  # consecutive days ending at last_day
+        self.longest_streak = 0
+
+    def load(self, cards, events):
+        # Bulk build from the scheduler's cards (already replayed) and the
+        # practice log; the due lists are sorted once instead of per card
+        for card in cards:
+            self.question_lps[card.question_id] = card.lps
+            self.due[card.question_id] = card.due
+            self.due_times[ALL].append(card.due)
+            for lp in self.lp_list(card.lps):
+                self.lp_questions[lp] += 1
+                self.due_times[lp].append(card.due)
+        for times in self.due_times.values():
+            times.sort()
+        for event in events:
+            self.record(event)
+
+    def lp_list(self, lps):
+        return [lp for lp in lps if lp in self.due_times and lp != ALL]
+
+    # ----------------------- Updates -----------------------
+    def add_question(self, question_id, lps, due):
+        # New question, or an edit that may have changed its LPs
+        self.remove_question(question_id)
+        lps = tuple(lps)
+        self.question_lps[question_id] = lps
+        self.due[question_id] = due
+        bisect.insort(self.due_times[ALL], due)
+        last = self.question_last.get(question_id)
+        for lp in self.lp_list(lps):
+            self.lp_questions[lp] += 1
+            bisect.insort(self.due_times[lp], due)
+            self.lp_reviews[lp] += self.question_reviews[question_id]
+            if last is not None and last >= self.lp_last.get(lp, 0.0):
+                self.lp_last[lp] = last
+                self.stale_lps.discard(lp)
+        if self.question_reviews[question_id]:
+            self.mark_reviewed(question_id)
+
+    def remove_question(self, question_id):
+        lps = self.question_lps.pop(question_id, None)
+        if lps is None:
+            return
+        due = self.due.pop(question_id)
+        self.unsort(ALL, due)
+        last = self.question_last.get(question_id)
+        for lp in self.lp_list(lps):
+            self.lp_questions[lp] -= 1
+            self.unsort(lp, due)
+            if question_id in self.reviewed:
+                self.lp_practiced[lp] -= 1
+            self.lp_reviews[lp] -= self.question_reviews[question_id]
+            if last is not None and self.lp_last.get(lp) == last:
+                self.stale_lps.add(lp)
+        self.reviewed.discard(question_id)
+
+    def unsort(self, lp, due):
+        times = self.due_times[lp]
+        del times[bisect.bisect_left(times, due)]
+
+    def set_due(self, question_id, due):
+        old = self.due.get(question_id)
+        if old is None or old == due:
+            return
+        self.due[question_id] = due
+        for lp in [ALL] + self.lp_list(self.question_lps[question_id]):
+            self.unsort(lp, old)
+            bisect.insort(self.due_times[lp], due)
+
+    def mark_reviewed(self, question_id):
+        if question_id in self.reviewed or question_id not in self.question_lps:
+            return
+        self.reviewed.add(question_id)
+        for lp in self.lp_list(self.question_lps[question_id]):
+            self.lp_practiced[lp] += 1
+
+    def record(self, event, due=None):
+        # One practice event; `due` is the card's new due time, if rescheduled
+        try:
+            when = parse_timestamp(event['timestamp'])
+        except (TypeError, ValueError):
+            return
+        question_id = event['question_id']
+        self.reviews += 1
+        self.grades[event.get('grade')] += 1
+        if event.get('duration'):
+            self.recordings += 1
+            self.recorded_seconds += event['duration']
+        if self.last_review is None or when > self.last_review:
+            self.last_review = when
+        self.question_reviews[question_id] += 1
+        if when > self.question_last.get(question_id, 0.0):
+            self.question_last[question_id] = when
+        for lp in self.lp_list(self.question_lps.get(question_id, ())):
+            self.lp_reviews[lp] += 1
+            if when > self.lp_last.get(lp, 0.0):
+                self.lp_last[lp] = when
+        self.mark_reviewed(question_id)
+        if due is not None:
+            self.set_due(question_id, due)
+        self.count_day(day_number(when))
+
+    def count_day(self, day):
+        self.daily[day] += 1
+        if self.daily[day] > 1:
+            return
+        if self.last_day is None or day > self.last_day + 1:
+            self.streak = 1
+            self.last_day = day
+        elif day == self.last_day + 1:
+            self.streak += 1
+            self.last_day = day
+        else:
+            # A new day before the latest one (clock change or an imported
+            # log): the only case that rescans, once per distinct day
+            self.recount_streaks()
+        self.longest_streak = max(self.longest_streak, self.streak)
+
+    def recount_lp_last(self, lp):
+        # Rare: the LP's most recent review belonged to a question that was
+        # deleted or moved to other LPs
+        times = [self.question_last[qid] for qid, lps in self.question_lps.items()
+                 if lp in lps and qid in self.question_last]
+        if times:
+            self.lp_last[lp] = max(times)
+        else:
+            self.lp_last.pop(lp, None)
+        self.stale_lps.discard(lp)
+
+    def recount_streaks(self):
+        run = longest = 0
+        previous = None
+        for day in sorted(self.daily):
+            run = run + 1 if previous is not None and day == previous + 1 else 1
+            longest = max(longest, run)
+            previous = day
+        self.last_day = previous
+        self.streak = run
+        self.longest_streak = longest
+
+    # ----------------------- Reads -----------------------
+    def due_count(self, now=None, lp=ALL):
+        # Cards due by `now`, never-practiced ones included (Scheduler.due_count)
+        now = datetime.datetime.now().timestamp() if now is None else now
+        return bisect.bisect_right(self.due_times.get(lp, []), now)
+
+    def due_counts(self, now, lp=ALL):
+        # (due, overdue, new): reviewed cards due by now, those due more than
+        # OVERDUE_AFTER ago, and cards never practiced
+        times = self.due_times.get(lp, [])
+        new = bisect.bisect_right(times, 0.0)
+        due = bisect.bisect_right(times, now) - new
+        overdue = bisect.bisect_right(times, now - OVERDUE_AFTER) - new
+        return due, overdue, new
+
+    def current_streak(self, now):
+        # A streak is still alive until a whole day passes without a review
+        if self.last_day is None or day_number(now) - self.last_day > 1:
+            return 0
+        return self.streak
+
+    def summary(self, now=None):
+        now = datetime.datetime.now().timestamp() if now is None else now
+        due, overdue, new = self.due_counts(now)
+        questions = len(self.question_lps)
+        return {
+            'questions': questions,
+            'practiced_questions': len(self.reviewed),
+            'coverage': round(len(self.reviewed) / questions, 3) if questions else 0.0,
+            'reviews': self.reviews,
+            'reviews_today': self.daily.get(day_number(now), 0),
+            'due_now': due,
+            'overdue': overdue,
+            'new': new,
+            'current_streak': self.current_streak(now),
+            'longest_streak': self.longest_streak,
+            'recordings': self.recordings,
+            'average_recording': round(self.recorded_seconds / self.recordings, 1) if self.recordings else None,
+            'last_review': self.last_review,
+            'grades': {str(grade): count for grade, count in self.grades.items()},
+        }
+
+    def lp_summary(self, lp, now=None):
+        now = datetime.datetime.now().timestamp() if now is None else now
+        due, overdue, new = self.due_counts(now, lp)
+        questions = self.lp_questions[lp]
+        if lp in self.stale_lps:
+            self.recount_lp_last(lp)
+        last = self.lp_last.get(lp)
+        return {
+            'questions': questions,
+            'practiced_questions': self.lp_practiced[lp],
+            'coverage': round(self.lp_practiced[lp] / questions, 3) if questions else 0.0,
+            'reviews': self.lp_reviews[lp],
+            'last_review': last,
+            'days_since_review': day_number(now) - day_number(last) if last is not None else None,
+            'due_now': due,
+            'overdue': overdue,
+            'new': new,
+        }
+
+    def reviews_per_day(self, days=14, now=None):
+        # [(date, reviews)] for the last `days` days, oldest first
+        now = datetime.datetime.now().timestamp() if now is None else now
+        today = day_number(now)
+        return [(datetime.date.fromordinal(day), self.daily.get(day, 0)) for day in range(today - days + 1, today + 1)]
@@ -0,0 +1,499 @@
+import array
+import collections
+import datetime
+import json
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+
+CHUNK_FRAMES = 1024
+SAMPLE_RATE = 44100
+SAMPLE_WIDTH = 2  # 16-bit PCM
+CHANNELS = 1
+
+pyaudio = None
+
+
+def load_pyaudio():
+    # PortAudio is only needed once the user records or plays something
+    global pyaudio
+    if pyaudio is None:
+        import pyaudio as module
+        pyaudio = module
+    return pyaudio
+
+
+def wav_header(data_size, channels, sample_width, rate, audio_format=1):
+    # 44-byte RIFF/WAVE header; audio_format 1 is PCM, 7 is mu-law
+    block_align = channels * sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', 36 + data_size + data_size % 2, b'WAVE',
+                       b'fmt ', 16, audio_format, channels, rate, rate * block_align, block_align, sample_width * 8,
+                       b'data', data_size)
+
+
+class StreamingWavWriter:
+    # Writes audio chunks to a WAV file as they arrive. The capture thread
+    # hands chunks to write(), which only enqueues them in a bounded buffer;
+    # a writer thread appends them to disk. The header is written with zero
+    # sizes up front, patched every patch_interval seconds so a crash still
+    # leaves a playable file, and patched for the last time on close().
+    # Memory use is bounded by buffer_chunks regardless of duration.
+    def __init__(self, path, channels=CHANNELS, sample_width=SAMPLE_WIDTH, rate=SAMPLE_RATE,
+                 buffer_chunks=64, patch_interval=1.0, audio_format=1):
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.audio_format = audio_format
+        self.patch_interval = patch_interval
+        self.buffer = queue.Queue(maxsize=buffer_chunks)
+        self.data_size = 0
+        self.dropped_chunks = 0
+        self.error = None
+        self.closed = False
+        self.encoder = None  # optional bytes -> bytes applied on the writer thread
+        self.listeners = []  # called with each raw chunk on the writer thread
+
+        self.file = open(path, 'wb')
+        self.file.write(wav_header(0, channels, sample_width, rate, audio_format))
+        self.thread = threading.Thread(target=self.run, name="wav-writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def frames(self):
+        return self.data_size // (self.channels * self.sample_width)
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    def write(self, chunk, timeout=1.0):
+        # Blocks briefly if the disk falls behind; a chunk that still does not
+        # fit is dropped and counted rather than stalling the audio input.
+        try:
+            self.buffer.put(chunk, timeout=timeout)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def run(self):
+        last_patch = time.monotonic()
+        while True:
+            chunk = self.buffer.get()
+            if chunk is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                data = self.encoder(chunk) if self.encoder else chunk
+                self.file.write(data)
+                self.data_size += len(data)
+                for listener in self.listeners:
+                    listener(chunk)
+                if time.monotonic() - last_patch >= self.patch_interval:
+                    self.patch_header()
+                    last_patch = time.monotonic()
+            except Exception as e:
+                self.error = e
+
+    def patch_header(self):
+        self.file.flush()
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(wav_header(self.data_size, self.channels, self.sample_width, self.rate, self.audio_format))
+        self.file.seek(position)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.buffer.put(None)
+        self.thread.join()
+        try:
+            if self.data_size % 2:
+                self.file.write(b'\0')  # RIFF chunks are word aligned
+            self.patch_header()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+        if self.error is not None:
+            raise self.error
+
+
+# ----------------------- Encodings -----------------------
+MULAW_BIAS = 0x84
+_mulaw_encode_table = None
+_mulaw_decode_table = None
+
+
+def linear_to_mulaw(sample):
+    # G.711 mu-law for one signed 16-bit sample (14-bit magnitude, as in
+    # the reference g711.c)
+    pcm = sample >> 2
+    if pcm < 0:
+        pcm, mask = -pcm, 0x7F
+    else:
+        mask = 0xFF
+    pcm = min(pcm, 8159) + (MULAW_BIAS >> 2)
+    segment = max(pcm.bit_length() - 6, 0)
+    if segment >= 8:
+        return 0x7F ^ mask
+    return ((segment << 4) | ((pcm >> (segment + 1)) & 0x0F)) ^ mask
+
+
+def mulaw_to_linear(value):
+    value = ~value & 0xFF
+    exponent = (value >> 4) & 0x07
+    sample = ((((value & 0x0F) << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return -sample if value & 0x80 else sample
+
+
+def _pcm16_samples(data, typecode):
+    samples = array.array(typecode)
+    samples.frombytes(data[:len(data) - len(data) % 2])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def encode_mulaw(data):
+    # Lookup through a 64K table indexed by the raw 16-bit sample
+    global _mulaw_encode_table
+    if _mulaw_encode_table is None:
+        _mulaw_encode_table = bytes(linear_to_mulaw(v - 65536 if v >= 32768 else v) for v in range(65536))
+    return bytes(map(_mulaw_encode_table.__getitem__, _pcm16_samples(data, 'H')))
+
+
+def decode_mulaw(data):
+    global _mulaw_decode_table
+    if _mulaw_decode_table is None:
+        _mulaw_decode_table = [mulaw_to_linear(v) for v in range(256)]
+    samples = array.array('h', map(_mulaw_decode_table.__getitem__, data))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
+
+
+# Encoding name -> (bytes per sample, WAV format tag, chunk encoder)
+ENCODINGS = {
+    'pcm16': (2, 1, None),
+    'mulaw': (1, 7, encode_mulaw),
+}
+
+
+def read_wav_header(f):
+    # Minimal RIFF parser (the wave module rejects mu-law). Returns
+    # (channels, rate, sample_width, audio_format, data_size) with f
+    # positioned at the start of the sample data.
+    riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        raise ValueError("not a WAV file")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', f.read(16))
+            f.seek(size - 16 + size % 2, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data before format chunk")
+            audio_format, channels, rate, _, _, bits = fmt
+            return channels, rate, bits // 8, audio_format, size
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def iter_pcm_chunks(path, frames=CHUNK_FRAMES):
+    # Yields (channels, rate) first, then chunks of 16-bit PCM, decoding
+    # mu-law recordings on the fly
+    with open(path, 'rb') as f:
+        channels, rate, sample_width, audio_format, size = read_wav_header(f)
+        yield channels, rate
+        remaining = size
+        while remaining > 0:
+            data = f.read(min(remaining, frames * channels * sample_width))
+            if not data:
+                break
+            remaining -= len(data)
+            yield decode_mulaw(data) if audio_format == 7 else data
+
+
+# ----------------------- Recording Archive -----------------------
+class RecordingArchive:
+    # One WAV file per practice attempt under recordings/<question id>/,
+    # captured at a configurable sample rate and optionally mu-law encoded
+    # (half the size of 16-bit PCM). recordings/index.jsonl gets one line per
+    # finished attempt and is loaded into a question id -> attempts dict, so
+    # listing a card's attempts never touches the directory tree.
+    def __init__(self, directory="recordings", sample_rate=16000, encoding='pcm16', analyzer=None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown audio encoding: {encoding}")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        # Optional rate -> object with feed(chunk)/result() (or None); it sees
+        # the raw chunks on the writer thread and its result is stored as 'speech'
+        self.analyzer = analyzer
+        self.by_question = None  # loaded on first use
+        self.lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "index.jsonl")
+
+    def load_index(self):
+        with self.lock:
+            if self.by_question is not None:
+                return
+            by_question = {}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        by_question.setdefault(entry['question_id'], []).append(entry)
+            self.by_question = by_question
+
+    def attempts(self, question_id):
+        # Oldest first
+        self.load_index()
+        return self.by_question.get(question_id, [])
+
+    def start(self, question_id, timestamp=None):
+        # Returns a writer for a new attempt; pass it to finish() once closed
+        timestamp = timestamp or datetime.datetime.now()
+        folder = os.path.join(self.directory, re.sub(r'[^\w.-]', '_', str(question_id)))
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, timestamp.strftime("%Y%m%d-%H%M%S-%f") + ".wav")
+        sample_width, audio_format, encoder = ENCODINGS[self.encoding]
+        writer = StreamingWavWriter(path, CHANNELS, sample_width, self.sample_rate, audio_format=audio_format)
+        writer.encoder = encoder
+        writer.question_id = question_id
+        writer.started = timestamp
+        writer.analyzer = self.analyzer(self.sample_rate) if self.analyzer is not None else None
+        if writer.analyzer is not None:
+            writer.listeners.append(writer.analyzer.feed)
+        return writer
+
+    def finish(self, writer):
+        self.load_index()
+        entry = {
+            'question_id': writer.question_id,
+            'timestamp': writer.started.strftime("%Y-%m-%d %H:%M:%S"),
+            'path': writer.path,
+            'duration': round(writer.duration, 2),
+            'sample_rate': writer.rate,
+            'encoding': self.encoding,
+            'size': writer.data_size,
+        }
+        if writer.analyzer is not None:
+            entry['speech'] = writer.analyzer.result()
+        with self.lock:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.by_question.setdefault(entry['question_id'], []).append(entry)
+        return entry
+
+
+# ----------------------- Audio Engine -----------------------
+class AudioEngine:
+    # Owns PortAudio for the life of the app. One PyAudio instance is created
+    # on first use (warm_up() does it ahead of time, off the UI thread) and
+    # the input stream is then kept open in callback mode, so starting a
+    # recording only flips a flag: capture begins with the next buffer
+    # (frames_per_buffer / rate, 16 ms by default at 16 kHz), and the last
+    # `preroll` seconds before the click are kept too so the first syllable
+    # is never clipped. Everything else (archive files, playback) runs on the
+    # engine's own worker thread; results and errors come back through
+    # poll_events(), which the UI calls from its event loop.
+    def __init__(self, archive, frames_per_buffer=256, preroll=0.25):
+        self.archive = archive
+        self.frames_per_buffer = frames_per_buffer
+        buffers = max(1, int(preroll * archive.sample_rate / frames_per_buffer))
+        self.preroll = collections.deque(maxlen=buffers)
+        self.commands = queue.Queue()
+        self.events = queue.Queue()  # (kind, payload): 'recorded' entry, 'error' message
+        self.pa = None
+        self.input_stream = None
+        self.output_stream = None
+        self.writer = None
+        self.recording = False
+        self.pending = 0  # commands queued but not yet handled
+        self.idle = threading.Condition()
+        self.start_latency = None  # seconds from start_recording() to the first live buffer
+        self.requested_at = None
+        self.thread = threading.Thread(target=self.run, name="audio-engine", daemon=True)
+        self.thread.start()
+
+    # --- UI thread ---
+    def send(self, *command):
+        with self.idle:
+            self.pending += 1
+        self.commands.put(command)
+
+    def warm_up(self):
+        self.send('open')
+
+    def start_recording(self, question_id):
+        # The command goes first so live buffers queued after the flag flips
+        # always follow it
+        self.requested_at = time.perf_counter()
+        self.send('record', question_id)
+        self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+        self.send('stop')
+
+    def play(self, path):
+        self.send('play', path)
+
+    def stop_playback(self):
+        self.send('stop_playback')
+
+    def poll_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def wait_idle(self, timeout=None):
+        # Until every command sent so far (e.g. finishing a recording) is done
+        with self.idle:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self):
+        self.recording = False
+        self.send('close')
+        self.thread.join()
+
+    # --- PortAudio callback thread ---
+    def on_input(self, in_data, frame_count, time_info, status):
+        if self.recording:
+            self.commands.put(('chunk', in_data))
+        else:
+            self.preroll.append(in_data)
+        return (None, pyaudio.paContinue)
+
+    # --- engine thread ---
+    def run(self):
+        while True:
+            command = self.commands.get()
+            name = command[0]
+            if name == 'chunk':
+                if self.writer is not None:
+                    if self.start_latency is None:
+                        self.start_latency = time.perf_counter() - self.requested_at
+                    self.writer.write(command[1])
+                continue
+            try:
+                getattr(self, 'handle_' + name)(*command[1:])
+            except Exception as e:
+                self.events.put(('error', str(e)))
+            finally:
+                with self.idle:
+                    self.pending -= 1
+                    self.idle.notify_all()
+            if name == 'close':
+                return
+
+    def ensure_input(self):
+        if self.pa is None:
+            try:
+                load_pyaudio()
+            except ImportError as e:
+                raise RuntimeError(f"Audio is unavailable: {str(e)}")
+            self.pa = pyaudio.PyAudio()
+        if self.input_stream is None:
+            try:
+                self.input_stream = self.pa.open(format=pyaudio.paInt16, channels=CHANNELS, rate=self.archive.sample_rate,
+                                                 input=True, frames_per_buffer=self.frames_per_buffer,
+                                                 stream_callback=self.on_input)
+                self.input_stream.start_stream()
+            except Exception as e:
+                self.input_stream = None
+                raise RuntimeError(f"Failed to access microphone: {str(e)}")
+
+    def handle_open(self):
+        # A failure here is reported when the user actually records
+        try:
+            self.ensure_input()
+        except Exception:
+            pass
+
+    def handle_record(self, question_id):
+        try:
+            self.ensure_input()
+        except Exception:
+            self.recording = False
+            raise
+        self.finish_recording()
+        self.start_latency = None
+        self.writer = self.archive.start(question_id)
+        while self.preroll:
+            self.writer.write(self.preroll.popleft())
+
+    def handle_stop(self):
+        self.finish_recording()
+
+    def finish_recording(self):
+        writer, self.writer = self.writer, None
+        if writer is None:
+            return
+        writer.close()
+        self.events.put(('recorded', self.archive.finish(writer)))
+
+    def handle_play(self, path):
+        self.handle_stop_playback()
+        if self.pa is None:
+            load_pyaudio()
+            self.pa = pyaudio.PyAudio()
+        # Archive files may be mu-law; chunks come back as 16-bit PCM
+        chunks = iter_pcm_chunks(path)
+        channels, rate = next(chunks)
+        frame_bytes = channels * SAMPLE_WIDTH
+
+        def on_output(in_data, frame_count, time_info, status):
+            data = next(chunks, b'')
+            if len(data) < frame_count * frame_bytes:
+                return (data + b'\0' * (frame_count * frame_bytes - len(data)), pyaudio.paComplete)
+            return (data, pyaudio.paContinue)
+
+        try:
+            self.output_stream = self.pa.open(format=self.pa.get_format_from_width(SAMPLE_WIDTH), channels=channels,
+                                              rate=rate, output=True, frames_per_buffer=CHUNK_FRAMES,
+                                              stream_callback=on_output)
+            self.output_stream.start_stream()
+        except Exception as e:
+            self.output_stream = None
+            raise RuntimeError(f"Failed to play audio: {str(e)}")
+
+    def handle_stop_playback(self):
+        stream, self.output_stream = self.output_stream, None
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+
+    def handle_close(self):
+        # Drain buffers still queued behind this command's predecessors
+        self.finish_recording()
+        self.handle_stop_playback()
+        if self.input_stream is not None:
+            self.input_stream.stop_stream()
+            self.input_stream.close()
+            self.input_stream = None
+        if self.pa is not None:
+            self.pa.terminate()
+            self.pa = None
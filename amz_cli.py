@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+
+from amz_storage import STORES, open_storage
+from amz_core import InterviewPrepCore, LoadError
+from amz_transfer import FORMATS, detect_format, read_records, write_records
+from amz_instrument import Instrumentation, instrument_core
+from amz_scheduler import ALL, TIMESTAMP_FORMAT
+from amz_speech import analyze_wav, available as speech_available
+from amz_duplicates import DEFAULT_THRESHOLD, group_pairs
+from amz_server import BankServer, DEFAULT_HOST, DEFAULT_PORT
+
+# Batch jobs on the headless core. Nothing here (or in amz_core) imports
+# tkinter, so these run on machines without a display:
+#   python amz_cli.py stats
+#   python amz_cli.py due -n 10 --lp "Dive Deep"
+#   python amz_cli.py export questions team_bank.jsonl
+#   python amz_cli.py import team_bank.csv --on-duplicate update
+#   python amz_cli.py validate
+#   python amz_cli.py analyze recordings/*/*.wav
+#   python amz_cli.py duplicates --threshold 0.75
+#   python amz_cli.py serve --port 8765
+#   python amz_cli.py --server http://127.0.0.1:8765 stats
+
+
+def write_json(data, path):
+    if path == '-':
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_data(core):
+    for error in core.load_all():
+        print(f"Error: {error}", file=sys.stderr)
+
+
+def cmd_export(core, args):
+    if args.store == 'questions' and args.file != '-':
+        # Streamed straight from storage; only the experiences are loaded,
+        # to write their titles in place of ids
+        core.load_experiences()
+        count = write_records(map(core.portable_question, core.storage.iter_records('questions')),
+                              args.file, args.format)
+        print(f"Exported {count} questions", file=sys.stderr)
+        return 0
+    if args.format not in (None, 'json'):
+        print("Error: only questions can be exported as JSONL or CSV", file=sys.stderr)
+        return 1
+    load_data(core)
+    data = {
+        'questions': list(core.questions),
+        'experiences': core.experiences,
+        'lp_matrix_data': core.lp_matrix.cells,
+        'interview_framework': core.interview_framework,
+        'practice_events': core.practice_events,
+    }[args.store]
+    write_json(data, args.file)
+    print(f"Exported {len(data)} {args.store} records", file=sys.stderr)
+    return 0
+
+
+def cmd_import(core, args):
+    # The question bank for deduplication, and the experiences to resolve
+    # the titles records cite them by
+    core.load_experiences()
+    core.load_questions()
+
+    def progress(stats):
+        print(f"\r{stats['read']} read, {stats['added']} added, {stats['updated']} updated, "
+              f"{stats['duplicates']} duplicates, {stats['invalid']} invalid", end='', file=sys.stderr)
+
+    records = read_records(args.file, detect_format(args.file, args.format))
+    stats = core.import_questions(records, args.on_duplicate, args.batch_size, progress)
+    print(file=sys.stderr)
+    for error in stats['errors']:
+        print(f"Skipped {error}", file=sys.stderr)
+    if stats['invalid'] > len(stats['errors']):
+        print(f"... and {stats['invalid'] - len(stats['errors'])} more invalid records", file=sys.stderr)
+    print(f"Imported {stats['added']} new and {stats['updated']} updated questions "
+          f"({stats['duplicates']} duplicates, {stats['invalid']} invalid)")
+    return 0
+
+
+def cmd_validate(core, args):
+    problems = core.validate()
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} problem(s) found", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def cmd_stats(core, args):
+    stats = core.stats()
+    if args.json:
+        write_json(stats, '-')
+        return 0
+    for key in ('questions', 'experiences', 'stories', 'reviews', 'practiced_questions', 'due_now', 'overdue',
+                'current_streak', 'longest_streak', 'average_recording'):
+        print(f"{key.replace('_', ' '):<22} {stats[key]}")
+    print("leadership principle                  questions  stories")
+    for lp in core.leadership_principles:
+        print(f"  {lp:<44} {stats['questions_per_lp'][lp]:>5} {stats['stories_per_lp'][lp]:>8}")
+    return 0
+
+
+def cmd_due(core, args):
+    if args.lp != ALL and args.lp not in core.leadership_principles:
+        print(f"Error: unknown leadership principle: {args.lp}", file=sys.stderr)
+        return 1
+    now = None if args.all else datetime.datetime.now().timestamp()
+    for question, card in core.due_cards(args.count, args.lp, now):
+        due = datetime.datetime.fromtimestamp(card.due).strftime(TIMESTAMP_FORMAT) if card.reps or card.lapses else "new"
+        print(f"{question['id']}  {due:<19}  {question['question']}")
+    return 0
+
+
+def cmd_find(core, args):
+    unknown = [lp for lp in args.lp if lp not in core.leadership_principles]
+    if unknown:
+        print(f"Error: unknown leadership principle: {unknown[0]}", file=sys.stderr)
+        return 1
+    core.load_questions()
+    if args.count:
+        print(core.lp_table.count(args.lp, args.match))
+        return 0
+    questions = core.questions_with_lps(args.lp, args.match)
+    for question in questions:
+        print(f"{question['id']}  {question['question']}")
+    print(f"{len(questions)} question(s)", file=sys.stderr)
+    return 0
+
+
+def cmd_duplicates(core, args):
+    core.load_questions()
+    pairs = core.near_duplicates(args.threshold)
+    if args.json:
+        write_json([{'question_ids': [a['id'], b['id']], 'similarity': score} for a, b, score in pairs], '-')
+    else:
+        # One block per cluster of rephrasings, with the pair scores inside it
+        scores = {}
+        for a, b, score in pairs:
+            scores[a['id']] = max(scores.get(a['id'], 0), score)
+            scores[b['id']] = max(scores.get(b['id'], 0), score)
+        for group in group_pairs((a['id'], b['id'], score) for a, b, score in pairs):
+            for qid in group:
+                print(f"{scores[qid]:.2f}  {qid}  {core.question_index[qid]['question']}")
+            print()
+    print(f"{len(pairs)} near-duplicate pair(s) at similarity >= {args.threshold}", file=sys.stderr)
+    return 0
+
+
+def cmd_analyze(core, args):
+    if not speech_available():
+        print("Error: speech analysis needs NumPy", file=sys.stderr)
+        return 1
+    results = {path: analyze_wav(path) for path in args.files}
+    write_json(results, '-')
+    return 0
+
+
+def cmd_serve(core, args):
+    server = BankServer(core.storage, core.leadership_principles)
+
+    def ready(port):
+        print(f"Serving the question bank on http://{args.host}:{port}/api (Ctrl+C to stop)", file=sys.stderr)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch jobs for the Amazon Interview Preparation Tool (no GUI)")
+    parser.add_argument('--storage', choices=['json', 'sqlite'],
+                        help="data backend (default: sqlite if interview_prep.db exists, else json)")
+    parser.add_argument('--data-dir', default=".", help="directory holding the data files (default: current)")
+    parser.add_argument('--server', metavar='URL',
+                        help="use a bank served by 'serve' instead of local files (cached in --data-dir)")
+    parser.add_argument('--instrument', metavar='FILE', help="write per-call latency histograms to FILE")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="write one data set; questions also as JSONL or CSV")
+    export.add_argument('store', choices=list(STORES) + ['practice_events'])
+    export.add_argument('file', nargs='?', default='-', help="output file (default: JSON on stdout)")
+    export.add_argument('--format', choices=FORMATS, help="default: from the file extension")
+    export.set_defaults(func=cmd_export, load=False)
+
+    imp = commands.add_parser('import', help="merge questions from a JSONL, CSV or JSON file")
+    imp.add_argument('file')
+    imp.add_argument('--format', choices=FORMATS, help="default: from the file extension")
+    imp.add_argument('--on-duplicate', choices=['skip', 'update'], default='skip',
+                     help="what to do with questions already in the bank, matched by id or text (default: skip)")
+    imp.add_argument('--batch-size', type=int, default=1000, help="records per write (default: 1000)")
+    imp.set_defaults(func=cmd_import, load=False)
+
+    validate = commands.add_parser('validate', help="report inconsistencies; exits 1 if any are found")
+    validate.set_defaults(func=cmd_validate)
+
+    stats = commands.add_parser('stats', help="counts per data set and leadership principle")
+    stats.add_argument('--json', action='store_true', help="print the stats as JSON")
+    stats.set_defaults(func=cmd_stats)
+
+    due = commands.add_parser('due', help="list the next due practice cards")
+    due.add_argument('-n', '--count', type=int, default=10, help="number of cards (default: 10)")
+    due.add_argument('--lp', default=ALL, help="only cards for this leadership principle")
+    due.add_argument('--all', action='store_true', help="include cards that are not due yet")
+    due.set_defaults(func=cmd_due)
+
+    find = commands.add_parser('find', help="list the questions with any or all of some leadership principles")
+    find.add_argument('--lp', action='append', default=[], help="a leadership principle; repeat for several")
+    find.add_argument('--match', choices=['any', 'all'], default='any', help="questions with any (default) or all of them")
+    find.add_argument('--count', action='store_true', help="only print the number of questions")
+    find.set_defaults(func=cmd_find, load=False)
+
+    duplicates = commands.add_parser('duplicates', help="report rephrased questions (TF-IDF cosine similarity)")
+    duplicates.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help=f"minimum cosine similarity (default: {DEFAULT_THRESHOLD})")
+    duplicates.add_argument('--json', action='store_true', help="print the pairs as JSON")
+    duplicates.set_defaults(func=cmd_duplicates, load=False)
+
+    analyze = commands.add_parser('analyze', help="speech metrics (pauses, speaking time, STAR window) for recordings")
+    analyze.add_argument('files', nargs='+', help="WAV files from the recordings directory")
+    analyze.set_defaults(func=cmd_analyze, load=False)
+
+    serve = commands.add_parser('serve', help="share the bank over a local JSON API (see amz_server)")
+    serve.add_argument('--host', default=DEFAULT_HOST, help=f"interface to listen on (default: {DEFAULT_HOST})")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    serve.set_defaults(func=cmd_serve, load=False, background=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    core = InterviewPrepCore(open_storage('remote' if args.server else args.storage, args.data_dir,
+                                          getattr(args, 'background', False), args.server))
+    instrumentation = Instrumentation() if args.instrument else None
+    if instrumentation is not None:
+        instrument_core(instrumentation, core)
+    try:
+        if getattr(args, 'load', True):
+            load_data(core)
+        return args.func(core, args)
+    except (OSError, ValueError, LoadError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        try:
+            core.close()
+        except OSError as e:
+            print(f"Warning: {str(e)}", file=sys.stderr)
+        if instrumentation is not None:
+            instrumentation.dump(args.instrument)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,770 @@
+import datetime
+import uuid
+from collections import defaultdict
+
+from amz_storage import open_storage
+from amz_practice_log import make_event, last_practiced
+from amz_search import QuestionSearchIndex
+from amz_duplicates import DuplicateIndex, DEFAULT_THRESHOLD
+from amz_recommend import ExperienceRecommender
+from amz_analytics import ProgressAnalytics
+from amz_session import SESSION_QUESTIONS, lp_weights, balanced_plan
+from amz_matrix import LPMatrix
+from amz_lptable import LPTable
+from amz_snapshot import SnapshotQuestions
+from amz_scheduler import Scheduler, ALL, GRADE_GOOD, TIMESTAMP_FORMAT, parse_timestamp
+from amz_transfer import normalize_question, text_key
+
+# Full list of Amazon Leadership Principles
+LEADERSHIP_PRINCIPLES = [
+    "Customer Obsession",
+    "Ownership",
+    "Invent and Simplify",
+    "Are Right, A Lot",
+    "Learn and Be Curious",
+    "Hire and Develop the Best",
+    "Insist on the Highest Standards",
+    "Think Big",
+    "Bias for Action",
+    "Frugality",
+    "Earn Trust",
+    "Dive Deep",
+    "Have Backbone; Disagree and Commit",
+    "Deliver Results",
+    "Strive to be Earth's Best Employer",
+    "Success and Scale Bring Broad Responsibility"
+]
+
+
+class LoadError(Exception):
+    # A data set could not be read; it has been reset to empty
+    pass
+
+
+class InterviewPrepCore:
+    # Question bank, experience library, LP story matrix, interview framework
+    # and practice history with their scheduler and search index, behind a
+    # storage backend. Nothing here touches tkinter: the GUI and the batch
+    # CLI are both clients. Failures are raised (LoadError for unreadable
+    # data, ValueError/KeyError for bad input) for the caller to report.
+    def __init__(self, storage=None, leadership_principles=LEADERSHIP_PRINCIPLES):
+        self.storage = storage if storage is not None else open_storage()
+        self.leadership_principles = list(leadership_principles)
+
+        self.experiences = []
+        self.experience_index = {}  # experience id -> experience
+        self.experience_titles = {}  # title -> experience id
+        self.experience_questions = defaultdict(set)  # experience id -> ids of questions citing it
+        self.question_experiences = {}  # question id -> experience ids as indexed
+        self.questions = []
+        self.practice_history = {}  # question id -> last practiced timestamp
+        self.practice_events = []
+        self.question_index = {}  # question id -> question
+        self.lp_table = LPTable(self.leadership_principles)  # LP bitmasks, built by load_questions
+        self.lp_matrix = LPMatrix(self.leadership_principles)
+        self.interview_framework = {}
+        self.scheduler = None  # built by load_practice
+        self.analytics = None  # progress rollups, built by load_practice
+        self.search_index = None  # built by build_search_index
+        self.duplicate_index = None  # built by build_duplicate_index, or on first use
+        self.changed_questions = None  # ids changed while indexes build off the main thread (see track_changes)
+        self.changed_experiences = None  # likewise, for the recommender
+        self.index_sources = None  # (questions, experiences) as of track_changes, for those builds
+        self.recommender = None  # built by build_recommender, or on first use
+
+    def load_all(self):
+        # Load every data set, collecting errors instead of stopping at the first
+        errors = []
+        for loader in (self.load_questions, self.load_experiences, self.load_lp_matrix,
+                       self.load_interview_framework, self.load_practice, self.build_search_index):
+            try:
+                loader()
+            except LoadError as e:
+                errors.append(str(e))
+        return errors
+
+    # ----------------------- Question Bank -----------------------
+    def load_questions(self):
+        # With a current snapshot (JSON backend) the bank is opened without
+        # parsing questions.json: questions are decoded as they are used.
+        # Otherwise the file is parsed and a snapshot written on close.
+        error = None
+        snapshot = None
+        try:
+            if self.storage.supports_snapshots:
+                snapshot = self.storage.load_snapshot('questions', self.leadership_principles)
+            if snapshot is not None:
+                self.questions = SnapshotQuestions(snapshot)
+            else:
+                self.questions = self.storage.load('questions')
+        except Exception as e:
+            error = LoadError(f"Failed to load questions: {str(e)}")
+            self.questions = []
+        if snapshot is not None:
+            # Only ever written from a bank with unique ids
+            self.question_index = self.questions.index
+            assigned = False
+        else:
+            assigned = self.assign_question_ids()
+        if self.link_questions() or assigned:
+            self.save_questions()
+        if snapshot is not None:
+            # Same LPs, so the snapshot's masks have the table's layout
+            self.lp_table = LPTable.from_masks(self.leadership_principles, self.questions.row_ids, snapshot.masks)
+        else:
+            self.lp_table = LPTable(self.leadership_principles, self.question_fields())
+        if error is not None:
+            raise error
+        if snapshot is None and self.storage.supports_snapshots:
+            self.storage.save_snapshot('questions', self.questions)
+
+    def question_fields(self):
+        # (id, LPs, experience references) per question, in bank order;
+        # snapshot rows are read from its columns without being decoded
+        if isinstance(self.questions, SnapshotQuestions):
+            return self.questions.fields()
+        return ((q['id'], q.get('leadership_principles', []), q.get('experiences', [])) for q in self.questions)
+
+    def question_ids(self):
+        return iter(self.lp_table)
+
+    def new_question_id(self):
+        return uuid.uuid4().hex
+
+    def assign_question_ids(self):
+        # Give every question a persistent random id and build the id index.
+        # Existing unique ids are kept so practice history still matches;
+        # missing or duplicated ones get a fresh id. Returns True if any
+        # question changed and the bank needs saving.
+        self.question_index = {}
+        changed = False
+        for q in self.questions:
+            if not q.get('id') or q['id'] in self.question_index:
+                q['id'] = self.new_question_id()
+                changed = True
+            self.question_index[q['id']] = q
+        return changed
+
+    def save_questions(self, key=None):
+        # With a key only that record changed; SQLite then writes a single row
+        if key is None:
+            self.storage.save('questions', self.questions)
+        else:
+            self.storage.update('questions', self.questions, key, self.question_index.get(key))
+
+    def get_question(self, question_id):
+        return self.question_index[question_id]
+
+    def save_question(self, data, question_id=None):
+        # Create a question, or update the one with question_id in place so
+        # its id and any references to the dict survive. Returns the question.
+        if not data.get('question', '').strip():
+            raise ValueError("Please enter a question.")
+        if question_id is not None:
+            question = self.question_index[question_id]
+            question.update(data)
+        else:
+            question = dict(data, id=data.get('id') or self.new_question_id())
+            if question['id'] in self.question_index:
+                raise ValueError(f"Duplicate question id: {question['id']}")
+            self.questions.append(question)
+            self.question_index[question['id']] = question
+        self.index_question(question)
+        self.save_questions(question['id'])
+        return question
+
+    def index_question(self, question):
+        # Keep the scheduler and the indexes current, if they are built
+        if self.changed_questions is not None:
+            self.changed_questions.add(question['id'])
+        self.link_question(question)
+        self.lp_table.set(question['id'], question.get('leadership_principles', []))
+        if self.scheduler is not None:
+            card = self.scheduler.add_card(question['id'], question.get('leadership_principles', []))
+            if self.analytics is not None:
+                self.analytics.add_question(card.question_id, card.lps, card.due)
+        if self.search_index is not None:
+            self.search_index.add(question)
+        if self.duplicate_index is not None:
+            self.duplicate_index.add(question)
+
+    def delete_question(self, question_id):
+        question = self.question_index.pop(question_id)
+        self.questions.remove(question)
+        if self.changed_questions is not None:
+            self.changed_questions.add(question_id)
+        self.unlink_question(question_id)
+        self.lp_table.remove(question_id)
+        if self.scheduler is not None:
+            self.scheduler.remove_card(question_id)
+        if self.analytics is not None:
+            self.analytics.remove_question(question_id)
+        if self.search_index is not None:
+            self.search_index.remove(question_id)
+        if self.duplicate_index is not None:
+            self.duplicate_index.remove(question_id)
+        self.save_questions(question_id)
+        return question
+
+    def iter_import(self, records, on_duplicate='skip', batch_size=1000):
+        # Merge (line, record) pairs from amz_transfer.read_records into the
+        # bank. Records are validated against the leadership principles and
+        # deduplicated by id and by question text, against the bank and
+        # within the import; on_duplicate 'update' overwrites the existing
+        # question instead of skipping. Changes are written batch_size at a
+        # time (SQLite) or once at the end (JSON). Yields the running stats
+        # after every batch so callers can report progress.
+        if on_duplicate not in ('skip', 'update'):
+            raise ValueError(f"Unknown duplicate policy: {on_duplicate}")
+        stats = {'read': 0, 'added': 0, 'updated': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+        by_text = {text_key(q.get('question', '')): q['id'] for q in self.questions}
+        batch = []
+        changed = False
+        for line, record in records:
+            stats['read'] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                data = normalize_question(record, self.leadership_principles)
+                data['experiences'] = self.resolve_experience_refs(data['experiences'])
+            except ValueError as e:
+                stats['invalid'] += 1
+                if len(stats['errors']) < 100:
+                    stats['errors'].append(f"line {line}: {str(e)}")
+                continue
+            key = text_key(data['question'])
+            existing_id = data['id'] if data.get('id') in self.question_index else by_text.get(key)
+            if existing_id is not None:
+                if on_duplicate == 'skip':
+                    stats['duplicates'] += 1
+                    continue
+                data.pop('id', None)
+                question = self.question_index[existing_id]
+                by_text.pop(text_key(question.get('question', '')), None)
+                question.update(data)
+                stats['updated'] += 1
+            else:
+                question = dict(data, id=data.get('id') or self.new_question_id())
+                self.questions.append(question)
+                self.question_index[question['id']] = question
+                stats['added'] += 1
+            by_text[key] = question['id']
+            self.index_question(question)
+            batch.append(question['id'])
+            if len(batch) >= batch_size:
+                changed = self.write_import_batch(batch) or changed
+                batch = []
+                yield stats
+        if batch:
+            changed = self.write_import_batch(batch) or changed
+        if changed:
+            self.save_questions()
+        yield stats
+
+    def write_import_batch(self, batch):
+        # Returns True if the batch still has to be saved with the whole bank
+        if not self.storage.supports_row_writes:
+            return True
+        self.storage.update_many('questions', self.questions, [(qid, self.question_index[qid]) for qid in batch])
+        return False
+
+    def import_questions(self, records, on_duplicate='skip', batch_size=1000, progress=None):
+        # Runs iter_import to the end, calling progress(stats) after each batch
+        stats = None
+        for stats in self.iter_import(records, on_duplicate, batch_size):
+            if progress is not None:
+                progress(stats)
+        return stats
+
+    def portable_question(self, question):
+        # Copy for export files, citing experiences by title so the file
+        # reads well and imports into another bank (iter_import resolves
+        # titles back to ids)
+        if not question.get('experiences'):
+            return question
+        return dict(question, experiences=[self.experience_title(ref) for ref in question['experiences']])
+
+    def questions_with_lps(self, lps, match='any'):
+        # Questions with any (or all) of the LPs, in bank order, from the
+        # LP bitmask table
+        return [self.question_index[qid] for qid in self.lp_table.select(lps, match)]
+
+    def build_search_index(self):
+        self.search_index = QuestionSearchIndex(self.indexed_questions(), self.find_experience)
+
+    def search(self, query):
+        return [self.question_index[qid] for qid in self.search_ids(query)]
+
+    def search_ids(self, query):
+        # Ids only, so listing the bank does not decode every question
+        if not query.strip():
+            return list(self.question_ids())
+        return self.search_index.search(query)
+
+    def build_duplicate_index(self):
+        self.duplicate_index = DuplicateIndex(self.indexed_questions())
+
+    def indexed_questions(self):
+        # What an index is built from: while changes are tracked, the bank as
+        # it was then, since a build iterating the live list on the loader
+        # thread would skip questions when an edit shifts it
+        if self.index_sources is not None:
+            return self.index_sources[0]
+        return self.questions
+
+    def track_changes(self):
+        # Indexes may be built on a loader thread while the main thread keeps
+        # editing the bank. From here on the ids of changed questions and
+        # experiences are kept, for catch_up_indexes to apply what a build
+        # missed, and the builds read copies of the bank taken here.
+        if self.changed_questions is None:
+            self.changed_questions = set()
+        if self.changed_experiences is None:
+            self.changed_experiences = set()
+        questions = self.questions.copy() if isinstance(self.questions, SnapshotQuestions) else list(self.questions)
+        self.index_sources = (questions, list(self.experiences))
+
+    def catch_up_indexes(self):
+        # On the main thread, once the builds are done. Re-adding a question
+        # an index already has is a no-op.
+        changed, self.changed_questions = self.changed_questions or (), None
+        experiences, self.changed_experiences = self.changed_experiences or (), None
+        self.index_sources = None
+        for exp_id in experiences:
+            self.index_experience(exp_id)
+        for qid in changed:
+            question = self.question_index.get(qid)
+            for index in (self.search_index, self.duplicate_index):
+                if index is None:
+                    continue
+                if question is None:
+                    index.remove(qid)
+                else:
+                    index.add(question)
+
+    def similar_questions(self, text, threshold=DEFAULT_THRESHOLD, limit=5, exclude=None):
+        # [(question, cosine)] whose wording is close to `text`
+        if self.duplicate_index is None:
+            self.build_duplicate_index()
+        return [(self.question_index[qid], score)
+                for qid, score in self.duplicate_index.similar(text, threshold, limit, exclude)]
+
+    def near_duplicates(self, threshold=DEFAULT_THRESHOLD):
+        # [(question, question, cosine)] across the whole bank; needs NumPy
+        if self.duplicate_index is None:
+            self.build_duplicate_index()
+        pairs = self.duplicate_index.near_duplicates(threshold)
+        return [(self.question_index[a], self.question_index[b], score) for a, b, score in pairs
+                if a in self.question_index and b in self.question_index]
+
+    # ----------------------- Experience Library -----------------------
+    def load_experiences(self):
+        error = None
+        try:
+            self.experiences = self.storage.load('experiences')
+            # Ensure experiences are a list
+            if not isinstance(self.experiences, list):
+                self.experiences = []
+        except Exception as e:
+            error = LoadError(f"Failed to load experiences: {str(e)}")
+            self.experiences = []
+        self.recommender = None
+        if self.assign_experience_ids():
+            self.save_experiences()
+        # Questions and stories loaded earlier may still name experiences by title
+        if self.link_questions():
+            self.save_questions()
+        if self.link_matrix():
+            self.save_lp_matrix()
+        if error is not None:
+            raise error
+
+    def assign_experience_ids(self):
+        # Experiences are keyed by a persistent random id, as questions are,
+        # so a title can change without touching anything that refers to it.
+        # Builds the id and title indexes; returns True if any experience
+        # was given an id and the library needs saving.
+        self.experience_index = {}
+        self.experience_titles = {}
+        changed = False
+        for exp in self.experiences:
+            if not exp.get('id') or exp['id'] in self.experience_index:
+                exp['id'] = self.new_experience_id()
+                changed = True
+            self.experience_index[exp['id']] = exp
+            if exp.get('title'):
+                self.experience_titles.setdefault(exp['title'], exp['id'])
+        return changed
+
+    def new_experience_id(self):
+        return uuid.uuid4().hex
+
+    def find_experience(self, title):
+        # Id of the experience with this title, matched exactly and then
+        # case-insensitively, or None
+        exp_id = self.experience_titles.get(title)
+        if exp_id is None:
+            folded = title.casefold()
+            exp_id = next((eid for name, eid in self.experience_titles.items() if name.casefold() == folded), None)
+        return exp_id
+
+    def resolve_experience_refs(self, refs):
+        # Experience ids for a list of ids or titles (imports and data saved
+        # before experiences had ids); unknown names are kept as they are
+        # for validate() to report
+        resolved = []
+        for ref in refs:
+            if ref not in self.experience_index:
+                ref = self.find_experience(ref) or ref
+            if ref not in resolved:
+                resolved.append(ref)
+        return resolved
+
+    def link_questions(self):
+        # Rebuild the experience -> questions index. Questions saved before
+        # experiences had ids cite them by title; once the experiences are
+        # loaded those are rewritten as ids, a one-time migration. Returns
+        # True if any question changed and the bank needs saving.
+        experience_questions = self.experience_questions = defaultdict(set)
+        question_experiences = self.question_experiences = {}
+        changed = False
+        for qid, lps, refs in self.question_fields():
+            if not refs:
+                continue
+            if self.experience_titles and any(ref not in self.experience_index for ref in refs):
+                resolved = self.resolve_experience_refs(refs)
+                if resolved != refs:
+                    q = self.question_index[qid]
+                    q['experiences'] = refs = resolved
+                    changed = True
+                    if self.changed_questions is not None:
+                        self.changed_questions.add(qid)
+                    if self.search_index is not None:
+                        self.search_index.add(q)
+            # Built from scratch, so there is nothing to diff (see link_refs)
+            refs = question_experiences[qid] = frozenset(refs)
+            for exp_id in refs:
+                experience_questions[exp_id].add(qid)
+        return changed
+
+    def link_question(self, question):
+        self.link_refs(question['id'], question.get('experiences', []))
+
+    def link_refs(self, qid, refs):
+        # Only the experiences the question gained or lost are touched
+        refs = frozenset(refs)
+        old = self.question_experiences.get(qid, frozenset())
+        for exp_id in old - refs:
+            self.unlink(exp_id, qid)
+        for exp_id in refs - old:
+            self.experience_questions[exp_id].add(qid)
+        if refs:
+            self.question_experiences[qid] = refs
+        else:
+            self.question_experiences.pop(qid, None)
+
+    def unlink_question(self, question_id):
+        for exp_id in self.question_experiences.pop(question_id, ()):
+            self.unlink(exp_id, question_id)
+
+    def unlink(self, exp_id, question_id):
+        ids = self.experience_questions.get(exp_id)
+        if ids is not None:
+            ids.discard(question_id)
+            if not ids:
+                del self.experience_questions[exp_id]
+
+    def link_matrix(self):
+        # The LP matrix counterpart of link_questions: rows keyed by an
+        # experience title move to the experience's id. Returns True if the
+        # matrix needs saving.
+        changed = False
+        for key in list(self.lp_matrix.cells):
+            if key in self.experience_index:
+                continue
+            exp_id = self.find_experience(key)
+            if exp_id is not None and exp_id not in self.lp_matrix.cells:
+                self.lp_matrix.rename_experience(key, exp_id)
+                changed = True
+        return changed
+
+    def save_experiences(self, key=None):
+        # With a key only that record changed; SQLite then writes a single row
+        if key is None:
+            self.storage.save('experiences', self.experiences)
+        else:
+            self.storage.update('experiences', self.experiences, key, self.experience_index.get(key))
+
+    def get_experience(self, experience_id):
+        return self.experience_index[experience_id]
+
+    def experience_title(self, experience_id):
+        # Title for display; unresolved references are shown as they are
+        experience = self.experience_index.get(experience_id)
+        return experience.get('title', '') if experience is not None else experience_id
+
+    def save_experience(self, title, description, experience_id=None):
+        # Create an experience, or update the one with experience_id in place:
+        # questions and stories refer to the id, so a rename touches only this
+        # record. Without an id, an existing experience with the same title is
+        # updated. Titles must be unique. Returns (experience, is_new).
+        title = title.strip()
+        if not title:
+            raise ValueError("Please enter a title for the experience.")
+        if experience_id is None:
+            experience_id = self.experience_titles.get(title)
+        experience = self.experience_index[experience_id] if experience_id is not None else None
+        holder = self.experience_titles.get(title)
+        if holder is not None and holder != experience_id:
+            raise ValueError(f"There is already an experience titled '{title}'.")
+        is_new = experience is None
+        if is_new:
+            experience = {'id': self.new_experience_id()}
+            self.experiences.append(experience)
+            self.experience_index[experience['id']] = experience
+        elif self.experience_titles.get(experience['title']) == experience['id']:
+            del self.experience_titles[experience['title']]
+        experience['title'] = title
+        experience['description'] = description
+        self.experience_titles[title] = experience['id']
+        self.save_experiences(experience['id'])
+        self.index_experience(experience['id'])
+        return experience, is_new
+
+    def delete_experience(self, experience_id):
+        # Removes the experience, its LP stories and every question's
+        # reference to it; only the questions citing it are rewritten.
+        # Returns the ids of those questions.
+        experience = self.experience_index.pop(experience_id)
+        self.experiences.remove(experience)
+        if self.experience_titles.get(experience.get('title')) == experience_id:
+            del self.experience_titles[experience['title']]
+        self.save_experiences(experience_id)
+        affected = list(self.experience_questions.pop(experience_id, ()))
+        if self.changed_questions is not None:
+            self.changed_questions.update(affected)
+        for qid in affected:
+            question = self.question_index[qid]
+            question['experiences'] = [ref for ref in question['experiences'] if ref != experience_id]
+            self.link_question(question)
+            if self.search_index is not None:
+                self.search_index.add(question)
+        if affected:
+            self.storage.update_many('questions', self.questions, [(qid, self.question_index[qid]) for qid in affected])
+        if experience_id in self.lp_matrix.cells:
+            self.lp_matrix.remove_experience(experience_id)
+            self.save_lp_matrix(experience_id)
+        if self.changed_experiences is not None:
+            self.changed_experiences.add(experience_id)
+        if self.recommender is not None:
+            self.recommender.remove(experience_id)
+        return affected
+
+    def index_experience(self, experience_id):
+        # Refresh one experience in the recommender, if it is built
+        if self.changed_experiences is not None:
+            self.changed_experiences.add(experience_id)
+        if self.recommender is None:
+            return
+        exp = self.experience_index.get(experience_id)
+        if exp is None:
+            self.recommender.remove(experience_id)
+        else:
+            self.recommender.update(experience_id, exp.get('description', ''), self.lp_matrix.stories_for(experience_id))
+
+    def build_recommender(self):
+        self.recommender = ExperienceRecommender()
+        experiences = self.index_sources[1] if self.index_sources is not None else self.experiences
+        for exp in experiences:
+            self.recommender.update(exp['id'], exp.get('description', ''), self.lp_matrix.stories_for(exp['id']))
+        self.recommender.refresh_norms()  # here, on the loader thread, not on the first query
+
+    def recommend_experiences(self, text, lps=(), count=5):
+        # [(experience, score)] for a question's text and selected LPs,
+        # from LP story coverage and text similarity
+        if self.recommender is None:
+            self.build_recommender()
+        return [(self.experience_index[exp_id], score) for exp_id, score, overlap, similarity
+                in self.recommender.rank(text, lps, count) if exp_id in self.experience_index]
+
+    # ----------------------- LP Story Matrix -----------------------
+    def load_lp_matrix(self):
+        error = None
+        try:
+            data = self.storage.load('lp_matrix_data')
+            if not isinstance(data, dict):
+                data = {}
+        except Exception as e:
+            error = LoadError(f"Failed to load LP matrix data: {str(e)}")
+            data = {}
+        self.lp_matrix, converted = LPMatrix.from_storage(self.leadership_principles, data)
+        self.recommender = None
+        # Rewrite legacy "<title>-<LP>" keys and title-keyed rows once
+        if self.link_matrix() or converted:
+            self.save_lp_matrix()
+        if error is not None:
+            raise error
+
+    def save_lp_matrix(self, key=None):
+        # Stored as experience id -> LP -> story; with a key only that
+        # experience's cells are written (a single row with SQLite)
+        if key is None:
+            self.storage.save('lp_matrix_data', self.lp_matrix.cells)
+        else:
+            self.storage.update('lp_matrix_data', self.lp_matrix.cells, key, self.lp_matrix.cells.get(key))
+
+    def set_story(self, experience_id, lp, story):
+        self.lp_matrix.set_story(experience_id, lp, story.strip())
+        self.save_lp_matrix(experience_id)
+        self.index_experience(experience_id)
+
+    # ----------------------- Interview Framework -----------------------
+    def load_interview_framework(self):
+        try:
+            self.interview_framework = self.storage.load('interview_framework')
+            if not isinstance(self.interview_framework, dict):
+                self.interview_framework = {}
+        except Exception as e:
+            self.interview_framework = {}
+            raise LoadError(f"Failed to load interview framework: {str(e)}")
+
+    def save_interview_framework(self, sections=None):
+        if sections:
+            self.interview_framework.update(sections)
+        self.storage.save('interview_framework', self.interview_framework)
+
+    # ----------------------- Practice -----------------------
+    def load_practice(self):
+        # Needs the questions; review state is rebuilt by replaying the log
+        error = None
+        try:
+            self.load_practice_history()
+        except LoadError as e:
+            error = e
+        self.build_scheduler()
+        self.build_analytics()
+        if error is not None:
+            raise error
+
+    def load_practice_history(self):
+        try:
+            self.practice_events = self.storage.load_practice_events()
+            # practice_history keeps the last practiced timestamp per question id
+            self.practice_history = last_practiced(self.practice_events)
+        except Exception as e:
+            self.practice_events = []
+            self.practice_history = {}
+            raise LoadError(f"Failed to load practice history: {str(e)}")
+
+    def build_scheduler(self):
+        scheduler = Scheduler(self.leadership_principles)
+        for qid, lps, refs in self.question_fields():
+            scheduler.add_card(qid, lps)
+        scheduler.replay(self.practice_events)
+        self.scheduler = scheduler
+
+    def build_analytics(self):
+        analytics = ProgressAnalytics(self.leadership_principles)
+        analytics.load(self.scheduler.cards.values(), self.practice_events)
+        self.analytics = analytics
+
+    def get_current_timestamp(self):
+        return datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    def record_review(self, question_id, grade=GRADE_GOOD, recording=None, duration=None, timestamp=None, speech=None):
+        # Each review is appended to the practice log (earlier reviews are
+        # kept) and reschedules the card. Returns the event.
+        event = make_event(question_id, timestamp or self.get_current_timestamp(), recording, duration, grade, speech)
+        self.practice_events.append(event)
+        self.practice_history[question_id] = event['timestamp']
+        self.storage.append_practice_event(event)
+        card = None
+        if self.scheduler is not None:
+            card = self.scheduler.review(question_id, grade, parse_timestamp(event['timestamp']))
+        if self.analytics is not None:
+            self.analytics.record(event, card.due if card is not None else None)
+        return event
+
+    def next_card(self, lp=ALL, exclude=None):
+        # Earliest-due question for this LP ('All' included), or None
+        card = self.scheduler.next_card(lp, exclude)
+        if card is None:
+            return None
+        return self.question_index[card.question_id]
+
+    def due_cards(self, count, lp=ALL, now=None):
+        # Up to `count` questions due by `now` (default: any time), earliest first
+        cards = self.scheduler.upcoming(count, lp)
+        if now is not None:
+            cards = [card for card in cards if card.due <= now]
+        return [(self.question_index[card.question_id], card) for card in cards]
+
+    def plan_session(self, count=SESSION_QUESTIONS, now=None):
+        # A mock interview of `count` questions as [(question, LP)], spread
+        # across the LPs and weighted toward weak or overdue ones
+        weights = lp_weights(self.analytics, self.leadership_principles, now)
+        return [(self.question_index[qid], lp) for qid, lp in balanced_plan(self.scheduler, weights, count)]
+
+    def progress(self, now=None):
+        # Overall rollups and one entry per LP, from the incremental analytics
+        return {
+            'summary': self.analytics.summary(now),
+            'per_lp': {lp: self.analytics.lp_summary(lp, now) for lp in self.leadership_principles},
+        }
+
+    # ----------------------- Reports -----------------------
+    def stats(self, now=None):
+        now = datetime.datetime.now().timestamp() if now is None else now
+        progress = self.analytics.summary(now) if self.analytics is not None else {}
+        return {
+            'questions': len(self.questions),
+            'experiences': len(self.experiences),
+            'stories': sum(len(row) for row in self.lp_matrix.cells.values()),
+            'reviews': len(self.practice_events),
+            'practiced_questions': progress.get('practiced_questions'),
+            'due_now': self.analytics.due_count(now) if self.analytics is not None else None,
+            'overdue': progress.get('overdue'),
+            'current_streak': progress.get('current_streak'),
+            'longest_streak': progress.get('longest_streak'),
+            'average_recording': progress.get('average_recording'),
+            'questions_per_lp': self.lp_table.counts(),
+            'stories_per_lp': dict(self.lp_matrix.coverage),
+            'lps_without_story': self.lp_matrix.gaps(),
+        }
+
+    def validate(self):
+        # Consistency problems across the data sets, as readable messages
+        problems = []
+        lps = set(self.leadership_principles)
+        titles = set()
+        for exp in self.experiences:
+            title = exp.get('title') if isinstance(exp, dict) else None
+            if not title:
+                problems.append(f"Experience without a title: {exp!r}")
+            elif title in titles:
+                problems.append(f"Duplicate experience title: {title}")
+            titles.add(title)
+        for q in self.questions:
+            label = q.get('question', '')[:60] or q['id']
+            if not q.get('question', '').strip():
+                problems.append(f"Question {q['id']} has no text")
+            for lp in q.get('leadership_principles', []):
+                if lp not in lps:
+                    problems.append(f"Question '{label}' has unknown leadership principle: {lp}")
+            for exp_id in q.get('experiences', []):
+                if exp_id not in self.experience_index:
+                    problems.append(f"Question '{label}' references unknown experience: {exp_id}")
+        for exp_id, row in self.lp_matrix.cells.items():
+            if exp_id not in self.experience_index:
+                problems.append(f"LP matrix has stories for unknown experience: {exp_id}")
+            for lp in row:
+                if lp not in lps:
+                    problems.append(f"LP matrix has a story for unknown leadership principle: "
+                                    f"{self.experience_title(exp_id)} / {lp}")
+        orphans = {e['question_id'] for e in self.practice_events} - set(self.question_index)
+        if orphans:
+            problems.append(f"{len(orphans)} practiced question id(s) are no longer in the bank")
+        return problems
+
+    def close(self):
+        self.storage.close()
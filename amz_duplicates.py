@@ -0,0 +1,223 @@
+import math
+from collections import Counter, defaultdict
+
+from amz_search import tokenize
+
+numpy = None
+
+DEFAULT_THRESHOLD = 0.8  # cosine similarity counted as a near-duplicate
+BLOCK_ROWS = 500  # questions per vectorized block in near_duplicates()
+
+
+def load_numpy():
+    # Optional: only the bank-wide report needs it
+    global numpy
+    if numpy is None:
+        import numpy as module
+        numpy = module
+    return numpy
+
+
+class DuplicateIndex:
+    # TF-IDF vectors (sublinear tf, smoothed idf, L2-normalized) over the
+    # question text, kept current one question at a time like the search
+    # index. Only term counts and document frequencies are stored; weights
+    # are derived from the current idf when a query or report runs.
+    #
+    # Both similar() and near_duplicates() use prefix filtering: with a
+    # question's terms ordered rarest first, the shortest prefix whose
+    # remaining suffix has norm below the threshold must contain a term the
+    # two questions share, or their cosine cannot reach the threshold. Only
+    # questions sharing one of those few rare terms are compared, so common
+    # phrasing ("tell me about a time") never generates candidate pairs.
+    def __init__(self, questions=()):
+        self.counts = {}  # question id -> Counter of terms
+        self.df = Counter()
+        self.postings = defaultdict(set)  # term -> question ids
+        for question in questions:
+            self.add(question)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, question):
+        qid = question['id']
+        counts = Counter(tokenize(question.get('question', '')))
+        old = self.counts.get(qid)
+        if old == counts:
+            return
+        if old is not None:
+            self.remove(qid)
+        self.counts[qid] = counts
+        for term in counts:
+            self.df[term] += 1
+            self.postings[term].add(qid)
+
+    def remove(self, qid):
+        counts = self.counts.pop(qid, None)
+        if counts is None:
+            return
+        for term in counts:
+            self.df[term] -= 1
+            if not self.df[term]:
+                del self.df[term]
+            ids = self.postings[term]
+            ids.discard(qid)
+            if not ids:
+                del self.postings[term]
+
+    def idf(self, term):
+        return math.log((1 + len(self.counts)) / (1 + self.df.get(term, 0))) + 1
+
+    def vector(self, counts):
+        # {term: weight}, normalized
+        weights = {term: (1 + math.log(count)) * self.idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    def prefix(self, vector, threshold):
+        # Rarest terms until what is left cannot reach the threshold alone
+        remaining = 1.0
+        terms = []
+        for term in sorted(vector, key=lambda t: (self.df.get(t, 0), t)):
+            if remaining < threshold * threshold - 1e-9:
+                break
+            terms.append(term)
+            remaining -= vector[term] ** 2
+        return terms
+
+    def similar(self, text, threshold=DEFAULT_THRESHOLD, limit=5, exclude=None):
+        # [(question id, cosine)] for the questions most like `text`
+        query = self.vector(Counter(tokenize(text)))
+        if not query:
+            return []
+        candidates = set()
+        for term in self.prefix(query, threshold):
+            candidates |= self.postings.get(term, set())
+        candidates.discard(exclude)
+        # Candidates share most of their vocabulary, so each idf is computed once
+        n = 1 + len(self.counts)
+        idf = {}
+        scores = []
+        for qid in candidates:
+            dot = norm = 0.0
+            for term, count in self.counts[qid].items():
+                weight = idf.get(term)
+                if weight is None:
+                    weight = idf[term] = math.log(n / (1 + self.df[term])) + 1
+                if count > 1:
+                    weight *= 1 + math.log(count)
+                norm += weight * weight
+                if term in query:
+                    dot += weight * query[term]
+            score = dot / math.sqrt(norm)
+            if score >= threshold:
+                scores.append((qid, round(score, 4)))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:limit]
+
+    def near_duplicates(self, threshold=DEFAULT_THRESHOLD):
+        # Every pair with cosine >= threshold as (id, id, cosine), most
+        # similar first. Vectorized with NumPy in blocks of BLOCK_ROWS.
+        np = load_numpy()
+        # A snapshot (counters are replaced, never mutated), so the report
+        # can run on a worker thread while questions are being edited
+        counts = dict(self.counts)
+        ids = [qid for qid, terms in counts.items() if terms]
+        if len(ids) < 2:
+            return []
+        vocab = {}
+        lengths = np.fromiter((len(counts[qid]) for qid in ids), dtype=np.int64, count=len(ids))
+        total = int(lengths.sum())
+        terms = np.fromiter((vocab.setdefault(term, len(vocab)) for qid in ids for term in counts[qid]),
+                            dtype=np.int64, count=total)
+        tf = np.fromiter((count for qid in ids for count in counts[qid].values()), dtype=np.float64, count=total)
+        rows = np.repeat(np.arange(len(ids), dtype=np.int64), lengths)
+        vocab_size = len(vocab)
+
+        df = np.bincount(terms, minlength=vocab_size).astype(np.float64)
+        idf = np.log((1 + len(ids)) / (1 + df)) + 1
+        weights = (1 + np.log(tf)) * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(ids)))
+        weights /= np.where(norms > 0, norms, 1)[rows]
+
+        # Rarest terms first within each row, then the prefix of each row
+        order = np.lexsort((terms, df[terms], rows))
+        rows, terms, weights = rows[order], terms[order], weights[order]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        squares = weights * weights
+        cumulative = np.cumsum(squares)
+        # Squared norm of the row's terms from this one on is 1 - what precedes it
+        row_before = cumulative - squares - np.repeat(cumulative[starts] - squares[starts], lengths)
+        in_prefix = 1 - row_before >= threshold * threshold - 1e-9
+
+        # Both questions of a qualifying pair have the earliest term they
+        # share in their prefixes (the order is the same for every row), so
+        # only prefix entries are posted: term -> rows, ascending
+        prefix_rows, prefix_terms = rows[in_prefix], terms[in_prefix]
+        by_term = np.argsort(prefix_terms, kind='stable')
+        posting_rows = prefix_rows[by_term]
+        posting_start = np.searchsorted(prefix_terms[by_term], np.arange(vocab_size + 1))
+
+        pairs = []
+        entry_start = np.searchsorted(rows, np.arange(len(ids) + 1))
+        prefix_start = np.searchsorted(prefix_rows, np.arange(len(ids) + 1))
+        column = np.full(vocab_size, -1, dtype=np.int64)  # term -> column of the block matrix
+        for block in range(0, len(ids), BLOCK_ROWS):
+            end = min(block + BLOCK_ROWS, len(ids))
+            lo, hi = prefix_start[block], prefix_start[end]
+            probe_rows, probe_terms = prefix_rows[lo:hi], prefix_terms[lo:hi]
+            # Candidates: every later row sharing a prefix term
+            counts = posting_start[probe_terms + 1] - posting_start[probe_terms]
+            other = posting_rows[ranges(np, posting_start[probe_terms], counts)]
+            mine = np.repeat(probe_rows, counts)
+            later = other > mine
+            candidates = np.unique(mine[later] * len(ids) + other[later])
+            if not len(candidates):
+                continue
+            left, right = candidates // len(ids), candidates % len(ids)
+
+            # The block's rows as a dense matrix over just the terms they use
+            # (plus a zero column for every other term), then one gather per
+            # term of each candidate row
+            block_entries = slice(entry_start[block], entry_start[end])
+            used, local = np.unique(terms[block_entries], return_inverse=True)
+            matrix = np.zeros((end - block, len(used) + 1))
+            matrix[rows[block_entries] - block, local] = weights[block_entries]
+            column[used] = np.arange(len(used))
+            sizes = entry_start[right + 1] - entry_start[right]
+            entries = ranges(np, entry_start[right], sizes)
+            products = matrix[np.repeat(left - block, sizes), column[terms[entries]]] * weights[entries]
+            column[used] = -1
+            scores = np.bincount(np.repeat(np.arange(len(candidates)), sizes), weights=products,
+                                 minlength=len(candidates))
+            hits = scores >= threshold - 1e-9
+            pairs.extend(zip(left[hits].tolist(), right[hits].tolist(), scores[hits].tolist()))
+        pairs.sort(key=lambda pair: -pair[2])
+        return [(ids[a], ids[b], round(min(score, 1.0), 4)) for a, b, score in pairs]
+
+
+def ranges(np, starts, counts):
+    # Concatenated aranges: starts[0]..+counts[0], starts[1]..+counts[1], ...
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return offsets + np.arange(int(counts.sum()))
+
+
+def group_pairs(pairs):
+    # Clusters of question ids linked by near-duplicate pairs (union-find),
+    # largest first
+    parent = {}
+
+    def find(qid):
+        parent.setdefault(qid, qid)
+        while parent[qid] != qid:
+            parent[qid] = parent[parent[qid]]
+            qid = parent[qid]
+        return qid
+
+    for a, b, score in pairs:
+        parent[find(a)] = find(b)
+    groups = defaultdict(list)
+    for qid in parent:
+        groups[find(qid)].append(qid)
+    return sorted(groups.values(), key=len, reverse=True)
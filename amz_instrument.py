@@ -0,0 +1,159 @@
+import collections
+import contextlib
+import functools
+import json
+import threading
+import time
+
+# Upper bucket bounds in milliseconds; the last bucket is everything slower
+BUCKETS_MS = (0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+# A frame at 60 Hz: a main-thread call longer than this stalls the UI
+SLOW_MS = 16.0
+
+# Methods wrapped by instrument_core: all I/O plus the heavier in-memory work
+CORE_METHODS = ('load_questions', 'load_experiences', 'load_lp_matrix', 'load_interview_framework',
+                'load_practice', 'build_search_index', 'save_questions', 'save_question', 'delete_question',
+                'save_experiences', 'save_experience', 'delete_experience', 'save_lp_matrix', 'set_story',
+                'save_interview_framework', 'record_review', 'next_card', 'due_cards', 'search',
+                'build_duplicate_index', 'similar_questions', 'near_duplicates', 'build_recommender',
+                'recommend_experiences', 'build_analytics', 'progress', 'plan_session', 'questions_with_lps')
+
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total', 'max', 'slow', 'main_thread')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0  # ms
+        self.max = 0.0
+        self.slow = 0  # main-thread calls over SLOW_MS
+        self.main_thread = 0
+
+    def add(self, ms, main_thread):
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and ms > BUCKETS_MS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        if main_thread:
+            self.main_thread += 1
+            if ms > SLOW_MS:
+                self.slow += 1
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile (max for the
+        # open-ended last bucket)
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[bucket], self.max) if bucket < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'max_ms': round(self.max, 3),
+            'main_thread_calls': self.main_thread,
+            'slow_calls': self.slow,
+            'buckets': {(f"<={bound}ms" if idx < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}ms"): count
+                        for idx, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if count},
+        }
+
+
+class Instrumentation:
+    # Opt-in per-call latency histograms. wrap() replaces methods on one
+    # instance with timing wrappers, so nothing is paid unless it is enabled;
+    # it must run before the methods are handed to Tk as callbacks. Calls on
+    # the main thread slower than SLOW_MS are also kept in a short list.
+    def __init__(self, keep_slow=200):
+        self.histograms = {}
+        self.slow_calls = collections.deque(maxlen=keep_slow)  # (wall time, name, ms)
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        ms = seconds * 1000
+        main_thread = threading.current_thread() is threading.main_thread()
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(ms, main_thread)
+            if main_thread and ms > SLOW_MS:
+                self.slow_calls.append((time.time(), name, ms))
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def wrap(self, obj, names, label=None):
+        # Time every call of obj.<name>; recorded as "<label>.<name>"
+        label = label or type(obj).__name__
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is None or getattr(method, 'instrumented', False):
+                continue
+            setattr(obj, name, self.wrapper(method, f"{label}.{name}"))
+
+    def wrapper(self, fn, name):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started)
+        timed.instrumented = True
+        return timed
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.slow_calls.clear()
+            self.started = time.time()
+
+    def report(self):
+        with self.lock:
+            stats = {name: h.as_dict() for name, h in self.histograms.items()}
+            slow = list(self.slow_calls)
+        return {
+            'since': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            'slow_threshold_ms': SLOW_MS,
+            'calls': dict(sorted(stats.items(), key=lambda item: -item[1]['total_ms'])),
+            'slow_calls': [{'time': time.strftime("%H:%M:%S", time.localtime(when)), 'name': name, 'ms': round(ms, 2)}
+                           for when, name, ms in slow],
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def format_table(self):
+        lines = [f"{'call':<44} {'count':>7} {'mean':>8} {'p95':>8} {'max':>8} {'>16ms':>6}"]
+        for name, s in self.report()['calls'].items():
+            lines.append(f"{name:<44} {s['count']:>7} {s['mean_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                         f"{s['max_ms']:>8.2f} {s['slow_calls']:>6}")
+        return "\n".join(lines)
+
+
+def instrument_core(instrumentation, core):
+    instrumentation.wrap(core, CORE_METHODS, 'core')
+    # write_* run on the persistence thread when writes are in the background
+    instrumentation.wrap(core.storage, ('load', 'save', 'update', 'update_many', 'load_practice_events',
+                                        'append_practice_event', 'flush', 'write_store', 'write_rows',
+                                        'write_events'), f"storage[{core.storage.name}]")
@@ -1,81 +1,169 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import json
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 import os
 import random
 import threading
-import pyaudio
-import wave
-import datetime
+import argparse
+import sys
+import time
+import contextlib
+import math
+
+from amz_storage import open_storage
+from amz_core import InterviewPrepCore, LoadError
+from amz_transfer import read_records, write_records
+from amz_instrument import Instrumentation, instrument_core
+from amz_widgets import VirtualTreeview
+from amz_audio import AudioEngine, RecordingArchive
+from amz_speech import new_analyzer, describe as describe_speech
+from amz_duplicates import DEFAULT_THRESHOLD
+from amz_session import MockSession, SESSION_QUESTIONS
+from amz_scheduler import GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY
+
+SUGGESTIONS = 5  # experiences suggested in the question editor
+PROGRESS_REFRESH_MS = 60000  # due counts and streaks move with the clock
+PROGRESS_DAYS = 14  # days in the Progress tab's review sparkline
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+SESSION_TICK_MS = 250  # mock-interview countdown refresh
+
+# Tk callbacks and other main-thread work timed with --instrument
+UI_HANDLERS = ('on_tab_changed', 'poll_tab_load', 'load_data',
+               'create_question_bank', 'create_experience_library', 'create_lp_matrix',
+               'create_interview_framework', 'create_practice_tab', 'create_progress_tracking', 'refresh_progress',
+               'on_question_search', 'run_question_search', 'update_question_tree', 'on_question_select',
+               'edit_question', 'delete_question', 'open_question_editor', 'save_question',
+               'step_import', 'finish_import', 'export_questions', 'check_question_duplicates',
+               'update_experience_suggestions',
+               'open_duplicates_report', 'poll_duplicates_report',
+               'on_experience_select', 'save_experience', 'delete_experience', 'update_experience_listbox',
+               'update_lp_matrix_tree', 'on_lp_matrix_double_click', 'open_lp_story_editor', 'save_lp_story',
+               'save_interview_framework', 'start_practice', 'next_flashcard_content', 'grade_flashcard',
+               'finish_review', 'show_flashcard', 'start_recording', 'stop_recording', 'play_recording',
+               'start_mock_interview', 'show_session_question', 'prefetch_next_card', 'tick_session', 'end_session')
+
+
+def days_text(count):
+    return f"{count} day" if count == 1 else f"{count} days"
+
+
+class StartupProfiler:
+    # Collects per-phase timings for --profile-startup
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases = []
+        self.reported = False
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.phases.append((name, time.perf_counter() - started, threading.current_thread().name))
+
+    def report(self, milestone, out=sys.stderr):
+        if not self.enabled:
+            return
+        print(f"startup profile ({milestone} after {(time.perf_counter() - self.start) * 1000:.1f} ms):", file=out)
+        for name, seconds, thread_name in self.phases:
+            where = "" if thread_name == 'MainThread' else f"  [{thread_name}]"
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms{where}", file=out)
+        self.phases = []
+
 
 class AmazonInterviewPrep:
-    def __init__(self, root):
+    def __init__(self, root, storage=None, profiler=None, recording_archive=None, instrumentation=None,
+                 audio_engine=None):
         self.root = root
+        self.profiler = profiler if profiler is not None else StartupProfiler()
+        # One WAV file per practice attempt, indexed by question id
+        self.recording_archive = recording_archive if recording_archive is not None else RecordingArchive(analyzer=new_analyzer)
+        # PortAudio is opened once, on the engine's thread, and kept warm
+        self.audio = audio_engine if audio_engine is not None else AudioEngine(self.recording_archive)
         self.root.title("Amazon Interview Preparation Tool")
         self.root.geometry("1200x1000")
 
-        # Full list of Amazon Leadership Principles
-        self.leadership_principles = [
-            "Customer Obsession",
-            "Ownership",
-            "Invent and Simplify",
-            "Are Right, A Lot",
-            "Learn and Be Curious",
-            "Hire and Develop the Best",
-            "Insist on the Highest Standards",
-            "Think Big",
-            "Bias for Action",
-            "Frugality",
-            "Earn Trust",
-            "Dive Deep",
-            "Have Backbone; Disagree and Commit",
-            "Deliver Results",
-            "Strive to be Earth's Best Employer",
-            "Success and Scale Bring Broad Responsibility"
-        ]
-
-        # Initialize data structures
-        self.experiences = []
-        self.questions = []
-        self.practice_history = {}
-        self.lp_matrix_data = {}
-        self.interview_framework = {}
-
-        self.load_experiences()
-        self.load_questions()
-        self.load_practice_history()
-        self.load_lp_matrix_data()
-        self.load_interview_framework()
+        # All data logic lives in the headless core (shared with amz_cli);
+        # this class only renders it and reports its errors
+        self.core = InterviewPrepCore(storage)
+        self.storage = self.core.storage
+        self.leadership_principles = self.core.leadership_principles
+
+        # Opt-in latency histograms; methods are wrapped before any of them
+        # is handed to Tk as a callback. F12 opens the debug panel.
+        self.instrumentation = instrumentation
+        self.debug_window = None
+        self.duplicates_window = None
+        if instrumentation is not None:
+            instrument_core(instrumentation, self.core)
+            instrumentation.wrap(self.recording_archive, ('load_index', 'start', 'finish'), 'archive')
+            instrumentation.wrap(self.audio, ('start_recording', 'stop_recording', 'play'), 'audio')
+            instrumentation.wrap(self, UI_HANDLERS, 'ui')
+            self.root.bind('<F12>', self.open_debug_panel)
+
+        # Data sets are loaded on a worker thread the first time a tab needs
+        # them; dependencies are loaded first.
+        self.data_loaders = {
+            'questions': self.core.load_questions,
+            'experiences': self.core.load_experiences,
+            'lp_matrix': self.core.load_lp_matrix,
+            'interview_framework': self.core.load_interview_framework,
+            'practice': self.load_practice_data,
+            'search': self.core.build_search_index,
+            'duplicates': self.core.build_duplicate_index,
+            'recommender': self.core.build_recommender,
+        }
+        self.data_dependencies = {'practice': ['questions'], 'search': ['questions'], 'duplicates': ['questions'],
+                                  'recommender': ['experiences', 'lp_matrix']}
+        self.loaded_data = set()
+        self.data_locks = {name: threading.Lock() for name in self.data_loaders}
+        self.load_errors = []
+        self.loading_status = ""
 
-        self.create_gui()
+        with self.profiler.phase("create_gui"):
+            self.create_gui()
 
     def create_gui(self):
-        # Create notebook for tabs
+        # Create notebook for tabs. Tabs start empty and are built the first
+        # time they are shown, once the data they need has been loaded.
         self.notebook = ttk.Notebook(self.root)
 
         # Question Bank Tab
         self.question_bank_frame = ttk.Frame(self.notebook)
-        self.create_question_bank(self.question_bank_frame)
 
         # Experience Library Tab
         self.experience_frame = ttk.Frame(self.notebook)
-        self.create_experience_library(self.experience_frame)
 
         # LP Story Matrix Tab
         self.lp_matrix_frame = ttk.Frame(self.notebook)
-        self.create_lp_matrix(self.lp_matrix_frame)
 
         # Interview Framework Tab
         self.interview_framework_frame = ttk.Frame(self.notebook)
-        self.create_interview_framework(self.interview_framework_frame)
 
         # Practice Tab
         self.practice_frame = ttk.Frame(self.notebook)
-        self.create_practice_tab(self.practice_frame)
 
         # Progress Tracking Tab
         self.progress_frame = ttk.Frame(self.notebook)
-        self.create_progress_tracking(self.progress_frame)
+
+        # Tab name -> (frame, builder, data sets it needs)
+        self.tabs = {
+            'question_bank': (self.question_bank_frame, self.create_question_bank, ['questions', 'experiences']),
+            'experience': (self.experience_frame, self.create_experience_library, ['experiences']),
+            'lp_matrix': (self.lp_matrix_frame, self.create_lp_matrix, ['experiences', 'lp_matrix']),
+            'interview_framework': (self.interview_framework_frame, self.create_interview_framework, ['interview_framework']),
+            'practice': (self.practice_frame, self.create_practice_tab, ['questions', 'practice']),
+            'progress': (self.progress_frame, self.create_progress_tracking, ['questions', 'practice']),
+        }
+        # Tab name -> data sets built on a loader thread once the tab is
+        # shown; the tab checks loaded_data before using them
+        self.background_data = {
+            'question_bank': ['search', 'duplicates', 'recommender'],
+        }
+        self.built_tabs = set()
+        self.loading_tabs = set()
 
         # Add tabs to notebook
         self.notebook.add(self.question_bank_frame, text="Question Bank")
@@ -86,6 +174,129 @@ class AmazonInterviewPrep:
         self.notebook.add(self.progress_frame, text="Progress Tracking")
 
         self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.root.after_idle(self.on_tab_changed)
+
+        # Background persistence status and write errors
+        self.persistence_label = ttk.Label(self.root, text="", anchor='w')
+        self.persistence_label.pack(fill='x', padx=5)
+        if getattr(self.storage, 'worker', None) is not None:
+            self.root.after(1000, self.poll_persistence)
+
+    def poll_persistence(self):
+        worker = self.storage.worker
+        for message in worker.drain_errors():
+            messagebox.showerror("Error", message)
+        state = "Saving..." if worker.pending or worker.busy else "All changes saved."
+        self.persistence_label.config(text=f"{state}  {worker.writes} writes, {worker.coalesced} coalesced")
+        self.root.after(1000, self.poll_persistence)
+
+    # ----------------------- Lazy Loading -----------------------
+    def on_tab_changed(self, event=None):
+        selected = self.notebook.select()
+        for name, (frame, builder, data) in self.tabs.items():
+            if str(frame) == selected:
+                self.open_tab(name)
+
+    def open_tab(self, name):
+        if name in self.built_tabs or name in self.loading_tabs:
+            return
+        frame, builder, data = self.tabs[name]
+        self.loading_tabs.add(name)
+
+        # Progress indicator while the tab's data loads
+        placeholder = ttk.Frame(frame)
+        placeholder.pack(expand=True)
+        status_label = ttk.Label(placeholder, text="Loading...")
+        status_label.pack(pady=5)
+        progress = ttk.Progressbar(placeholder, mode='indeterminate', length=300)
+        progress.pack(pady=5)
+        progress.start(15)
+
+        worker = threading.Thread(target=self.load_data, args=(data,), name=f"load-{name}", daemon=True)
+        worker.start()
+        self.poll_tab_load(name, worker, placeholder, status_label)
+
+    def poll_tab_load(self, name, worker, placeholder, status_label):
+        if worker.is_alive():
+            status_label.config(text=self.loading_status or "Loading...")
+            self.root.after(30, self.poll_tab_load, name, worker, placeholder, status_label)
+            return
+        placeholder.destroy()
+        frame, builder, data = self.tabs[name]
+        with self.profiler.phase(f"build tab {name}"):
+            builder(frame)
+        self.loading_tabs.discard(name)
+        self.built_tabs.add(name)
+        self.load_in_background(self.background_data.get(name, []))
+        while self.load_errors:
+            messagebox.showerror("Error", self.load_errors.pop(0))
+        if not self.profiler.reported:
+            self.profiler.reported = True
+            self.root.update_idletasks()
+            self.profiler.report("first tab ready")
+        else:
+            self.profiler.report(f"tab {name} ready")
+
+    def load_data(self, names):
+        # Runs on a loader thread; each data set is loaded once. Each has its
+        # own lock (taken after its dependencies are loaded, so never two at
+        # a time), so a tab does not wait for another tab's background index.
+        for name in names:
+            if name in self.loaded_data:
+                continue
+            self.load_data(self.data_dependencies.get(name, []))
+            with self.data_locks[name]:
+                if name in self.loaded_data:
+                    continue
+                self.loading_status = f"Loading {name.replace('_', ' ')}..."
+                with self.profiler.phase(f"load {name}"):
+                    try:
+                        self.data_loaders[name]()
+                    except LoadError as e:
+                        self.show_error(str(e))
+                self.loaded_data.add(name)
+        self.loading_status = ""
+
+    def load_in_background(self, names):
+        # The tab is already usable; edits made while these build are
+        # replayed onto them when they are done
+        names = [name for name in names if name not in self.loaded_data]
+        if not names:
+            return
+        self.core.track_changes()
+        worker = threading.Thread(target=self.load_data, args=(names,), name="load-background", daemon=True)
+        worker.start()
+        self.poll_background_load(worker)
+
+    def poll_background_load(self, worker):
+        if worker.is_alive():
+            self.root.after(100, self.poll_background_load, worker)
+            return
+        self.core.catch_up_indexes()
+        if self.question_search_var.get().strip():
+            self.update_question_tree()  # typed before the search index was ready
+        while self.load_errors:
+            messagebox.showerror("Error", self.load_errors.pop(0))
+
+    def try_lock_data(self, names):
+        # The locks of `names`, or None (holding none) if a loader has one
+        held = []
+        for name in names:
+            if not self.data_locks[name].acquire(blocking=False):
+                for lock in held:
+                    lock.release()
+                return None
+            held.append(self.data_locks[name])
+        return held
+
+    def show_error(self, message):
+        # Loaders run on a worker thread and Tk may only be used from the
+        # main one, so their errors are shown once the tab is built
+        if threading.current_thread() is threading.main_thread():
+            messagebox.showerror("Error", message)
+        else:
+            self.load_errors.append(message)
 
     # ----------------------- Question Bank -----------------------
     def create_question_bank(self, parent):
@@ -95,11 +306,26 @@ class AmazonInterviewPrep:
         # Question List
         ttk.Label(main_frame, text="Question Bank", font=('Helvetica', 16)).pack(pady=10)
 
-        self.question_tree = ttk.Treeview(main_frame, columns=('Question', 'LPs'), show='headings')
+        # Search
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill='x', pady=5)
+        ttk.Label(search_frame, text="Search:").pack(side='left', padx=5)
+        self.question_search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.question_search_var, width=60)
+        search_entry.pack(side='left', padx=5)
+        search_entry.bind('<KeyRelease>', self.on_question_search)
+        ttk.Label(search_frame, text='terms are ANDed; use OR, prefix*, lp:"Dive Deep", exp:"<title>"').pack(side='left', padx=5)
+        self.search_status = ttk.Label(search_frame, text="")
+        self.search_status.pack(side='left', padx=5)
+        self.question_search_job = None
+
+        # Only the rows in view are materialized; iids are question ids
+        self.question_list = VirtualTreeview(main_frame, ('Question', 'LPs'), self.question_row_values)
+        self.question_list.pack(fill='both', expand=True)
+        self.question_tree = self.question_list.tree
         self.question_tree.heading('Question', text='Question')
         self.question_tree.heading('LPs', text='Leadership Principles')
-        self.question_tree.pack(fill='both', expand=True)
-        self.question_tree.bind('<<TreeviewSelect>>', self.on_question_select)
+        self.question_tree.bind('<<TreeviewSelect>>', self.on_question_select, add='+')
 
         # Buttons
         button_frame = ttk.Frame(main_frame)
@@ -107,21 +333,57 @@ class AmazonInterviewPrep:
         ttk.Button(button_frame, text="Add Question", command=self.add_question).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Edit Question", command=self.edit_question).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Delete Question", command=self.delete_question).pack(side='left', padx=5)
+        self.import_button = ttk.Button(button_frame, text="Import...", command=self.import_questions)
+        self.import_button.pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Export...", command=self.export_questions).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Find Duplicates...", command=self.open_duplicates_report).pack(side='left', padx=5)
+        self.import_status = ttk.Label(main_frame, text="")
+        self.import_status.pack()
 
         # Load questions
         self.update_question_tree()
 
+    def on_question_search(self, event):
+        # Debounce so a burst of keystrokes runs one query
+        if self.question_search_job is not None:
+            self.root.after_cancel(self.question_search_job)
+        self.question_search_job = self.root.after(150, self.run_question_search)
+
+    def run_question_search(self):
+        self.question_search_job = None
+        self.update_question_tree()
+
+    def visible_question_ids(self):
+        # The whole bank until the search index, built in the background, is ready
+        query = self.question_search_var.get().strip()
+        if query and 'search' not in self.loaded_data:
+            self.search_status.config(text="Indexing questions for search...")
+            return self.core.search_ids("")
+        self.search_status.config(text="")
+        return self.core.search_ids(query)
+
+    def question_row_values(self, qid):
+        question = self.core.question_index[qid]
+        return (question['question'], ", ".join(question.get('leadership_principles', [])))
+
     def update_question_tree(self):
-        for item in self.question_tree.get_children():
-            self.question_tree.delete(item)
-        for idx, question in enumerate(self.questions):
-            lp_str = ", ".join(question.get('leadership_principles', []))
-            self.question_tree.insert('', 'end', iid=idx, values=(question['question'], lp_str))
+        self.question_list.set_rows(self.visible_question_ids())
+
+    def refresh_question_row(self, qid, is_new=False):
+        # Diff update after one question was saved: touch only its row
+        # (a search result list is re-queried instead, since the edit may
+        # change whether the question matches)
+        if self.question_search_var.get().strip():
+            self.update_question_tree()
+        elif is_new:
+            self.question_list.insert_row(qid)
+        else:
+            self.question_list.update_row(qid)
 
     def on_question_select(self, event):
         selected = self.question_tree.focus()
         if selected:
-            self.current_question_index = int(selected)
+            self.current_question_id = selected
 
     def add_question(self):
         self.open_question_editor()
@@ -129,23 +391,22 @@ class AmazonInterviewPrep:
     def edit_question(self):
         selected = self.question_tree.focus()
         if selected:
-            idx = int(selected)
-            question = self.questions[idx]
-            self.open_question_editor(question, idx)
+            self.open_question_editor(self.core.question_index[selected])
         else:
             messagebox.showerror("Error", "Please select a question to edit.")
 
     def delete_question(self):
         selected = self.question_tree.focus()
         if selected:
-            idx = int(selected)
-            del self.questions[idx]
-            self.save_questions()
-            self.update_question_tree()
+            self.core.delete_question(selected)
+            self.question_list.delete_row(selected)
+            if 'progress' in self.built_tabs:
+                self.progress_list.delete_row(selected)
+                self.refresh_progress()
         else:
             messagebox.showerror("Error", "Please select a question to delete.")
 
-    def open_question_editor(self, question=None, idx=None):
+    def open_question_editor(self, question=None):
         # Create a new window for question editing
         self.question_editor_window = tk.Toplevel(self.root)
         self.question_editor_window.title("Question Editor")
@@ -158,11 +419,17 @@ class AmazonInterviewPrep:
         self.question_var = tk.StringVar()
         self.question_entry = ttk.Entry(self.question_editor_window, textvariable=self.question_var, width=100)
         self.question_entry.pack(fill='x', padx=10, pady=5)
+        # Warns while typing if the bank already has this question reworded
+        self.duplicate_warning = ttk.Label(self.question_editor_window, text="", foreground='#b35c00', wraplength=760)
+        self.duplicate_warning.pack(anchor='nw', padx=10)
+        self.duplicate_check_job = None
+        self.question_entry.bind('<KeyRelease>', lambda event: self.on_question_text_changed(question))
 
         # Answer
         ttk.Label(self.question_editor_window, text="Answer:").pack(anchor='nw', padx=10)
         self.answer_text = scrolledtext.ScrolledText(self.question_editor_window, height=8)
         self.answer_text.pack(fill='both', expand=True, padx=10, pady=5)
+        self.answer_text.bind('<KeyRelease>', self.update_experience_suggestions)
 
         # Key Points
         ttk.Label(self.question_editor_window, text="Key Points:").pack(anchor='nw', padx=10)
@@ -171,14 +438,22 @@ class AmazonInterviewPrep:
 
         # Associated Experiences
         ttk.Label(self.question_editor_window, text="Associated Experiences:").pack(anchor='nw', padx=10)
+        # Best-fitting experiences for the text and LPs so far; a click ticks one
+        suggestion_frame = ttk.Frame(self.question_editor_window)
+        suggestion_frame.pack(fill='x', padx=10)
+        ttk.Label(suggestion_frame, text="Suggested:").pack(side='left')
+        self.suggestion_buttons = []
+        for _ in range(SUGGESTIONS):
+            button = ttk.Button(suggestion_frame, text="")
+            self.suggestion_buttons.append(button)
         self.experience_vars = {}
         exp_frame = ttk.Frame(self.question_editor_window)
         exp_frame.pack(fill='both', expand=True, padx=10, pady=5)
-        for exp in self.experiences:
+        for exp in self.core.experiences:
             var = tk.BooleanVar()
             cb = ttk.Checkbutton(exp_frame, text=exp['title'], variable=var)
             cb.pack(anchor='w')
-            self.experience_vars[exp['title']] = var
+            self.experience_vars[exp['id']] = var
 
         # Leadership Principles
         ttk.Label(self.question_editor_window, text="Leadership Principles:").pack(anchor='nw', padx=10)
@@ -187,14 +462,14 @@ class AmazonInterviewPrep:
         lp_frame.pack(fill='both', expand=True, padx=10, pady=5)
         for lp in self.leadership_principles:
             var = tk.BooleanVar()
-            cb = ttk.Checkbutton(lp_frame, text=lp, variable=var)
+            cb = ttk.Checkbutton(lp_frame, text=lp, variable=var, command=self.update_experience_suggestions)
             cb.pack(anchor='w')
             self.lp_vars[lp] = var
 
         # Buttons
         button_frame = ttk.Frame(self.question_editor_window)
         button_frame.pack(pady=10)
-        ttk.Button(button_frame, text="Save", command=lambda: self.save_question(idx)).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Save", command=lambda: self.save_question(question['id'] if question else None)).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.question_editor_window.destroy).pack(side='left', padx=5)
 
         # Load question data if editing
@@ -202,12 +477,13 @@ class AmazonInterviewPrep:
             self.question_var.set(question['question'])
             self.answer_text.insert('1.0', question.get('answer', ''))
             self.keypoints_text.insert('1.0', '\n'.join(question.get('key_points', [])))
-            for exp_title in question.get('experiences', []):
-                if exp_title in self.experience_vars:
-                    self.experience_vars[exp_title].set(True)
+            for exp_id in question.get('experiences', []):
+                if exp_id in self.experience_vars:
+                    self.experience_vars[exp_id].set(True)
             for lp in question.get('leadership_principles', []):
                 if lp in self.lp_vars:
                     self.lp_vars[lp].set(True)
+            self.check_question_duplicates(question)
         else:
             # Clear fields for new question
             self.question_var.set("")
@@ -217,18 +493,46 @@ class AmazonInterviewPrep:
                 var.set(False)
             for var in self.lp_vars.values():
                 var.set(False)
-
-    def save_question(self, idx=None):
+        self.update_experience_suggestions()
+
+    def on_question_text_changed(self, question):
+        self.update_experience_suggestions()
+        # Debounced like the search box
+        if self.duplicate_check_job is not None:
+            self.root.after_cancel(self.duplicate_check_job)
+        self.duplicate_check_job = self.root.after(300, self.check_question_duplicates, question)
+
+    def check_question_duplicates(self, question=None):
+        self.duplicate_check_job = None
+        if 'duplicates' not in self.loaded_data:
+            return  # still being indexed in the background
+        matches = self.core.similar_questions(self.question_var.get(), limit=3,
+                                              exclude=question['id'] if question else None)
+        self.duplicate_warning.config(text="Similar questions already in the bank:\n" + "\n".join(
+            f"  {score:.0%}  {match['question']}" for match, score in matches) if matches else "")
+
+    def update_experience_suggestions(self, event=None):
+        # Cheap enough to run on every keystroke: only experiences sharing a
+        # term or an LP with the question are scored
+        for button in self.suggestion_buttons:
+            button.pack_forget()
+        if 'recommender' not in self.loaded_data:
+            return  # still being built in the background
+        text = self.question_var.get() + " " + self.answer_text.get('1.0', tk.END)
+        lps = [lp for lp, var in self.lp_vars.items() if var.get()]
+        for button, (experience, score) in zip(self.suggestion_buttons,
+                                               self.core.recommend_experiences(text, lps, SUGGESTIONS)):
+            button.config(text=f"{experience['title']} ({score:.0%})",
+                          command=lambda exp_id=experience['id']: self.experience_vars[exp_id].set(True))
+            button.pack(side='left', padx=2)
+
+    def save_question(self, question_id=None):
         question_text = self.question_var.get().strip()
         answer_text = self.answer_text.get('1.0', tk.END).strip()
         key_points = [kp.strip() for kp in self.keypoints_text.get('1.0', tk.END).strip().split('\n') if kp.strip()]
-        experiences = [title for title, var in self.experience_vars.items() if var.get()]
+        experiences = [exp_id for exp_id, var in self.experience_vars.items() if var.get()]
         leadership_principles = [lp for lp, var in self.lp_vars.items() if var.get()]
 
-        if not question_text:
-            messagebox.showerror("Error", "Please enter a question.")
-            return
-
         question_data = {
             'question': question_text,
             'answer': answer_text,
@@ -237,29 +541,167 @@ class AmazonInterviewPrep:
             'leadership_principles': leadership_principles
         }
 
-        if idx is not None:
-            self.questions[idx] = question_data
-        else:
-            self.questions.append(question_data)
+        try:
+            question = self.core.save_question(question_data, question_id)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-        self.save_questions()
-        self.update_question_tree()
+        self.refresh_question_row(question['id'], is_new=question_id is None)
+        if 'progress' in self.built_tabs:
+            if question_id is None:
+                self.progress_list.insert_row(question['id'])
+            else:
+                self.progress_list.update_row(question['id'])
+            self.refresh_progress()
+        if 'practice' in self.built_tabs:
+            # Cached card faces would show the old text
+            self.prefetched = None
+            if self.current_flashcard is not None and self.current_flashcard['id'] == question['id']:
+                self.current_view = self.flashcard_view(question)
+                self.update_flashcard_display()
         self.question_editor_window.destroy()
 
-    def load_questions(self):
+    def open_duplicates_report(self):
+        if self.duplicates_window is not None and self.duplicates_window.winfo_exists():
+            self.duplicates_window.lift()
+            return
+        self.duplicates_window = tk.Toplevel(self.root)
+        self.duplicates_window.title("Near-Duplicate Questions")
+        self.duplicates_window.geometry("1000x600")
+
+        controls = ttk.Frame(self.duplicates_window)
+        controls.pack(fill='x', padx=10, pady=5)
+        ttk.Label(controls, text="Minimum similarity:").pack(side='left', padx=5)
+        self.duplicate_threshold_var = tk.StringVar(value=str(DEFAULT_THRESHOLD))
+        ttk.Spinbox(controls, from_=0.5, to=1.0, increment=0.05, width=6,
+                    textvariable=self.duplicate_threshold_var).pack(side='left', padx=5)
+        self.find_duplicates_button = ttk.Button(controls, text="Find", command=self.find_duplicates)
+        self.find_duplicates_button.pack(side='left', padx=5)
+        self.duplicates_status = ttk.Label(controls, text="")
+        self.duplicates_status.pack(side='left', padx=10)
+
+        columns = ('Similarity', 'Question', 'Similar Question')
+        self.duplicates_tree = ttk.Treeview(self.duplicates_window, columns=columns, show='headings')
+        for col, width in zip(columns, (90, 450, 450)):
+            self.duplicates_tree.heading(col, text=col)
+            self.duplicates_tree.column(col, width=width)
+        self.duplicates_tree.pack(fill='both', expand=True, padx=10, pady=5)
+        # Double-click edits the later (usually the imported) question
+        self.duplicates_tree.bind('<Double-1>', self.on_duplicate_double_click)
+        self.duplicate_pairs = {}
+        self.find_duplicates()
+
+    def find_duplicates(self):
         try:
-            if os.path.exists("questions.json"):
-                with open("questions.json", "r", encoding='utf-8') as f:
-                    self.questions = json.load(f)
-            else:
-                self.questions = []
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load questions: {str(e)}")
-            self.questions = []
-
-    def save_questions(self):
-        with open("questions.json", "w", encoding='utf-8') as f:
-            json.dump(self.questions, f, ensure_ascii=False, indent=2)
+            threshold = float(self.duplicate_threshold_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a similarity between 0 and 1.")
+            return
+        self.find_duplicates_button.config(state='disabled')
+        self.duplicates_status.config(text="Comparing questions...")
+        # Vectorized, but seconds on a large bank: run it off the UI thread
+        job = {'pairs': None, 'error': None}
+
+        def run():
+            try:
+                job['pairs'] = self.core.near_duplicates(threshold)
+            except ImportError as e:
+                job['error'] = f"Finding duplicates needs NumPy: {str(e)}"
+
+        worker = threading.Thread(target=run, name="near-duplicates", daemon=True)
+        worker.start()
+        self.poll_duplicates_report(worker, job, threshold)
+
+    def poll_duplicates_report(self, worker, job, threshold):
+        if worker.is_alive():
+            self.root.after(100, self.poll_duplicates_report, worker, job, threshold)
+            return
+        if not self.duplicates_window.winfo_exists():
+            return
+        self.find_duplicates_button.config(state='normal')
+        if job['error']:
+            self.duplicates_status.config(text="")
+            messagebox.showerror("Error", job['error'])
+            return
+        self.duplicates_tree.delete(*self.duplicates_tree.get_children())
+        self.duplicate_pairs = {}
+        for a, b, score in job['pairs']:
+            iid = self.duplicates_tree.insert('', 'end', values=(f"{score:.0%}", a['question'], b['question']))
+            self.duplicate_pairs[iid] = b['id']
+        self.duplicates_status.config(text=f"{len(job['pairs'])} pairs at {threshold:.0%} or more")
+
+    def on_duplicate_double_click(self, event):
+        qid = self.duplicate_pairs.get(self.duplicates_tree.focus())
+        if qid in self.core.question_index:
+            self.open_question_editor(self.core.question_index[qid])
+
+    def import_questions(self):
+        path = filedialog.askopenfilename(title="Import Questions",
+                                          filetypes=[("Question files", "*.jsonl *.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        overwrite = messagebox.askyesno("Import Questions", "Overwrite questions that are already in the bank?\n"
+                                                            "Choose No to skip them.")
+        steps = self.core.iter_import(read_records(path), 'update' if overwrite else 'skip', batch_size=500)
+        self.import_button.config(state='disabled')
+        self.import_stats = None
+        self.step_import(steps)
+
+    def step_import(self, steps):
+        # One batch per event-loop turn so the window stays responsive; wait
+        # while a loader thread holds the data the import changes (indexes
+        # building in the background catch up afterwards)
+        held = self.try_lock_data(['questions', 'experiences', 'practice'])
+        if held is None:
+            self.root.after(50, self.step_import, steps)
+            return
+        try:
+            self.import_stats = next(steps)
+        except StopIteration:
+            self.finish_import()
+            return
+        except (OSError, ValueError) as e:
+            self.finish_import(f"Import failed: {str(e)}")
+            return
+        finally:
+            for lock in held:
+                lock.release()
+        stats = self.import_stats
+        self.import_status.config(text=f"Importing: {stats['read']} read, {stats['added']} added, "
+                                       f"{stats['updated']} updated, {stats['duplicates']} duplicates, "
+                                       f"{stats['invalid']} invalid")
+        self.root.after(1, self.step_import, steps)
+
+    def finish_import(self, error=None):
+        self.import_button.config(state='normal')
+        self.import_status.config(text="")
+        self.update_question_tree()
+        if 'progress' in self.built_tabs:
+            self.progress_list.set_rows(self.core.question_ids())
+            self.refresh_progress()
+        if error:
+            messagebox.showerror("Error", error)
+        stats = self.import_stats
+        if stats is None:
+            return
+        message = (f"Added {stats['added']} and updated {stats['updated']} questions.\n"
+                   f"Skipped {stats['duplicates']} duplicates and {stats['invalid']} invalid records.")
+        if stats['errors']:
+            message += "\n\n" + "\n".join(stats['errors'][:10])
+        messagebox.showinfo("Import Questions", message)
+
+    def export_questions(self):
+        path = filedialog.asksaveasfilename(title="Export Questions", defaultextension=".jsonl",
+                                            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            count = write_records(map(self.core.portable_question, self.core.questions), path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Export failed: {str(e)}")
+            return
+        messagebox.showinfo("Export Questions", f"Exported {count} questions.")
 
     # ----------------------- Experience Library -----------------------
     def create_experience_library(self, parent):
@@ -276,6 +718,7 @@ class AmazonInterviewPrep:
         self.exp_listbox = tk.Listbox(exp_list_frame)
         self.exp_listbox.pack(fill='y', expand=True)
         self.exp_listbox.bind('<<ListboxSelect>>', self.on_experience_select)
+        self.current_exp_id = None  # selected experience; None while creating one
 
         # Add experiences to listbox
         self.update_experience_listbox()
@@ -308,14 +751,14 @@ class AmazonInterviewPrep:
 
     def update_experience_listbox(self):
         self.exp_listbox.delete(0, tk.END)
-        for exp in self.experiences:
+        for exp in self.core.experiences:
             self.exp_listbox.insert(tk.END, exp['title'])
 
     def on_experience_select(self, event):
         selection = event.widget.curselection()
         if selection:
-            self.current_exp_index = selection[0]
-            experience = self.experiences[self.current_exp_index]
+            experience = self.core.experiences[selection[0]]
+            self.current_exp_id = experience['id']
             self.load_experience_details(experience)
         else:
             self.clear_experience_form()
@@ -326,64 +769,48 @@ class AmazonInterviewPrep:
         self.exp_desc_text.insert('1.0', experience['description'])
 
     def save_experience(self):
+        # Saves the selected experience, renaming it if the title was
+        # edited; with nothing selected a new one is created
         title = self.exp_title_var.get().strip()
         description = self.exp_desc_text.get('1.0', tk.END).strip()
 
-        if not title:
-            messagebox.showerror("Error", "Please enter a title for the experience.")
+        try:
+            experience, is_new = self.core.save_experience(title, description, self.current_exp_id)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
+        self.current_exp_id = experience['id']
+        if 'lp_matrix' in self.built_tabs:
+            if is_new:
+                self.add_lp_matrix_row(experience['id'])
+            elif self.matrix_tree.exists(experience['id']):
+                self.matrix_tree.set(experience['id'], 'Experience', experience['title'])
 
-        experience = {
-            'title': title,
-            'description': description
-        }
-
-        # Check if updating existing experience
-        for idx, exp in enumerate(self.experiences):
-            if exp['title'] == title:
-                self.experiences[idx] = experience
-                break
-        else:
-            self.experiences.append(experience)
-
-        self.save_experiences()
         self.update_experience_listbox()
         messagebox.showinfo("Success", "Experience saved successfully!")
 
     def delete_experience(self):
-        title = self.exp_title_var.get().strip()
-        if not title:
+        if self.current_exp_id is None:
             messagebox.showerror("Error", "Please select an experience to delete.")
             return
 
-        self.experiences = [exp for exp in self.experiences if exp['title'] != title]
-        self.save_experiences()
+        exp_id = self.current_exp_id
+        affected = self.core.delete_experience(exp_id)
+        if 'lp_matrix' in self.built_tabs:
+            self.remove_lp_matrix_row(exp_id)
+            self.update_lp_coverage()
+        if affected and 'question_bank' in self.built_tabs and self.question_search_var.get().strip():
+            # An exp: search may have matched the questions that lost it
+            self.update_question_tree()
         self.update_experience_listbox()
         self.clear_experience_form()
         messagebox.showinfo("Success", "Experience deleted successfully!")
 
     def clear_experience_form(self):
+        self.current_exp_id = None
         self.exp_title_var.set("")
         self.exp_desc_text.delete('1.0', tk.END)
 
-    def load_experiences(self):
-        try:
-            if os.path.exists("experiences.json"):
-                with open("experiences.json", "r", encoding='utf-8') as f:
-                    self.experiences = json.load(f)
-                # Ensure experiences are a list
-                if not isinstance(self.experiences, list):
-                    self.experiences = []
-            else:
-                self.experiences = []
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load experiences: {str(e)}")
-            self.experiences = []
-
-    def save_experiences(self):
-        with open("experiences.json", "w", encoding='utf-8') as f:
-            json.dump(self.experiences, f, ensure_ascii=False, indent=2)
-
     # ----------------------- LP Story Matrix -----------------------
     def create_lp_matrix(self, parent):
         main_frame = ttk.Frame(parent)
@@ -400,45 +827,63 @@ class AmazonInterviewPrep:
             self.matrix_tree.column(col, width=100, anchor='center')
 
         self.matrix_tree.pack(fill='both', expand=True)
+        self.matrix_tree.bind("<Double-1>", self.on_lp_matrix_double_click)
+
+        # LPs without any story
+        self.lp_gaps_label = ttk.Label(main_frame, text="", wraplength=1100)
+        self.lp_gaps_label.pack(pady=5)
 
         # Load data
         self.update_lp_matrix_tree()
 
     def update_lp_matrix_tree(self):
-        # Clear existing items
+        # Full rebuild, only needed at startup; single changes go through
+        # update_lp_matrix_cell / add_lp_matrix_row / remove_lp_matrix_row
         for item in self.matrix_tree.get_children():
             self.matrix_tree.delete(item)
-
-        # Populate the matrix
-        for exp in self.experiences:
-            exp_title = exp['title']
-            row = [exp_title]
-            for lp in self.leadership_principles:
-                # Check if there is a story for this experience and LP
-                key = f"{exp_title}-{lp}"
-                if key in self.lp_matrix_data:
-                    row.append("✓")
-                else:
-                    row.append("")
-            self.matrix_tree.insert('', 'end', values=row)
-
-        # Bind double-click event
-        self.matrix_tree.bind("<Double-1>", self.on_lp_matrix_double_click)
+        for exp in self.core.experiences:
+            self.add_lp_matrix_row(exp['id'])
+        self.update_lp_coverage()
+
+    def lp_matrix_row_values(self, exp_id):
+        return [self.core.experience_title(exp_id)] + ["✓" if self.core.lp_matrix.has_story(exp_id, lp) else ""
+                                                        for lp in self.leadership_principles]
+
+    def add_lp_matrix_row(self, exp_id):
+        # Rows use the experience id as iid, so a rename only relabels one
+        self.matrix_tree.insert('', 'end', iid=exp_id, values=self.lp_matrix_row_values(exp_id))
+
+    def remove_lp_matrix_row(self, exp_id):
+        if self.matrix_tree.exists(exp_id):
+            self.matrix_tree.delete(exp_id)
+
+    def update_lp_matrix_cell(self, exp_id, lp):
+        if self.matrix_tree.exists(exp_id):
+            self.matrix_tree.set(exp_id, lp, "✓" if self.core.lp_matrix.has_story(exp_id, lp) else "")
+        self.update_lp_coverage(lp)
+
+    def update_lp_coverage(self, lp=None):
+        # Column headings show how many experiences cover each LP
+        for name in [lp] if lp else self.leadership_principles:
+            self.matrix_tree.heading(name, text=f"{name} ({self.core.lp_matrix.coverage[name]})")
+        gaps = self.core.lp_matrix.gaps()
+        self.lp_gaps_label.config(text=f"LPs without a story: {', '.join(gaps)}" if gaps else "Every LP has at least one story.")
 
     def on_lp_matrix_double_click(self, event):
-        item = self.matrix_tree.selection()[0]
+        item = self.matrix_tree.identify_row(event.y)
         col = self.matrix_tree.identify_column(event.x)
+        if not item or not col:
+            return
         col_index = int(col.replace("#", "")) - 1  # Adjust for Treeview indexing
         if col_index == 0:
             return  # Ignore if clicked on the Experience column
 
-        exp_title = self.matrix_tree.item(item)['values'][0]
         lp = self.leadership_principles[col_index - 1]
+        self.open_lp_story_editor(item, lp)
 
-        self.open_lp_story_editor(exp_title, lp)
-
-    def open_lp_story_editor(self, exp_title, lp):
+    def open_lp_story_editor(self, exp_id, lp):
         # Open a new window to edit the story
+        exp_title = self.core.experience_title(exp_id)
         self.lp_story_window = tk.Toplevel(self.root)
         self.lp_story_window.title(f"Edit Story - {exp_title} - {lp}")
         self.lp_story_window.geometry("800x1000")
@@ -452,42 +897,20 @@ class AmazonInterviewPrep:
         self.lp_story_text.pack(fill='both', expand=True, padx=10, pady=5)
 
         # Load existing story if any
-        key = f"{exp_title}-{lp}"
-        if key in self.lp_matrix_data:
-            self.lp_story_text.insert('1.0', self.lp_matrix_data[key]['story'])
+        self.lp_story_text.insert('1.0', self.core.lp_matrix.get_story(exp_id, lp))
 
         # Buttons
         button_frame = ttk.Frame(self.lp_story_window)
         button_frame.pack(pady=10)
-        ttk.Button(button_frame, text="Save", command=lambda: self.save_lp_story(exp_title, lp)).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Save", command=lambda: self.save_lp_story(exp_id, lp)).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.lp_story_window.destroy).pack(side='left', padx=5)
 
-    def save_lp_story(self, exp_title, lp):
-        story_text = self.lp_story_text.get('1.0', tk.END).strip()
-        key = f"{exp_title}-{lp}"
-        self.lp_matrix_data[key] = {'story': story_text}
-        self.save_lp_matrix_data()
-        self.update_lp_matrix_tree()
+    def save_lp_story(self, exp_id, lp):
+        self.core.set_story(exp_id, lp, self.lp_story_text.get('1.0', tk.END))
+        self.update_lp_matrix_cell(exp_id, lp)
         self.lp_story_window.destroy()
         messagebox.showinfo("Success", "Story saved successfully!")
 
-    def load_lp_matrix_data(self):
-        try:
-            if os.path.exists("lp_matrix_data.json"):
-                with open("lp_matrix_data.json", "r", encoding='utf-8') as f:
-                    self.lp_matrix_data = json.load(f)
-                if not isinstance(self.lp_matrix_data, dict):
-                    self.lp_matrix_data = {}
-            else:
-                self.lp_matrix_data = {}
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load LP matrix data: {str(e)}")
-            self.lp_matrix_data = {}
-
-    def save_lp_matrix_data(self):
-        with open("lp_matrix_data.json", "w", encoding='utf-8') as f:
-            json.dump(self.lp_matrix_data, f, ensure_ascii=False, indent=2)
-
     # ----------------------- Interview Framework -----------------------
     def create_interview_framework(self, parent):
         main_frame = ttk.Frame(parent)
@@ -512,8 +935,8 @@ class AmazonInterviewPrep:
             self.framework_texts[key] = text_widget
 
             # Load existing content
-            if key in self.interview_framework:
-                text_widget.insert('1.0', self.interview_framework[key])
+            if key in self.core.interview_framework:
+                text_widget.insert('1.0', self.core.interview_framework[key])
 
         # Buttons
         button_frame = ttk.Frame(main_frame)
@@ -522,32 +945,14 @@ class AmazonInterviewPrep:
         ttk.Button(button_frame, text="Clear", command=self.clear_interview_framework).pack(side='left', padx=5)
 
     def save_interview_framework(self):
-        for key, text_widget in self.framework_texts.items():
-            self.interview_framework[key] = text_widget.get('1.0', tk.END).strip()
-        self.save_framework_data()
+        self.core.save_interview_framework({key: text_widget.get('1.0', tk.END).strip()
+                                            for key, text_widget in self.framework_texts.items()})
         messagebox.showinfo("Success", "Interview framework saved successfully!")
 
     def clear_interview_framework(self):
         for text_widget in self.framework_texts.values():
             text_widget.delete('1.0', tk.END)
 
-    def load_interview_framework(self):
-        try:
-            if os.path.exists("interview_framework.json"):
-                with open("interview_framework.json", "r", encoding='utf-8') as f:
-                    self.interview_framework = json.load(f)
-                if not isinstance(self.interview_framework, dict):
-                    self.interview_framework = {}
-            else:
-                self.interview_framework = {}
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load interview framework: {str(e)}")
-            self.interview_framework = {}
-
-    def save_framework_data(self):
-        with open("interview_framework.json", "w", encoding='utf-8') as f:
-            json.dump(self.interview_framework, f, ensure_ascii=False, indent=2)
-
     # ----------------------- Practice -----------------------
     def create_practice_tab(self, parent):
         practice_frame = ttk.Frame(parent)
@@ -569,6 +974,15 @@ class AmazonInterviewPrep:
         # Start Practice Button
         ttk.Button(lp_frame, text="Start Practice", command=self.start_practice).pack(side='left', padx=5)
 
+        # Mock interview: a planned, timed session across all LPs
+        ttk.Label(lp_frame, text="Questions:").pack(side='left', padx=5)
+        self.session_count_var = tk.StringVar(value=str(SESSION_QUESTIONS))
+        ttk.Spinbox(lp_frame, from_=1, to=50, width=4, textvariable=self.session_count_var).pack(side='left', padx=5)
+        ttk.Button(lp_frame, text="Mock Interview", command=self.start_mock_interview).pack(side='left', padx=5)
+
+        self.session_label = ttk.Label(practice_frame, text="", font=("Helvetica", 12))
+        self.session_label.pack(pady=5)
+
         # Flashcard Display
         self.flashcard_label = ttk.Label(practice_frame, text="", wraplength=800, font=("Helvetica", 14), justify='center')
         self.flashcard_label.pack(expand=True)
@@ -586,162 +1000,274 @@ class AmazonInterviewPrep:
         self.play_button = ttk.Button(control_frame, text="Play Recording", command=self.play_recording, state='disabled')
         self.play_button.pack(side='left', padx=5)
 
+        # Past attempts for the current card, newest first
+        ttk.Label(control_frame, text="Attempt:").pack(side='left', padx=5)
+        self.attempt_var = tk.StringVar()
+        self.attempts_combo = ttk.Combobox(control_frame, textvariable=self.attempt_var, state='readonly', width=28)
+        self.attempts_combo.pack(side='left', padx=5)
+        self.attempts_combo.bind('<<ComboboxSelected>>', self.show_attempt_speech)
+        self.current_attempts = []
+
+        # Speech metrics of the selected attempt
+        self.speech_label = ttk.Label(practice_frame, text="", wraplength=800)
+        self.speech_label.pack(pady=5)
+
         # Spaced Repetition Info
         self.spaced_repetition_label = ttk.Label(practice_frame, text="")
         self.spaced_repetition_label.pack(pady=5)
 
-        # Bind spacebar
+        # Bind spacebar, and 1-4 to grade a card on its key points
         self.root.bind('<space>', self.next_flashcard_content)
+        for key in '1234':
+            self.root.bind(key, self.grade_flashcard)
 
         self.flashcard_state = 0  # 0: question, 1: answer, 2: key points
         self.current_flashcard = None
+        self.current_view = None  # flashcard_view() of the current card
+        self.prefetched = None  # (question id, view) of the next mock-interview card
+        self.session = None  # MockSession while a mock interview runs
 
         # Audio recording variables
         self.is_recording = False
-        self.record_frames = []
-        self.audio_filename = "recording.wav"
+        self.last_recording = None  # archive entry of the current card's latest attempt
+        self.root.after(50, self.poll_audio)
 
-    def start_practice(self):
-        lp_selected = self.practice_lp_var.get()
-        if lp_selected == 'All':
-            questions_pool = self.questions
-        else:
-            questions_pool = [q for q in self.questions if lp_selected in q.get('leadership_principles', [])]
+    def load_practice_data(self):
+        self.recording_archive.load_index()
+        self.core.load_practice()
 
-        if not questions_pool:
+    def start_practice(self):
+        # Opens the microphone in the background so the first recording
+        # starts immediately
+        self.audio.warm_up()
+        self.session = None
+        self.session_label.config(text="")
+        # Use spaced repetition to select the next question
+        question = self.core.next_card(self.practice_lp_var.get())
+        if question is None:
             messagebox.showinfo("Info", "No questions available for the selected Leadership Principle.")
             return
+        self.show_flashcard(question)
 
-        # Use spaced repetition to select the next question
-        question = self.select_flashcard(questions_pool)
+    def start_mock_interview(self):
+        try:
+            count = int(self.session_count_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter the number of questions.")
+            return
+        plan = self.core.plan_session(max(1, count))
+        if not plan:
+            messagebox.showinfo("Info", "No questions available for a mock interview.")
+            return
+        self.audio.warm_up()
+        self.session = MockSession(plan)
+        self.show_session_question()
+        self.tick_session(self.session)
+
+    def show_session_question(self):
+        question, lp = self.session.current()
+        self.show_flashcard(question)
+        self.session.start_question(time.monotonic())
+        self.update_session_label()
+        # The next card is prepared while this one is being answered
+        self.root.after_idle(self.prefetch_next_card)
+
+    def prefetch_next_card(self):
+        upcoming = self.session.upcoming() if self.session is not None else None
+        if upcoming is not None:
+            self.prefetched = (upcoming[0]['id'], self.flashcard_view(upcoming[0]))
+
+    def tick_session(self, session):
+        # Runs until the session ends or another one replaces it. When the
+        # countdown runs out the recording stops and the answer is shown.
+        if self.session is not session:
+            return
+        if session.remaining(time.monotonic()) <= 0 and not session.timed_out:
+            session.timed_out = True
+            if self.is_recording:
+                self.stop_recording()
+            if self.flashcard_state == 0:
+                self.flashcard_state = 1
+                self.update_flashcard_display()
+        self.update_session_label()
+        self.root.after(SESSION_TICK_MS, self.tick_session, session)
+
+    def update_session_label(self):
+        question, lp = self.session.current()
+        remaining = math.ceil(self.session.remaining(time.monotonic()))
+        clock = f"{remaining // 60}:{remaining % 60:02d} left" if remaining > 0 else "Time's up"
+        self.session_label.config(text=f"Mock interview: question {self.session.position + 1} of {len(self.session)} "
+                                       f"({lp}), {clock}")
+
+    def end_session(self):
+        summary = self.session.summary()
+        self.session = None
+        self.current_flashcard = None
+        self.session_label.config(text="")
+        self.flashcard_label.config(text="Mock interview complete.")
+        self.spaced_repetition_label.config(text="")
+        self.record_button.config(state='disabled')
+        minutes, seconds = divmod(int(round(summary['average_seconds'] or 0)), 60)
+        messagebox.showinfo("Mock Interview",
+                            f"Answered {summary['answered']} of {summary['questions']} questions.\n"
+                            f"Average answer time {minutes}:{seconds:02d}, {summary['overtime']} over time.\n"
+                            f"Average grade {summary['average_grade']} of 5.")
+
+    def show_flashcard(self, question):
         self.current_flashcard = question
         self.flashcard_state = 0
+        self.last_recording = None
+        prefetched, self.prefetched = self.prefetched, None
+        if prefetched is not None and prefetched[0] == question['id']:
+            self.current_view = prefetched[1]
+        else:
+            self.current_view = self.flashcard_view(question)
+        self.set_attempts(self.current_view['attempts'])
         self.update_flashcard_display()
 
-    def select_flashcard(self, questions_pool):
-        # Simple spaced repetition implementation
-        history = self.practice_history
-        # Assign IDs if not present
-        for idx, q in enumerate(questions_pool):
-            if 'id' not in q:
-                q['id'] = f"Q{idx}"
-        # Sort questions by last practiced date
-        questions_pool.sort(key=lambda x: history.get(x['id'], 0))
-        return questions_pool[0]
+    def flashcard_view(self, question):
+        # Everything show_flashcard needs for a card: the three faces, the
+        # review history line and the past attempts
+        key_points = '\n'.join(question.get('key_points', []))
+        faces = (
+            f"Question:\n{question['question']}\n\n(Press Space to see the answer)",
+            f"Answer:\n{question.get('answer', 'No answer provided.')}\n\n(Press Space to see key points)",
+            f"Key Points:\n{key_points}\n\n(Press Space for next question, or rate it 1 Again, 2 Hard, 3 Good, 4 Easy)",
+        )
+        last_practiced = self.core.practice_history.get(question['id'], None)
+        card = self.core.scheduler.cards.get(question['id'])
+        if last_practiced and card is not None and card.reps:
+            history = f"Last practiced on: {last_practiced} (interval {card.interval:g} days)"
+        elif last_practiced:
+            history = f"Last practiced on: {last_practiced}"
+        else:
+            history = "This is your first time practicing this question."
+        # Served from the archive index, no directory scan
+        attempts = list(reversed(self.recording_archive.attempts(question['id'])))
+        return {'faces': faces, 'history': history, 'attempts': attempts}
+
+    def update_attempts(self):
+        self.set_attempts(list(reversed(self.recording_archive.attempts(self.current_flashcard['id']))))
+
+    def set_attempts(self, attempts):
+        self.current_attempts = attempts
+        labels = [f"{a['timestamp']} ({a['duration']:.0f}s)" for a in self.current_attempts]
+        self.attempts_combo.config(values=labels)
+        self.attempt_var.set(labels[0] if labels else "")
+        self.show_attempt_speech()
+
+    def selected_attempt(self):
+        labels = list(self.attempts_combo.cget('values') or ())
+        selected = self.attempt_var.get()
+        return self.current_attempts[labels.index(selected)] if selected in labels else None
+
+    def show_attempt_speech(self, event=None):
+        attempt = self.selected_attempt()
+        self.speech_label.config(text=describe_speech(attempt.get('speech')) if attempt else "")
 
     def next_flashcard_content(self, event):
         if self.current_flashcard is None:
             return
         self.flashcard_state = (self.flashcard_state + 1) % 3  # 0: question, 1: answer, 2: key points
-        self.update_flashcard_display()
         if self.flashcard_state == 0:
-            # Update practice history
-            flashcard_id = self.current_flashcard['id']
-            self.practice_history[flashcard_id] = self.get_current_timestamp()
-            self.save_practice_history()
+            # Moving past the key points counts as a "Good" review
+            self.finish_review(GRADE_GOOD)
+        else:
+            self.update_flashcard_display()
+
+    def grade_flashcard(self, event):
+        if self.current_flashcard is None or self.flashcard_state != 2:
+            return
+        if isinstance(event.widget, (tk.Entry, tk.Text)):
+            return  # typing in a form, not grading
+        grades = {'1': GRADE_AGAIN, '2': GRADE_HARD, '3': GRADE_GOOD, '4': GRADE_EASY}
+        self.finish_review(grades[event.char])
+
+    def finish_review(self, grade):
+        # Update practice history and reschedule, then draw the next due card
+        question_id = self.current_flashcard['id']
+        self.record_practice_event(question_id, grade)
+        if self.session is not None:
+            if self.session.finish_question(grade, time.monotonic()) is None:
+                self.end_session()
+            else:
+                self.show_session_question()
+            return
+        question = self.core.next_card(self.practice_lp_var.get(), exclude=question_id)
+        self.show_flashcard(question or self.current_flashcard)
 
     def update_flashcard_display(self):
+        # Question, then answer, then key points; recording is only offered
+        # while the question is shown
         if self.flashcard_state == 0:
-            # Display question
-            text = f"Question:\n{self.current_flashcard['question']}\n\n(Press Space to see the answer)"
             self.record_button.config(state='normal')
             self.play_button.config(state='disabled')
-        elif self.flashcard_state == 1:
-            # Display answer
-            text = f"Answer:\n{self.current_flashcard.get('answer', 'No answer provided.')}\n\n(Press Space to see key points)"
-            self.record_button.config(state='disabled')
-            self.play_button.config(state='normal')
         else:
-            # Display key points
-            key_points = '\n'.join(self.current_flashcard.get('key_points', []))
-            text = f"Key Points:\n{key_points}\n\n(Press Space for next question)"
             self.record_button.config(state='disabled')
             self.play_button.config(state='normal')
-        self.flashcard_label.config(text=text)
-        # Update spaced repetition info
-        flashcard_id = self.current_flashcard['id']
-        last_practiced = self.practice_history.get(flashcard_id, None)
-        if last_practiced:
-            self.spaced_repetition_label.config(text=f"Last practiced on: {last_practiced}")
-        else:
-            self.spaced_repetition_label.config(text="This is your first time practicing this question.")
+            if self.session is not None and self.flashcard_state == 1:
+                # Reopens the microphone while the answer is read if it was
+                # lost, so the next question records at once
+                self.audio.warm_up()
+        self.flashcard_label.config(text=self.current_view['faces'][self.flashcard_state])
+        self.spaced_repetition_label.config(text=self.current_view['history'])
 
     def start_recording(self):
+        # Only a flag and a queued command: the warm input stream starts
+        # writing with its next buffer
+        self.audio.start_recording(self.current_flashcard['id'])
         self.is_recording = True
-        self.record_frames = []
+        self.last_recording = None
         self.record_button.config(state='disabled')
         self.stop_button.config(state='normal')
-        threading.Thread(target=self.record_audio).start()
 
     def stop_recording(self):
+        # The attempt list is refreshed once the engine has archived the file
+        self.audio.stop_recording()
         self.is_recording = False
         self.stop_button.config(state='disabled')
         self.play_button.config(state='normal')
 
-    def record_audio(self):
-        p = pyaudio.PyAudio()
-        try:
-            stream = p.open(format=pyaudio.paInt16, channels=1, rate=44100, input=True, frames_per_buffer=1024)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to access microphone: {str(e)}")
-            return
-        while self.is_recording:
-            data = stream.read(1024)
-            self.record_frames.append(data)
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        # Save recording
-        wf = wave.open(self.audio_filename, 'wb')
-        wf.setnchannels(1)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(44100)
-        wf.writeframes(b''.join(self.record_frames))
-        wf.close()
+    def poll_audio(self):
+        # Results and errors from the audio engine's thread
+        for kind, payload in self.audio.poll_events():
+            if kind == 'error':
+                self.is_recording = False
+                self.stop_button.config(state='disabled')
+                if self.current_flashcard is not None and self.flashcard_state == 0:
+                    self.record_button.config(state='normal')
+                messagebox.showerror("Error", payload)
+            elif kind == 'recorded':
+                if self.current_flashcard is not None and payload['question_id'] == self.current_flashcard['id']:
+                    self.last_recording = payload
+                    self.update_attempts()
+        self.root.after(50, self.poll_audio)
 
     def play_recording(self):
-        if not os.path.exists(self.audio_filename):
+        attempt = self.selected_attempt()
+        if attempt is None or not os.path.exists(attempt['path']):
             messagebox.showerror("Error", "No recording found.")
             return
-        threading.Thread(target=self.play_audio).start()
-
-    def play_audio(self):
-        wf = wave.open(self.audio_filename, 'rb')
-        p = pyaudio.PyAudio()
-        try:
-            stream = p.open(format=p.get_format_from_width(wf.getsampwidth()), channels=wf.getnchannels(),
-                            rate=wf.getframerate(), output=True)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to play audio: {str(e)}")
-            return
-        data = wf.readframes(1024)
-        while data:
-            stream.write(data)
-            data = wf.readframes(1024)
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-    def get_current_timestamp(self):
-        return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    def save_practice_history(self):
-        with open("practice_history.json", "w", encoding='utf-8') as f:
-            json.dump(self.practice_history, f, ensure_ascii=False, indent=2)
-
-    def load_practice_history(self):
-        try:
-            if os.path.exists("practice_history.json"):
-                with open("practice_history.json", "r", encoding='utf-8') as f:
-                    self.practice_history = json.load(f)
-                # Ensure practice_history is a dict
-                if not isinstance(self.practice_history, dict):
-                    self.practice_history = {}
-            else:
-                self.practice_history = {}
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load practice history: {str(e)}")
-            self.practice_history = {}
+        self.audio.play(attempt['path'])
+
+    def record_practice_event(self, question_id, grade=GRADE_GOOD):
+        # Logs the review with the card's latest recording and reschedules it
+        if self.is_recording:
+            self.stop_recording()
+        if self.audio.pending:
+            # Graded before the engine archived the attempt
+            self.audio.wait_idle(2.0)
+            for kind, payload in self.audio.poll_events():
+                if kind == 'recorded' and payload['question_id'] == question_id:
+                    self.last_recording = payload
+                elif kind == 'error':
+                    messagebox.showerror("Error", payload)
+        entry = self.last_recording or {}
+        self.core.record_review(question_id, grade, entry.get('path'), entry.get('duration'), speech=entry.get('speech'))
+        self.last_recording = None
+        if 'progress' in self.built_tabs:
+            self.progress_list.update_row(question_id)
+            self.refresh_progress()
 
     # ----------------------- Progress Tracking -----------------------
     def create_progress_tracking(self, parent):
@@ -750,23 +1276,180 @@ class AmazonInterviewPrep:
 
         ttk.Label(main_frame, text="Progress Tracking", font=('Helvetica', 16)).pack(pady=10)
 
-        # For simplicity, we will just show a list of last practiced dates
-        tree = ttk.Treeview(main_frame, columns=('Question', 'Last Practiced'), show='headings')
-        tree.heading('Question', text='Question')
-        tree.heading('Last Practiced', text='Last Practiced')
-        tree.pack(fill='both', expand=True)
+        # Summary figures, read from the core's incremental analytics
+        summary_frame = ttk.Frame(main_frame)
+        summary_frame.pack(fill='x', pady=5)
+        self.progress_labels = {}
+        fields = ('Reviews', 'Today', 'Streak', 'Coverage', 'Due now', 'Overdue', 'New', 'Avg recording')
+        for i, field in enumerate(fields):
+            row, col = divmod(i, 4)
+            ttk.Label(summary_frame, text=f"{field}:").grid(row=row, column=col * 2, sticky='w', padx=5)
+            self.progress_labels[field] = ttk.Label(summary_frame, text="")
+            self.progress_labels[field].grid(row=row, column=col * 2 + 1, sticky='w', padx=(0, 20))
+        self.progress_days_label = ttk.Label(main_frame, text="")
+        self.progress_days_label.pack(anchor='w', pady=5)
+
+        # Coverage and recency per leadership principle
+        columns = ('Questions', 'Practiced', 'Coverage', 'Reviews', 'Last Reviewed', 'Due', 'Overdue')
+        self.progress_lp_tree = ttk.Treeview(main_frame, columns=columns, height=8)
+        self.progress_lp_tree.heading('#0', text='Leadership Principle')
+        self.progress_lp_tree.column('#0', width=300)
+        for col in columns:
+            self.progress_lp_tree.heading(col, text=col)
+            self.progress_lp_tree.column(col, width=90, anchor='e')
+        for lp in self.leadership_principles:
+            self.progress_lp_tree.insert('', 'end', iid=lp, text=lp)
+        self.progress_lp_tree.pack(fill='x', pady=5)
+
+        # Last practiced date per question
+        self.progress_list = VirtualTreeview(main_frame, ('Question', 'Last Practiced'), self.progress_row_values)
+        self.progress_list.pack(fill='both', expand=True)
+        self.progress_list.tree.heading('Question', text='Question')
+        self.progress_list.tree.heading('Last Practiced', text='Last Practiced')
 
         # Load data
-        for q in self.questions:
-            qid = q.get('id')
-            last_practiced = self.practice_history.get(qid, 'Never')
-            tree.insert('', 'end', values=(q['question'], last_practiced))
+        self.progress_list.set_rows(self.core.question_ids())
+        self.refresh_progress()
+        self.root.after(PROGRESS_REFRESH_MS, self.poll_progress)
+
+    def progress_row_values(self, qid):
+        return (self.core.question_index[qid]['question'], self.core.practice_history.get(qid, 'Never'))
+
+    def poll_progress(self):
+        self.refresh_progress()
+        self.root.after(PROGRESS_REFRESH_MS, self.poll_progress)
+
+    def refresh_progress(self):
+        # Every figure is a read of a running total, so this is cheap enough
+        # to run after each review and edit
+        analytics = self.core.analytics
+        if analytics is None:
+            return
+        now = time.time()
+        summary = analytics.summary(now)
+        average = summary['average_recording']
+        values = {
+            'Reviews': summary['reviews'],
+            'Today': summary['reviews_today'],
+            'Streak': f"{days_text(summary['current_streak'])} (best {days_text(summary['longest_streak'])})",
+            'Coverage': f"{summary['practiced_questions']}/{summary['questions']} ({summary['coverage']:.0%})",
+            'Due now': summary['due_now'],
+            'Overdue': summary['overdue'],
+            'New': summary['new'],
+            'Avg recording': f"{int(average) // 60}:{int(average) % 60:02d} ({summary['recordings']} recordings)"
+                             if average is not None else "No recordings",
+        }
+        for field, value in values.items():
+            self.progress_labels[field].config(text=str(value))
+
+        days = analytics.reviews_per_day(PROGRESS_DAYS, now)
+        peak = max(count for day, count in days)
+        bars = "".join(SPARK_BARS[(len(SPARK_BARS) - 1) * count // peak] if count else "·" for day, count in days)
+        self.progress_days_label.config(text=f"Last {PROGRESS_DAYS} days: {bars}  "
+                                             f"({sum(count for day, count in days)} reviews, busiest day {peak})")
+
+        for lp in self.leadership_principles:
+            row = analytics.lp_summary(lp, now)
+            since = row['days_since_review']
+            if since is None:
+                last = "Never"
+            elif since == 0:
+                last = "Today"
+            else:
+                last = f"{days_text(since)} ago"
+            self.progress_lp_tree.item(lp, values=(row['questions'], row['practiced_questions'], f"{row['coverage']:.0%}",
+                                                   row['reviews'], last, row['due_now'], row['overdue']))
+
+    # ----------------------- Instrumentation -----------------------
+    def open_debug_panel(self, event=None):
+        if self.debug_window is not None and self.debug_window.winfo_exists():
+            self.debug_window.lift()
+            return
+        self.debug_window = tk.Toplevel(self.root)
+        self.debug_window.title("Instrumentation")
+        self.debug_window.geometry("900x600")
+
+        columns = ('Calls', 'Mean (ms)', 'p95 (ms)', 'Max (ms)', 'Over 16 ms')
+        self.debug_tree = ttk.Treeview(self.debug_window, columns=columns)
+        self.debug_tree.heading('#0', text='Call')
+        self.debug_tree.column('#0', width=320)
+        for col in columns:
+            self.debug_tree.heading(col, text=col)
+            self.debug_tree.column(col, width=100, anchor='e')
+        self.debug_tree.pack(fill='both', expand=True, padx=10, pady=5)
+
+        ttk.Label(self.debug_window, text="Recent main-thread calls over 16 ms:").pack(anchor='w', padx=10)
+        self.debug_slow_text = scrolledtext.ScrolledText(self.debug_window, height=8)
+        self.debug_slow_text.pack(fill='x', padx=10, pady=5)
+
+        button_frame = ttk.Frame(self.debug_window)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Reset", command=self.instrumentation.reset).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Save Report...", command=self.save_debug_report).pack(side='left', padx=5)
+        self.refresh_debug_panel()
+
+    def refresh_debug_panel(self):
+        # Redrawn once a second while the panel is open
+        if self.debug_window is None or not self.debug_window.winfo_exists():
+            return
+        report = self.instrumentation.report()
+        self.debug_tree.delete(*self.debug_tree.get_children())
+        for name, s in report['calls'].items():
+            self.debug_tree.insert('', 'end', text=name, values=(
+                s['count'], f"{s['mean_ms']:.2f}", f"{s['p95_ms']:.2f}", f"{s['max_ms']:.2f}", s['slow_calls']))
+        self.debug_slow_text.delete('1.0', tk.END)
+        self.debug_slow_text.insert('1.0', "\n".join(f"{c['time']}  {c['name']}  {c['ms']:.1f} ms"
+                                                     for c in reversed(report['slow_calls'])))
+        self.root.after(1000, self.refresh_debug_panel)
+
+    def save_debug_report(self):
+        path = filedialog.asksaveasfilename(title="Save Instrumentation Report", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if path:
+            self.instrumentation.dump(path)
 
     # 程序入口
 def main():
-    root = tk.Tk()
-    app = AmazonInterviewPrep(root)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Amazon Interview Preparation Tool")
+    parser.add_argument('--storage', choices=['json', 'sqlite'],
+                        help="data backend (default: sqlite if interview_prep.db exists, else json); "
+                             "a new SQLite database is migrated from the JSON files")
+    parser.add_argument('--server', metavar='URL',
+                        help="use a shared bank served by 'amz_cli.py serve' (e.g. http://127.0.0.1:8765), "
+                             "cached locally for offline use; practice history stays local")
+    parser.add_argument('--sample-rate', type=int, default=16000,
+                        help="sample rate for new practice recordings (default: 16000)")
+    parser.add_argument('--audio-encoding', choices=['pcm16', 'mulaw'], default='pcm16',
+                        help="storage encoding for new practice recordings; mulaw halves the size")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print the time spent in each startup phase to stderr")
+    parser.add_argument('--instrument', action='store_true',
+                        help="record per-call latency histograms (F12 shows them) and write them out on exit")
+    parser.add_argument('--instrument-output', default="instrumentation.json",
+                        help="report file for --instrument (default: instrumentation.json)")
+    args = parser.parse_args()
+
+    profiler = StartupProfiler(args.profile_startup)
+    with profiler.phase("tk init"):
+        root = tk.Tk()
+    with profiler.phase("open storage"):
+        storage = open_storage('remote' if args.server else args.storage, background=True, url=args.server)
+    archive = RecordingArchive(sample_rate=args.sample_rate, encoding=args.audio_encoding, analyzer=new_analyzer)
+    instrumentation = Instrumentation() if args.instrument else None
+    app = AmazonInterviewPrep(root, storage=storage, profiler=profiler, recording_archive=archive,
+                              instrumentation=instrumentation)
+    try:
+        root.mainloop()
+    finally:
+        app.audio.close()
+        try:
+            app.core.close()
+        except OSError as e:
+            print(f"Warning: {str(e)}", file=sys.stderr)
+        if instrumentation is not None:
+            instrumentation.dump(args.instrument_output)
+            print(instrumentation.format_table(), file=sys.stderr)
+            print(f"instrumentation report written to {args.instrument_output}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+from array import array
+from collections import Counter
+
+numpy = None
+
+COMPACT_RATIO = 0.5  # rebuild once this share of the rows are deleted
+
+
+def load_numpy():
+    # Optional: without NumPy the same queries run over the array in Python
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            module = False
+        numpy = module
+    return numpy or None
+
+
+class LPTable:
+    # Columnar view of the question bank's leadership principles: one bit
+    # per LP, one mask per question in an array('H') (16 LPs fit in 16 bits),
+    # with the question ids in a parallel list in bank order. Filters and
+    # per-LP counts are a pass over the packed masks, vectorized with NumPy
+    # when it is installed (np.frombuffer views the array without copying).
+    # Deleted rows are blanked and the columns compacted once half of them
+    # are gone, so the order matches the bank. The question dicts, and the
+    # JSON on disk, are unchanged.
+    def __init__(self, leadership_principles, rows=()):
+        self.leadership_principles = list(leadership_principles)
+        if len(self.leadership_principles) > 64:
+            raise ValueError("At most 64 leadership principles fit in a mask")
+        self.typecode, self.dtype = ('H', 'uint16') if len(self.leadership_principles) <= 16 else ('Q', 'uint64')
+        self.bits = {lp: 1 << i for i, lp in enumerate(self.leadership_principles)}
+        self.ids = []  # position -> question id, None for a deleted row
+        self.masks = array(self.typecode)
+        self.positions = {}  # question id -> position
+        self.deleted = 0
+        for row in rows:
+            self.set(row[0], row[1])  # (question id, LPs, ...)
+
+    @classmethod
+    def from_masks(cls, leadership_principles, ids, masks):
+        # Built from a mask column already laid out for these LPs (a
+        # snapshot's) instead of from each question's LP list
+        table = cls(leadership_principles)
+        table.ids = list(ids)
+        table.masks = array(table.typecode, masks)
+        table.positions = {qid: pos for pos, qid in enumerate(table.ids)}
+        return table
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        # Question ids in bank order
+        return (qid for qid in self.ids if qid is not None)
+
+    def mask(self, lps):
+        # Unknown LPs are ignored
+        value = 0
+        for lp in lps:
+            value |= self.bits.get(lp, 0)
+        return value
+
+    def set(self, question_id, lps):
+        pos = self.positions.get(question_id)
+        if pos is None:
+            self.positions[question_id] = len(self.ids)
+            self.ids.append(question_id)
+            self.masks.append(self.mask(lps))
+        else:
+            self.masks[pos] = self.mask(lps)
+
+    def remove(self, question_id):
+        pos = self.positions.pop(question_id, None)
+        if pos is None:
+            return
+        self.ids[pos] = None
+        self.masks[pos] = 0
+        self.deleted += 1
+        if self.deleted > len(self.ids) * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        keep = [pos for pos, qid in enumerate(self.ids) if qid is not None]
+        self.ids = [self.ids[pos] for pos in keep]
+        self.masks = array(self.typecode, [self.masks[pos] for pos in keep])
+        self.positions = {qid: pos for pos, qid in enumerate(self.ids)}
+        self.deleted = 0
+
+    def lps(self, question_id):
+        value = self.masks[self.positions[question_id]]
+        return [lp for lp in self.leadership_principles if value & self.bits[lp]]
+
+    def select(self, lps, match='any'):
+        # Ids of the questions with any (or all) of `lps`, in bank order;
+        # no LPs selects every question
+        lps = list(lps)
+        if not lps:
+            return [qid for qid in self.ids if qid is not None]
+        ids = self.ids
+        return [ids[pos] for pos in self.rows(self.mask(lps), match)]
+
+    def count(self, lps, match='any'):
+        lps = list(lps)
+        if not lps:
+            return len(self)
+        return len(self.rows(self.mask(lps), match))
+
+    def rows(self, wanted, match):
+        # Positions whose mask shares any bit with `wanted`, or has them all;
+        # deleted rows have no bits and never match
+        if match not in ('any', 'all'):
+            raise ValueError(f"Unknown match mode: {match}")
+        if not wanted:
+            return []
+        np = load_numpy()
+        if np is not None and self.masks:
+            hits = np.frombuffer(self.masks, dtype=self.dtype) & wanted
+            return np.flatnonzero(hits == wanted if match == 'all' else hits).tolist()
+        if match == 'all':
+            return [pos for pos, value in enumerate(self.masks) if value & wanted == wanted]
+        return [pos for pos, value in enumerate(self.masks) if value & wanted]
+
+    def counts(self):
+        # LP -> number of questions with it. Without NumPy, the distinct
+        # masks are counted first; a bank only uses a few hundred of them.
+        np = load_numpy()
+        if np is not None and self.masks:
+            masks = np.frombuffer(self.masks, dtype=self.dtype)
+            return {lp: int(np.count_nonzero(masks & bit)) for lp, bit in self.bits.items()}
+        result = dict.fromkeys(self.leadership_principles, 0)
+        for value, number in Counter(self.masks).items():
+            for lp, bit in self.bits.items():
+                if value & bit:
+                    result[lp] += number
+        return result
+
+    def nbytes(self):
+        # Size of the packed mask column
+        return self.masks.itemsize * len(self.masks)
@@ -0,0 +1,68 @@
+class LPMatrix:
+    # Experience x leadership principle story matrix stored as a two-level
+    # index: experience id -> LP -> {'story': ...}. The nested dict is also
+    # the on-disk format of lp_matrix_data, one entry per experience, so
+    # saving a story rewrites one experience's cells. Per-LP coverage counts
+    # (experiences with a story for that LP) are kept up to date on every
+    # change instead of being recounted.
+    def __init__(self, leadership_principles):
+        self.leadership_principles = list(leadership_principles)
+        self.cells = {}
+        self.coverage = {lp: 0 for lp in self.leadership_principles}
+
+    @classmethod
+    def from_storage(cls, leadership_principles, data):
+        # Returns (matrix, converted); converted is True when legacy flat
+        # "<experience title>-<LP>" keys were found and need saving back.
+        matrix = cls(leadership_principles)
+        converted = False
+        for key, value in data.items():
+            if isinstance(value, dict) and 'story' in value:
+                exp_key, lp = matrix.split_legacy_key(key)
+                matrix.set_story(exp_key, lp, value['story'])
+                converted = True
+            elif isinstance(value, dict):
+                for lp, cell in value.items():
+                    if isinstance(cell, dict):
+                        matrix.set_story(key, lp, cell.get('story', ''))
+        return matrix, converted
+
+    def split_legacy_key(self, key):
+        # Match the LP suffix exactly so titles containing "-" survive
+        for lp in self.leadership_principles:
+            if key.endswith("-" + lp):
+                return key[:-len(lp) - 1], lp
+        exp_key, _, lp = key.rpartition("-")
+        return exp_key, lp
+
+    def has_story(self, exp_key, lp):
+        return bool(self.cells.get(exp_key, {}).get(lp, {}).get('story'))
+
+    def get_story(self, exp_key, lp):
+        return self.cells.get(exp_key, {}).get(lp, {}).get('story', '')
+
+    def stories_for(self, exp_key):
+        return self.cells.get(exp_key, {})
+
+    def set_story(self, exp_key, lp, story):
+        had_story = self.has_story(exp_key, lp)
+        if story:
+            self.cells.setdefault(exp_key, {})[lp] = {'story': story}
+        else:
+            row = self.cells.get(exp_key, {})
+            row.pop(lp, None)
+            if not row:
+                self.cells.pop(exp_key, None)
+        if lp in self.coverage:
+            self.coverage[lp] += bool(story) - had_story
+
+    def remove_experience(self, exp_key):
+        for lp in list(self.cells.get(exp_key, {})):
+            self.set_story(exp_key, lp, '')
+
+    def rename_experience(self, old_key, new_key):
+        if old_key in self.cells:
+            self.cells[new_key] = self.cells.pop(old_key)
+
+    def gaps(self):
+        return [lp for lp in self.leadership_principles if not self.coverage[lp]]
@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import threading
+
+LOG_FILENAME = "practice_log.jsonl"
+SNAPSHOT_FILENAME = "practice_snapshot.json"
+LEGACY_FILENAME = "practice_history.json"
+
+
+def make_event(question_id, timestamp, recording=None, duration=None, grade=None, speech=None):
+    return {
+        'question_id': question_id,
+        'timestamp': timestamp,
+        'recording': recording,
+        'duration': duration,
+        'grade': grade,
+        'speech': speech,  # amz_speech metrics for the recording
+    }
+
+
+def last_practiced(events):
+    # Collapse the event stream into question id -> latest timestamp
+    history = {}
+    for event in events:
+        history[event['question_id']] = event['timestamp']
+    return history
+
+
+class PracticeLog:
+    # Append-only practice history. Every review is one JSON line in
+    # practice_log.jsonl; fsyncs are batched by a flusher thread. Once the log
+    # grows past compact_threshold it is rotated into a numbered segment and
+    # folded into practice_snapshot.json in the background. Startup replays
+    # the snapshot, then any segments newer than it, then the live log.
+    def __init__(self, directory=".", fsync_interval=0.5, fsync_batch=64, compact_threshold=5000):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.compact_threshold = compact_threshold
+
+        self.lock = threading.Lock()
+        self.flush_needed = threading.Condition(self.lock)
+        self.events = []
+        self.pending = 0
+        self.log_count = 0
+        self.closed = False
+        self.compactor = None
+
+        self.snapshot_segment = 0
+        self.next_segment = 1
+        self.replay()
+
+        self.log_file = open(self.path(LOG_FILENAME), "a", encoding='utf-8')
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def segment_path(self, seq):
+        return self.path(f"practice_log.{seq}.jsonl")
+
+    def segments(self):
+        seqs = []
+        for name in os.listdir(self.directory):
+            match = re.fullmatch(r"practice_log\.(\d+)\.jsonl", name)
+            if match:
+                seqs.append(int(match.group(1)))
+        return sorted(seqs)
+
+    def read_log(self, path):
+        events = []
+        with open(path, "r", encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append
+                    continue
+        return events
+
+    def replay(self):
+        snapshot_path = self.path(SNAPSHOT_FILENAME)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.events = snapshot.get('events', [])
+            self.snapshot_segment = snapshot.get('segment', 0)
+        elif os.path.exists(self.path(LEGACY_FILENAME)):
+            # Seed from the old question id -> last timestamp file
+            with open(self.path(LEGACY_FILENAME), "r", encoding='utf-8') as f:
+                legacy = json.load(f)
+            if isinstance(legacy, dict):
+                self.events = [make_event(qid, ts) for qid, ts in sorted(legacy.items(), key=lambda item: item[1])]
+
+        for seq in self.segments():
+            if seq > self.snapshot_segment:
+                self.events.extend(self.read_log(self.segment_path(seq)))
+            else:
+                # Already folded into the snapshot before a crash
+                os.remove(self.segment_path(seq))
+            self.next_segment = max(self.next_segment, seq + 1)
+        self.next_segment = max(self.next_segment, self.snapshot_segment + 1)
+
+        if os.path.exists(self.path(LOG_FILENAME)):
+            tail = self.read_log(self.path(LOG_FILENAME))
+            self.events.extend(tail)
+            self.log_count = len(tail)
+
+    def append(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.log_file.write(line)
+            self.events.append(event)
+            self.pending += 1
+            self.log_count += 1
+            if self.pending >= self.fsync_batch:
+                self.flush_needed.notify()
+            if self.log_count >= self.compact_threshold and self.compactor is None:
+                self.start_compaction()
+
+    def flush_loop(self):
+        with self.lock:
+            while not self.closed:
+                self.flush_needed.wait(self.fsync_interval)
+                if self.pending:
+                    self.sync()
+
+    def sync(self):
+        # Caller holds self.lock
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.pending = 0
+
+    def start_compaction(self):
+        # Caller holds self.lock. Rotate the live log into a segment so that
+        # appends continue immediately, then fold it into the snapshot.
+        self.sync()
+        self.log_file.close()
+        seq = self.next_segment
+        self.next_segment += 1
+        os.replace(self.path(LOG_FILENAME), self.segment_path(seq))
+        self.log_file = open(self.path(LOG_FILENAME), "a", encoding='utf-8')
+        self.log_count = 0
+        upto = len(self.events)
+        self.compactor = threading.Thread(target=self.compact, args=(seq, upto), daemon=True)
+        self.compactor.start()
+
+    def compact(self, seq, upto):
+        try:
+            snapshot = {'segment': seq, 'events': self.events[:upto]}
+            tmp_path = self.path(SNAPSHOT_FILENAME + ".tmp")
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(SNAPSHOT_FILENAME))
+            for old_seq in self.segments():
+                if old_seq <= seq:
+                    os.remove(self.segment_path(old_seq))
+        finally:
+            with self.lock:
+                self.compactor = None
+
+    def compact_now(self):
+        with self.lock:
+            if self.compactor is None and self.log_count:
+                self.start_compaction()
+            compactor = self.compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.sync()
+            self.log_file.close()
+            self.flush_needed.notify()
+            compactor = self.compactor
+        self.flusher.join()
+        if compactor is not None:
+            compactor.join()
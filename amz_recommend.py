@@ -0,0 +1,117 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from amz_search import tokenize
+
+LP_WEIGHT = 0.4  # share of the score from leadership principles with a story
+TEXT_WEIGHT = 0.6  # share from TF-IDF similarity to the description and stories
+
+
+class ExperienceRecommender:
+    # Ranks experiences for a question. Each experience is cached as the
+    # term counts of its description plus all of its LP stories, the set of
+    # LPs it has stories for, and postings from term to experiences; update()
+    # replaces one experience's entry when it or one of its stories is saved.
+    # Vector norms depend on the idf, so they are refreshed lazily on the
+    # next query, and only for the experiences a change can affect: the edited
+    # one and those sharing a term whose document frequency changed. Adding
+    # or removing an experience changes every idf and refreshes them all.
+    def __init__(self):
+        self.counts = {}  # experience key -> Counter of terms
+        self.lps = {}  # experience key -> LPs with a story
+        self.df = Counter()
+        self.postings = defaultdict(dict)  # term -> {experience key: 1 + log tf}
+        self.by_lp = defaultdict(set)  # LP -> experience keys with a story for it
+        self.norms = {}
+        self.stale = set()  # experience keys whose norm needs refreshing
+        self.all_stale = False
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, exp_key, description, stories):
+        # stories: LP -> {'story': ...} as kept by LPMatrix
+        texts = [description or ''] + [cell.get('story', '') for cell in stories.values()]
+        counts = Counter(tokenize(" ".join(texts)))
+        old = self.counts.get(exp_key)
+        if old is None:
+            self.all_stale = True
+        else:
+            changed = old.keys() ^ counts.keys()
+            self.unindex(exp_key)
+        self.counts[exp_key] = counts
+        self.lps[exp_key] = {lp for lp, cell in stories.items() if cell.get('story')}
+        for lp in self.lps[exp_key]:
+            self.by_lp[lp].add(exp_key)
+        for term, count in counts.items():
+            self.df[term] += 1
+            self.postings[term][exp_key] = 1 + math.log(count)
+        if old is not None:
+            for term in changed:
+                self.stale.update(self.postings.get(term, ()))
+            self.stale.add(exp_key)
+
+    def remove(self, exp_key):
+        if exp_key in self.counts:
+            self.unindex(exp_key)
+            self.norms.pop(exp_key, None)
+            self.all_stale = True
+
+    def unindex(self, exp_key):
+        counts = self.counts.pop(exp_key)
+        for lp in self.lps.pop(exp_key):
+            self.by_lp[lp].discard(exp_key)
+        for term in counts:
+            self.df[term] -= 1
+            postings = self.postings[term]
+            postings.pop(exp_key, None)
+            if not self.df[term]:
+                del self.df[term]
+                del self.postings[term]
+
+    def idf(self, term):
+        return math.log((1 + len(self.counts)) / (1 + self.df.get(term, 0))) + 1
+
+    def refresh_norms(self):
+        keys = self.counts if self.all_stale else self.stale
+        for exp_key in keys:
+            counts = self.counts.get(exp_key)
+            if counts is not None:
+                self.norms[exp_key] = math.sqrt(sum(((1 + math.log(c)) * self.idf(t)) ** 2
+                                                    for t, c in counts.items())) or 1.0
+        self.stale = set()
+        self.all_stale = False
+
+    def rank(self, text, lps=(), count=5):
+        # [(experience key, score, lp overlap, text similarity)], best first.
+        # Only experiences sharing a term or an LP with the question are scored.
+        if self.stale or self.all_stale:
+            self.refresh_norms()
+        query = {}
+        for term, tf in Counter(tokenize(text)).items():
+            if term in self.df:
+                query[term] = (1 + math.log(tf)) * self.idf(term)
+        query_norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+        text_scores = defaultdict(float)
+        for term, weight in query.items():
+            idf = self.idf(term)
+            for exp_key, tf in self.postings[term].items():
+                text_scores[exp_key] += weight * tf * idf
+        lps = set(lps)
+        candidates = set(text_scores)
+        for lp in lps:
+            candidates |= self.by_lp.get(lp, set())
+        scored = []
+        for exp_key in candidates:
+            similarity = text_scores.get(exp_key, 0.0) / (query_norm * self.norms[exp_key])
+            if lps:
+                overlap = len(self.lps[exp_key] & lps) / len(lps)
+                score = LP_WEIGHT * overlap + TEXT_WEIGHT * similarity
+            else:
+                overlap = 0.0
+                score = similarity
+            scored.append((score, exp_key, overlap, similarity))
+        best = heapq.nlargest(count, scored, key=lambda item: (item[0], item[1]))
+        return [(exp_key, round(score, 4), round(overlap, 4), round(similarity, 4))
+                for score, exp_key, overlap, similarity in best if score > 0]
@@ -0,0 +1,191 @@
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from amz_storage import STORES, JSONStorage, write_json_atomic
+
+PAGE_SIZE = 1000  # records per request when downloading a list store
+TIMEOUT = 10.0
+FETCH_ATTEMPTS = 3  # restarts when the store changes mid-download
+
+
+class RemoteError(OSError):
+    # The server answered with an error status
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RemoteStorage:
+    # Storage backend for a team bank served by amz_server. Each store is
+    # cached in `directory` with its ETag; load() revalidates with
+    # If-None-Match (a 304 costs one small request) and falls back to the
+    # cached copy when the server cannot be reached. Writes go to the server
+    # as row patches (records by id, dict stores by key), or as a whole
+    # store guarded by If-Match so someone else's change is never silently
+    # overwritten. The practice log is personal and stays local.
+    # With a PersistenceWorker, writes are queued and coalesced as with the
+    # file backends, and read the live data when they run.
+    name = 'remote'
+    supports_row_writes = True
+    supports_snapshots = False
+
+    def __init__(self, url, directory=".", worker=None, timeout=TIMEOUT):
+        self.url = url.rstrip('/')
+        self.directory = directory
+        self.worker = worker
+        self.timeout = timeout
+        self.local = JSONStorage(directory)
+        self.etags = {}  # store -> ETag of the server version our data is based on
+        self.offline = False
+        self.batches = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def request(self, method, path, body=None, headers=None):
+        # (status, ETag, body); error statuses raise RemoteError
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else None
+        headers = dict(headers or {})
+        if data is not None:
+            headers['Content-Type'] = "application/json; charset=utf-8"
+        request = urllib.request.Request(self.url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers.get('ETag'), response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers.get('ETag'), b""
+            try:
+                message = json.loads(e.read()).get('error') or e.reason
+            except ValueError:
+                message = e.reason
+            raise RemoteError(e.code, f"Server error {e.code}: {message}")
+
+    def cache_path(self, store):
+        return os.path.join(self.directory, f"remote_{store}.json")
+
+    def read_cache(self, store):
+        try:
+            with open(self.cache_path(store), "r", encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache.get('etag'), cache['data']
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def write_cache(self, store, etag, data):
+        write_json_atomic(self.cache_path(store), {'etag': etag, 'data': data})
+
+    # ----------------------- Reads -----------------------
+    def exists(self, store):
+        return True
+
+    def load(self, store):
+        self.flush()
+        etag, cached = self.read_cache(store)
+        try:
+            data, etag = self.fetch(store, etag if cached is not None else None)
+        except RemoteError:
+            raise
+        except OSError:
+            if cached is None:
+                raise
+            self.offline = True
+            self.etags[store] = etag
+            return cached
+        self.offline = False
+        self.etags[store] = etag
+        if data is None:
+            return cached
+        self.write_cache(store, etag, data)
+        return data
+
+    def fetch(self, store, etag=None):
+        # (data, ETag), or (None, ETag) if `etag` is still current. List
+        # stores come a page at a time; every page must carry the first
+        # page's ETag, or the store changed mid-download and it starts over.
+        quoted = urllib.parse.quote(store)
+        if STORES[store][1] is dict:
+            headers = {'If-None-Match': etag} if etag else {}
+            status, etag, body = self.request('GET', f"/api/{quoted}", headers=headers)
+            return (None if status == 304 else json.loads(body)), etag
+        for attempt in range(FETCH_ATTEMPTS):
+            headers = {'If-None-Match': etag} if etag else {}
+            status, first, body = self.request('GET', f"/api/{quoted}?offset=0&limit={PAGE_SIZE}", headers=headers)
+            if status == 304:
+                return None, first
+            page = json.loads(body)
+            items = page['items']
+            while len(items) < page['total']:
+                status, tag, body = self.request('GET', f"/api/{quoted}?offset={len(items)}&limit={PAGE_SIZE}")
+                if tag != first:
+                    break
+                page = json.loads(body)
+                if not page['items']:
+                    break
+                items.extend(page['items'])
+            else:
+                return items, first
+            etag = None
+        raise OSError(f"{store} kept changing on the server while it was downloaded")
+
+    def iter_records(self, store):
+        data = self.load(store)
+        return iter(data if isinstance(data, list) else data.items())
+
+    # ----------------------- Writes -----------------------
+    def save(self, store, data):
+        if self.worker is None:
+            self.put_store(store, data)
+        else:
+            self.worker.submit((store,), self.put_store, store, data)
+
+    def put_store(self, store, data):
+        # Only over the version the data was loaded from. After a patch that
+        # version is unknown (others' patches may have landed as well), so
+        # the store has to be reloaded before it can be replaced whole.
+        if not self.etags.get(store):
+            raise RemoteError(412, f"{store} may have changed on the server since it was loaded; "
+                                   f"reload it before saving it whole")
+        headers = {'If-Match': self.etags[store]}
+        status, etag, body = self.request('PUT', f"/api/{urllib.parse.quote(store)}", data, headers)
+        self.etags[store] = etag
+        self.write_cache(store, etag, data)
+
+    def update(self, store, data, key, value):
+        self.update_many(store, data, [(key, value)])
+
+    def update_many(self, store, data, items):
+        # (key, value) pairs sent as one patch; value None deletes. Queued
+        # single-row changes coalesce per row; a batch is one job.
+        items = [(str(key), value) for key, value in items]
+        if self.worker is None:
+            self.patch_store(store, data, items)
+        elif len(items) == 1:
+            self.worker.submit((store, items[0][0]), self.patch_store, store, data, items)
+        else:
+            self.batches += 1
+            self.worker.submit((store, 'batch', self.batches), self.patch_store, store, data, items)
+
+    def patch_store(self, store, data, items):
+        status, etag, body = self.request('PATCH', f"/api/{urllib.parse.quote(store)}", [list(item) for item in items])
+        # Others may have changed other records too, so the cache is
+        # marked for a full download on the next load
+        self.etags[store] = None
+        self.write_cache(store, None, data)
+
+    # ----------------------- Practice log -----------------------
+    def load_practice_events(self):
+        return self.local.load_practice_events()
+
+    def append_practice_event(self, event):
+        self.local.append_practice_event(event)
+
+    def flush(self):
+        if self.worker is not None:
+            self.worker.flush()
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+        self.local.close()
@@ -0,0 +1,198 @@
+import datetime
+import heapq
+import itertools
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAY = 86400.0
+
+# Review grades on the SM-2 0-5 quality scale
+GRADE_AGAIN = 1
+GRADE_HARD = 3
+GRADE_GOOD = 4
+GRADE_EASY = 5
+
+ALL = 'All'
+
+STALE_RATIO = 2  # heaps are rebuilt once stale entries outnumber live ones this many times over
+
+
+def parse_timestamp(value):
+    # Practice timestamps are stored as local-time strings. fromisoformat
+    # reads this exact layout several times faster than strptime, which
+    # matters when the whole log is replayed at startup.
+    if isinstance(value, str) and len(value) == 19 and value[10] == ' ':
+        return datetime.datetime.fromisoformat(value).timestamp()
+    return datetime.datetime.strptime(value, TIMESTAMP_FORMAT).timestamp()
+
+
+class CardState:
+    __slots__ = ('question_id', 'lps', 'ease', 'interval', 'reps', 'lapses', 'last_review', 'due', 'version')
+
+    def __init__(self, question_id, lps):
+        self.question_id = question_id
+        self.lps = tuple(lps)
+        self.ease = 2.5
+        self.interval = 0.0  # days
+        self.reps = 0
+        self.lapses = 0
+        self.last_review = None
+        self.due = 0.0  # never-practiced cards are due immediately
+        self.version = None  # sequence number of its current heap entries
+
+    def apply_review(self, grade, when):
+        # SM-2: failed cards restart at one day, passed cards grow by the ease
+        # factor, and the ease factor drifts with the grade.
+        if grade < 3:
+            self.reps = 0
+            self.lapses += 1
+            self.interval = 1.0
+        else:
+            self.reps += 1
+            if self.reps == 1:
+                self.interval = 1.0
+            elif self.reps == 2:
+                self.interval = 6.0
+            else:
+                self.interval = round(self.interval * self.ease, 2)
+            if grade == GRADE_EASY:
+                self.interval *= 1.3
+        self.ease = max(1.3, self.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+        self.last_review = when
+        self.due = when + self.interval * DAY
+
+
+class Scheduler:
+    # Spaced-repetition scheduler with one min-heap of (due, seq, id) per
+    # leadership principle plus one over all cards. Rescheduling pushes a new
+    # entry and makes its seq the card's version; entries with another seq
+    # are stale, even for a card removed and added again, and are discarded
+    # lazily when they reach the top, so pick and reschedule are O(log n).
+    # Entries that never reach the top are dropped by a rebuild once the
+    # stale ones outnumber the live ones STALE_RATIO times over.
+    def __init__(self, leadership_principles):
+        self.leadership_principles = list(leadership_principles)
+        self.cards = {}
+        self.heaps = {lp: [] for lp in [ALL] + self.leadership_principles}
+        self.counter = itertools.count()
+        self.stale = 0  # heap entries left behind by rescheduled or removed cards
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __contains__(self, question_id):
+        return question_id in self.cards
+
+    def add_card(self, question_id, lps):
+        # Adding an existing card updates its LPs but keeps its review state
+        card = self.cards.get(question_id)
+        if card is None:
+            card = self.cards[question_id] = CardState(question_id, lps)
+        else:
+            self.stale += self.entry_count(card)
+            card.lps = tuple(lps)
+        self.push(card)
+        self.collect_stale()
+        return card
+
+    def remove_card(self, question_id):
+        card = self.cards.pop(question_id, None)
+        if card is not None:
+            self.stale += self.entry_count(card)
+            self.collect_stale()
+
+    def entry_count(self, card):
+        # Heap entries one push gives a card: ALL plus each of its known LPs
+        return 1 + sum(1 for lp in card.lps if lp in self.heaps)
+
+    def collect_stale(self):
+        live = sum(len(heap) for heap in self.heaps.values()) - self.stale
+        if self.stale > STALE_RATIO * live:
+            self.rebuild()
+
+    def push(self, card):
+        card.version = next(self.counter)
+        entry = (card.due, card.version, card.question_id)
+        heapq.heappush(self.heaps[ALL], entry)
+        for lp in card.lps:
+            if lp in self.heaps:
+                heapq.heappush(self.heaps[lp], entry)
+
+    def review(self, question_id, grade=GRADE_GOOD, when=None):
+        card = self.cards.get(question_id)
+        if card is None:
+            return None
+        card.apply_review(grade, datetime.datetime.now().timestamp() if when is None else when)
+        self.stale += self.entry_count(card)
+        self.push(card)
+        self.collect_stale()
+        return card
+
+    def replay(self, events, default_grade=GRADE_GOOD):
+        # Rebuild review state from the practice log. Heaps are rebuilt once
+        # at the end rather than pushed per event.
+        for event in events:
+            card = self.cards.get(event['question_id'])
+            if card is None:
+                continue
+            try:
+                when = parse_timestamp(event['timestamp'])
+            except (TypeError, ValueError):
+                continue
+            card.apply_review(event.get('grade') or default_grade, when)
+        self.rebuild()
+
+    def rebuild(self):
+        for lp in self.heaps:
+            self.heaps[lp] = []
+        for card in self.cards.values():
+            card.version = next(self.counter)
+            entry = (card.due, card.version, card.question_id)
+            self.heaps[ALL].append(entry)
+            for lp in card.lps:
+                if lp in self.heaps:
+                    self.heaps[lp].append(entry)
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+        self.stale = 0
+
+    def peek(self, lp=ALL):
+        heap = self.heaps.get(lp, [])
+        while heap:
+            due, seq, question_id = heap[0]
+            card = self.cards.get(question_id)
+            if card is not None and card.version == seq and (lp == ALL or lp in card.lps):
+                return card
+            heapq.heappop(heap)
+            self.stale -= 1
+        return None
+
+    def next_card(self, lp=ALL, exclude=None):
+        # Earliest-due card for the LP, skipping `exclude` (normally the card
+        # just shown) when there is anything else to pick.
+        card = self.peek(lp)
+        if card is None or card.question_id != exclude:
+            return card
+        heap = self.heaps[lp]
+        top = heapq.heappop(heap)
+        other = self.peek(lp)
+        heapq.heappush(heap, top)
+        return other or card
+
+    def due_count(self, now=None, lp=ALL):
+        now = datetime.datetime.now().timestamp() if now is None else now
+        return sum(1 for card in self.cards.values() if card.due <= now and (lp == ALL or lp in card.lps))
+
+    def upcoming(self, count, lp=ALL):
+        # The `count` earliest-due cards for the LP, in due order. Valid
+        # entries are popped and pushed back, so the heap is left as it was
+        # minus any stale entries met on the way.
+        heap = self.heaps.get(lp, [])
+        taken = []
+        while heap and len(taken) < count:
+            card = self.peek(lp)
+            if card is None:
+                break
+            taken.append(heapq.heappop(heap))
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return [self.cards[entry[2]] for entry in taken]
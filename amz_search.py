@@ -0,0 +1,139 @@
+import bisect
+import itertools
+import re
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+QUERY_RE = re.compile(r'(?:(lp|exp):)?("[^"]*"|\S+)', re.IGNORECASE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def question_terms(question):
+    text = " ".join([question.get('question', ''), question.get('answer', '')] + question.get('key_points', []))
+    return set(tokenize(text))
+
+
+class QuestionSearchIndex:
+    # Inverted indexes from leadership principle, experience id and text
+    # term to question ids. add() and remove() keep them current as single
+    # questions are saved or deleted; nothing is ever rebuilt from scratch.
+    # find_experience maps the title in an exp: clause to an experience id.
+    def __init__(self, questions=(), find_experience=None):
+        self.find_experience = find_experience
+        self.by_lp = defaultdict(set)
+        self.by_experience = defaultdict(set)
+        self.by_term = defaultdict(set)
+        self.entries = {}  # question id -> (lps, experiences, terms) as indexed
+        self.order = {}  # question id -> insertion sequence, for stable result order
+        self.counter = itertools.count()
+        self.sorted_terms = None  # built lazily for prefix queries
+        for question in questions:
+            self.add(question)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, question):
+        # (Re)index one question; only the postings that changed are touched
+        qid = question['id']
+        lps = set(question.get('leadership_principles', []))
+        experiences = set(question.get('experiences', []))
+        terms = question_terms(question)
+        old_lps, old_experiences, old_terms = self.entries.get(qid, (set(), set(), set()))
+        self._update_postings(self.by_lp, qid, old_lps, lps)
+        self._update_postings(self.by_experience, qid, old_experiences, experiences)
+        if terms - old_terms:
+            self.sorted_terms = None
+        self._update_postings(self.by_term, qid, old_terms, terms)
+        self.entries[qid] = (lps, experiences, terms)
+        if qid not in self.order:
+            self.order[qid] = next(self.counter)
+
+    def remove(self, qid):
+        if qid not in self.entries:
+            return
+        lps, experiences, terms = self.entries.pop(qid)
+        self._update_postings(self.by_lp, qid, lps, set())
+        self._update_postings(self.by_experience, qid, experiences, set())
+        self._update_postings(self.by_term, qid, terms, set())
+        del self.order[qid]
+
+    def _update_postings(self, postings, qid, old, new):
+        for key in old - new:
+            ids = postings[key]
+            ids.discard(qid)
+            if not ids:
+                del postings[key]
+        for key in new - old:
+            postings[key].add(qid)
+
+    def with_lp(self, lp):
+        return set(self.by_lp.get(lp, ()))
+
+    def with_experience(self, experience_id):
+        return set(self.by_experience.get(experience_id, ()))
+
+    def lookup_term(self, term):
+        # A trailing * matches every indexed term with that prefix
+        if not term.endswith('*'):
+            return self.by_term.get(term, set())
+        prefix = term[:-1]
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.by_term)
+        ids = set()
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        for candidate in itertools.islice(self.sorted_terms, start, None):
+            if not candidate.startswith(prefix):
+                break
+            ids |= self.by_term[candidate]
+        return ids
+
+    def clause_ids(self, field, value):
+        if field == 'lp':
+            return self.by_lp.get(self._match_name(self.by_lp, value), set())
+        if field == 'exp':
+            exp_id = self.find_experience(value) if self.find_experience is not None else None
+            if exp_id is None:
+                exp_id = self._match_name(self.by_experience, value)
+            return self.by_experience.get(exp_id, set())
+        terms = tokenize(value)
+        if value.endswith('*') and terms:
+            terms[-1] += '*'
+        return self._intersect([self.lookup_term(term) for term in terms])
+
+    def _match_name(self, postings, value):
+        # lp:/exp: values match case-insensitively
+        value = value.lower()
+        for name in postings:
+            if name.lower() == value:
+                return name
+        return None
+
+    def _intersect(self, sets):
+        if not sets:
+            return set()
+        sets = sorted(sets, key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def search(self, query):
+        # Whitespace-separated terms are ANDed; OR separates alternatives, so
+        # "conflict team OR disagree" is (conflict AND team) OR disagree.
+        # lp:"Dive Deep" and exp:"<title>" restrict by principle or story;
+        # a trailing * makes a term a prefix match. Returns ids in bank order.
+        result = set()
+        for group in re.split(r"\s+OR\s+", query.strip()):
+            clauses = []
+            for field, value in QUERY_RE.findall(group):
+                value = value.strip('"')
+                if field or tokenize(value):
+                    clauses.append(self.clause_ids(field.lower(), value))
+            result |= self._intersect(clauses)
+        return sorted(result, key=self.order.__getitem__)
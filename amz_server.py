@@ -0,0 +1,434 @@
+import asyncio
+import json
+import threading
+import urllib.parse
+import uuid
+
+from amz_storage import STORES
+from amz_transfer import normalize_question
+
+DEFAULT_HOST = "127.0.0.1"  # loopback only unless another host is asked for
+DEFAULT_PORT = 8765
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BODY = 16 * 1024 * 1024
+IDLE_TIMEOUT = 30.0  # seconds a keep-alive connection may wait for its next request
+BACKLOG = 1024
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           412: "Precondition Failed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BankServer:
+    # Read-mostly JSON API over the data stores, for a team sharing one bank:
+    #
+    #   GET    /api                    every store's ETag and size
+    #   GET    /api/<store>            list stores a page at a time (?offset=&limit=),
+    #                                  questions also by LP (?lp=); dict stores whole
+    #   GET    /api/<store>/<key>      one question or experience by id, or one dict entry
+    #   PUT    /api/<store>            replace the store (If-Match guards against
+    #                                  overwriting someone else's change)
+    #   PATCH  /api/<store>            [[key, value], ...]: upsert records by id
+    #                                  (questions, experiences), key (dict stores)
+    #                                  or position; a null value deletes
+    #
+    # Every store has a version; its ETag is the version plus a per-process
+    # instance id, so a restarted server never matches an old tag. A GET
+    # with a matching If-None-Match gets 304 and no body. Records are kept
+    # JSON-encoded, one bytes object each, next to the data, and pages are
+    # joined from them; a write re-encodes only the records it touches. The
+    # per-LP position lists are rebuilt on the first filtered read after a
+    # write that moved records or changed their LPs.
+    #
+    # Everything runs on one asyncio loop, so requests need no locking.
+    # Writes go through the storage backend (open it with background=True
+    # to keep file writes off the loop).
+    def __init__(self, storage, leadership_principles):
+        self.storage = storage
+        self.leadership_principles = list(leadership_principles)
+        self.instance = uuid.uuid4().hex[:8]
+        self.data = {}
+        self.versions = {}
+        self.encoded = {}  # list store -> [bytes per record]; dict store -> bytes of the whole
+        self.positions = {}  # list store with an id field -> {id: position}
+        self.lp_index = None  # LP -> question positions, in bank order
+        self.requests = 0
+        self.connections = 0
+        self.server = None
+        self.loop = None
+        self.thread = None
+        for store in STORES:
+            data = storage.load(store)
+            if not isinstance(data, STORES[store][1]):
+                data = STORES[store][1]()
+            self.data[store] = data
+            self.versions[store] = 1
+            if STORES[store][2] and self.assign_ids(store):
+                storage.save(store, data)
+
+    def assign_ids(self, store):
+        # As InterviewPrepCore does: missing or repeated ids get a fresh one
+        id_field = STORES[store][2]
+        seen = set()
+        changed = False
+        for record in self.data[store]:
+            if not isinstance(record, dict):
+                continue
+            if not record.get(id_field) or record[id_field] in seen:
+                record[id_field] = uuid.uuid4().hex
+                changed = True
+            seen.add(record[id_field])
+        return changed
+
+    def etag(self, store):
+        return f'"{self.instance}-{store}-{self.versions[store]}"'
+
+    # ----------------------- Index -----------------------
+    def encoded_records(self, store):
+        records = self.encoded.get(store)
+        if records is None:
+            records = self.encoded[store] = [encode(record) for record in self.data[store]]
+        return records
+
+    def encoded_whole(self, store):
+        body = self.encoded.get(store)
+        if body is None:
+            body = self.encoded[store] = encode(self.data[store])
+        return body
+
+    def record_positions(self, store):
+        positions = self.positions.get(store)
+        if positions is None:
+            id_field = STORES[store][2]
+            positions = self.positions[store] = {record[id_field]: pos for pos, record in enumerate(self.data[store])}
+        return positions
+
+    def lp_positions(self, lp):
+        if self.lp_index is None:
+            index = {name: [] for name in self.leadership_principles}
+            for pos, q in enumerate(self.data['questions']):
+                for name in q.get('leadership_principles', []):
+                    if name in index:
+                        index[name].append(pos)
+            self.lp_index = index
+        return self.lp_index[lp]
+
+    def changed(self, store, moved=False):
+        # moved: records were added, removed or reordered, or LPs changed
+        self.versions[store] += 1
+        if STORES[store][1] is dict:
+            self.encoded.pop(store, None)
+        if moved:
+            self.positions.pop(store, None)
+            if store == 'questions':
+                self.lp_index = None
+
+    # ----------------------- Requests -----------------------
+    def handle(self, method, target, headers, body):
+        # (status, headers, body) for one request
+        url = urllib.parse.urlsplit(target)
+        parts = [urllib.parse.unquote(part) for part in url.path.strip('/').split('/')]
+        if not parts or parts[0] != 'api' or len(parts) > 3:
+            raise HTTPError(404, f"Not found: {url.path}")
+        if len(parts) == 1:
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(405, "Only GET is allowed here")
+            index = {store: {'etag': self.etag(store), 'count': len(self.data[store])} for store in STORES}
+            return 200, {}, encode({'stores': index})
+        store = parts[1]
+        if store not in STORES:
+            raise HTTPError(404, f"Unknown store: {store}")
+        etag = self.etag(store)
+        if method in ('GET', 'HEAD'):
+            if matches(headers.get('if-none-match'), etag):
+                return 304, {'ETag': etag}, b""
+            query = urllib.parse.parse_qs(url.query)
+            if len(parts) == 3:
+                return 200, {'ETag': etag}, self.get_record(store, parts[2])
+            if STORES[store][1] is dict:
+                return 200, {'ETag': etag}, self.encoded_whole(store)
+            return 200, {'ETag': etag}, self.get_page(store, query)
+        if len(parts) != 2 or method not in ('PUT', 'PATCH'):
+            raise HTTPError(405, f"{method} is not allowed here")
+        if headers.get('if-match') and not matches(headers['if-match'], etag):
+            raise HTTPError(412, f"{store} has changed on the server")
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {str(e)}")
+        if method == 'PUT':
+            self.replace(store, payload)
+        else:
+            self.patch(store, payload)
+        return 200, {'ETag': self.etag(store)}, encode({'version': self.versions[store]})
+
+    def get_record(self, store, key):
+        if STORES[store][2]:
+            pos = self.record_positions(store).get(key)
+            if pos is None:
+                raise HTTPError(404, f"Unknown record: {key}")
+            return self.encoded_records(store)[pos]
+        if STORES[store][1] is dict and key in self.data[store]:
+            return encode(self.data[store][key])
+        raise HTTPError(404, f"Unknown record: {key}")
+
+    def get_page(self, store, query):
+        try:
+            offset = max(0, int(query.get('offset', ['0'])[0]))
+            limit = min(MAX_PAGE_SIZE, max(1, int(query.get('limit', [str(PAGE_SIZE)])[0])))
+        except ValueError:
+            raise HTTPError(400, "offset and limit must be integers")
+        records = self.encoded_records(store)
+        lp = query.get('lp', [None])[0]
+        if lp is not None:
+            if store != 'questions':
+                raise HTTPError(400, "Only questions can be filtered by LP")
+            if lp not in self.leadership_principles:
+                raise HTTPError(400, f"Unknown leadership principle: {lp}")
+            positions = self.lp_positions(lp)
+            total = len(positions)
+            items = [records[pos] for pos in positions[offset:offset + limit]]
+        else:
+            total = len(records)
+            items = records[offset:offset + limit]
+        head = f'{{"total": {total}, "offset": {offset}, "limit": {limit}, "items": ['.encode('utf-8')
+        return head + b", ".join(items) + b"]}"
+
+    def validate(self, store, key, value):
+        if store == 'questions':
+            try:
+                question = normalize_question(value, self.leadership_principles)
+            except ValueError as e:
+                raise HTTPError(400, f"Invalid question {key}: {str(e)}")
+            question['id'] = key
+            return question
+        if store == 'experiences':
+            if not isinstance(value, dict) or not str(value.get('title') or '').strip():
+                raise HTTPError(400, f"Invalid experience {key}: missing title")
+            return dict(value, id=key)
+        return value
+
+    def replace(self, store, payload):
+        if not isinstance(payload, STORES[store][1]):
+            raise HTTPError(400, f"{store} must be a JSON {STORES[store][1].__name__}")
+        if STORES[store][2]:
+            payload = [self.validate(store, r.get('id') if isinstance(r, dict) else None, r) for r in payload]
+        self.data[store] = payload
+        if STORES[store][2]:
+            self.assign_ids(store)
+        self.encoded.pop(store, None)
+        self.changed(store, moved=True)
+        self.storage.save(store, payload)
+
+    def patch(self, store, payload):
+        # Every item is checked before any is applied, so a rejected patch
+        # leaves the store, its version and the file untouched
+        if not isinstance(payload, list) or not all(isinstance(item, list) and len(item) == 2 for item in payload):
+            raise HTTPError(400, "Expected a list of [key, value] pairs")
+        items = [(str(key), None if value is None else self.validate(store, str(key), value)) for key, value in payload]
+        if STORES[store][1] is list and not STORES[store][2]:
+            self.check_positions(store, items)
+        data = self.data[store]
+        moved = False
+        for key, value in items:
+            if STORES[store][1] is dict:
+                if value is None:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            elif STORES[store][2]:
+                moved = self.patch_record(store, key, value) or moved
+            else:
+                moved = self.patch_position(store, key, value) or moved
+        self.changed(store, moved)
+        self.storage.update_many(store, data, items)
+
+    def patch_record(self, store, key, value):
+        # Returns True if positions (or a question's LPs) changed
+        data = self.data[store]
+        records = self.encoded_records(store)
+        positions = self.record_positions(store)
+        pos = positions.get(key)
+        if value is None:
+            if pos is None:
+                return False
+            del data[pos]
+            del records[pos]
+            self.positions.pop(store, None)
+            return True
+        if pos is None:
+            data.append(value)
+            records.append(encode(value))
+            positions[key] = len(data) - 1
+            return True
+        lps_changed = store == 'questions' and data[pos].get('leadership_principles') != value['leadership_principles']
+        data[pos] = value
+        records[pos] = encode(value)
+        return lps_changed
+
+    def check_positions(self, store, items):
+        # Each position must exist, or be the next one (an append), at the
+        # point in the patch where it is applied
+        length = len(self.data[store])
+        for key, value in items:
+            try:
+                pos = int(key)
+            except ValueError:
+                raise HTTPError(400, f"{store} records are addressed by position")
+            if value is None or not 0 <= pos <= length:
+                raise HTTPError(400, f"Invalid position for {store}: {key}")
+            if pos == length:
+                length += 1
+
+    def patch_position(self, store, key, value):
+        # Checked by check_positions
+        data = self.data[store]
+        pos = int(key)
+        if pos == len(data):
+            data.append(value)
+            if store in self.encoded:
+                self.encoded[store].append(encode(value))
+            return True
+        data[pos] = value
+        if store in self.encoded:
+            self.encoded[store][pos] = encode(value)
+        return False
+
+    # ----------------------- Connections -----------------------
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive; one request at a time per connection
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    return
+                if not line:
+                    return
+                keep_alive = await self.respond(line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def respond(self, line, reader, writer):
+        # Reads the rest of the request and writes the response. Returns
+        # whether the connection stays open.
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            self.write_response(writer, 400, {}, encode({'error': "Malformed request line"}), False)
+            return False
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        try:
+            length = self.content_length(headers)
+        except HTTPError as e:
+            # Without a usable length the body cannot be skipped, so the connection is closed
+            self.write_response(writer, e.status, {}, encode({'error': str(e)}), False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+        self.requests += 1
+        try:
+            status, extra, content = self.handle(method, target, headers, body)
+        except HTTPError as e:
+            status, extra, content = e.status, {}, encode({'error': str(e)})
+        except Exception as e:
+            # A failed storage write; the client sees it instead of a dropped connection
+            status, extra, content = 500, {}, encode({'error': str(e)})
+        self.write_response(writer, status, extra, b"" if method == 'HEAD' else content, keep_alive)
+        return keep_alive
+
+    def content_length(self, headers):
+        value = headers.get('content-length', '')
+        if not value:
+            return 0
+        # Digits only: int() would also take a sign, spaces or underscores
+        if not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, f"Invalid Content-Length: {value}")
+        length = int(value)
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large")
+        return length
+
+    def write_response(self, writer, status, headers, body, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}",
+                 "Cache-Control: no-cache",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        # Returns the bound port (useful with port 0)
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=BACKLOG)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        bound = await self.start(host, port)
+        if ready is not None:
+            ready(bound)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def serve_in_thread(self, host=DEFAULT_HOST, port=0):
+        # Runs the loop on a daemon thread (for local testing or an embedding
+        # app) and returns the bound port once it is listening
+        started = threading.Event()
+        bound = []
+
+        def ready(value):
+            bound.append(value)
+            started.set()
+
+        def run():
+            try:
+                asyncio.run(self.serve(host, port, ready))
+            except asyncio.CancelledError:
+                pass
+            finally:
+                started.set()
+
+        self.thread = threading.Thread(target=run, name="bank-server", daemon=True)
+        self.thread.start()
+        started.wait()
+        if not bound:
+            raise OSError(f"Could not listen on {host}:{port}")
+        return bound[0]
+
+    def shutdown(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+            if self.thread is not None:
+                self.thread.join()
+
+
+def encode(value):
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def matches(header, etag):
+    # If-None-Match / If-Match: a list of tags, or *
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
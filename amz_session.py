@@ -0,0 +1,97 @@
+import heapq
+
+from amz_speech import STAR_WINDOW
+
+SESSION_QUESTIONS = 8  # default length of a mock interview
+ANSWER_SECONDS = STAR_WINDOW[1]  # per-question countdown: the top of the STAR window
+RECENCY_DAYS = 14  # an LP not reviewed for this long counts as fully stale
+
+
+def lp_weights(analytics, leadership_principles, now=None):
+    # LP -> weight between 1 and 4: one for every LP with questions, plus up
+    # to one each for the share of its questions never practiced, the days
+    # since it was last reviewed and the share of its cards overdue
+    weights = {}
+    for lp in leadership_principles:
+        row = analytics.lp_summary(lp, now)
+        if not row['questions']:
+            continue
+        since = row['days_since_review']
+        stale = 1.0 if since is None else min(since / RECENCY_DAYS, 1.0)
+        weights[lp] = 1.0 + (1.0 - row['coverage']) + stale + row['overdue'] / row['questions']
+    return weights
+
+
+def balanced_plan(scheduler, weights, count=SESSION_QUESTIONS):
+    # [(question id, LP)] for a session of `count` distinct questions. Slots
+    # go to LPs by Sainte-Lague apportionment over `weights` (the LP with
+    # the highest weight / (2 * slots so far + 1) takes the next one), which
+    # keeps the split proportional while spreading LPs evenly through the
+    # session. Each LP serves its earliest-due cards not already planned.
+    order = {lp: i for i, lp in enumerate(weights)}
+    heap = [(-weight, order[lp], lp) for lp, weight in weights.items() if weight > 0]
+    heapq.heapify(heap)
+    slots = dict.fromkeys(weights, 0)
+    candidates = {}
+    planned = set()
+    plan = []
+    while heap and len(plan) < count:
+        priority, index, lp = heapq.heappop(heap)
+        if lp not in candidates:
+            candidates[lp] = iter(scheduler.upcoming(count, lp))
+        card = next((card for card in candidates[lp] if card.question_id not in planned), None)
+        if card is None:
+            continue  # the LP has run out of questions
+        planned.add(card.question_id)
+        plan.append((card.question_id, lp))
+        slots[lp] += 1
+        heapq.heappush(heap, (-weights[lp] / (2 * slots[lp] + 1), index, lp))
+    return plan
+
+
+class MockSession:
+    # A planned mock interview: the questions in order, a countdown for the
+    # one being answered, and a result per answered question. Times come
+    # from the caller's clock (time.monotonic() in the GUI).
+    def __init__(self, plan, answer_seconds=ANSWER_SECONDS):
+        self.plan = list(plan)  # [(question, LP)]
+        self.answer_seconds = answer_seconds
+        self.position = 0
+        self.started_at = None
+        self.timed_out = False
+        self.results = []
+
+    def __len__(self):
+        return len(self.plan)
+
+    def current(self):
+        return self.plan[self.position] if self.position < len(self.plan) else None
+
+    def upcoming(self):
+        return self.plan[self.position + 1] if self.position + 1 < len(self.plan) else None
+
+    def start_question(self, now):
+        self.started_at = now
+        self.timed_out = False
+
+    def remaining(self, now):
+        return self.answer_seconds - (now - self.started_at)
+
+    def finish_question(self, grade, now):
+        # Records the answer and moves on; returns the next (question, LP) or None
+        question, lp = self.plan[self.position]
+        seconds = now - self.started_at
+        self.results.append({'question_id': question['id'], 'lp': lp, 'grade': grade,
+                             'seconds': round(seconds, 1), 'overtime': seconds > self.answer_seconds})
+        self.position += 1
+        return self.current()
+
+    def summary(self):
+        answered = len(self.results)
+        return {
+            'questions': len(self.plan),
+            'answered': answered,
+            'average_seconds': round(sum(r['seconds'] for r in self.results) / answered, 1) if answered else None,
+            'overtime': sum(1 for r in self.results if r['overtime']),
+            'average_grade': round(sum(r['grade'] for r in self.results) / answered, 2) if answered else None,
+        }
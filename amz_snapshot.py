@@ -0,0 +1,300 @@
+import copy
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+# Read-only binary snapshot of the question bank, compiled from
+# questions.json so a large bank opens without parsing it:
+#
+#   header     magic, version, record count, the source file's size and
+#              mtime, and the offset of every section below
+#   LPs        the leadership principles as a JSON list (the mask bits)
+#   masks      one LP bitmask per question (uint16, or uint64 past 16 LPs)
+#   offsets    three tables of count + 1 uint64: ids, experience references
+#              and records, each indexing into its blob
+#   blobs      UTF-8 ids, newline-joined experience references, and each
+#              question's JSON exactly as questions.json holds it
+#
+# The file is mapped with mmap; ids, LPs and references are read from their
+# columns and a question's JSON is decoded only when it is asked for.
+MAGIC = b"AMZQSNAP"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ" + "Q" * 9)
+SECTIONS = ('lps', 'masks', 'id_offsets', 'ref_offsets', 'record_offsets', 'ids', 'refs', 'records', 'end')
+OFFSETS = {'ids': 'id_offsets', 'refs': 'ref_offsets', 'records': 'record_offsets'}  # blob -> its offset table
+
+
+class SnapshotError(ValueError):
+    # Not a snapshot, or one written by another version
+    pass
+
+
+def record_fields(question):
+    # (id, LPs, experience references, JSON) for one question dict
+    return (question['id'], question.get('leadership_principles', []), question.get('experiences', []),
+            json.dumps(question, ensure_ascii=False))
+
+
+def write_snapshot(path, records, leadership_principles, source_stat):
+    # records: (id, LPs, experience references, JSON) per question, in bank
+    # order. Writes `path` itself: the caller writes a temp file and renames
+    # it over the snapshot once nothing maps the old one (Windows cannot
+    # replace a file that is mapped).
+    bits = {lp: 1 << i for i, lp in enumerate(leadership_principles)}
+    masks = array('H' if len(bits) <= 16 else 'Q')
+    columns = {'ids': [], 'refs': [], 'records': []}
+    offsets = {name: array('Q', [0]) for name in columns}
+    for qid, lps, refs, text in records:
+        mask = 0
+        for lp in lps:
+            mask |= bits.get(lp, 0)
+        masks.append(mask)
+        for name, value in (('ids', qid), ('refs', "\n".join(refs)), ('records', text)):
+            data = value.encode('utf-8')
+            columns[name].append(data)
+            offsets[name].append(offsets[name][-1] + len(data))
+    sections = [json.dumps(list(leadership_principles), ensure_ascii=False).encode('utf-8'), masks.tobytes(),
+                offsets['ids'].tobytes(), offsets['refs'].tobytes(), offsets['records'].tobytes(),
+                b"".join(columns['ids']), b"".join(columns['refs']), b"".join(columns['records'])]
+    starts = []
+    position = HEADER.size
+    for section in sections:
+        position += -position % 8  # tables start 8-byte aligned
+        starts.append(position)
+        position += len(section)
+    starts.append(position)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(masks), source_stat.st_size, source_stat.st_mtime_ns, *starts))
+        for start, section in zip(starts, sections):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class QuestionSnapshot:
+    # A mapped snapshot file. Only the header and the LP list are parsed
+    # when it is opened; everything else is read from the mapping on demand.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                # An empty file cannot be mapped at all
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise SnapshotError(f"{path} is not a readable question snapshot: {e}")
+        view = None
+        try:
+            if self.mm.size() < HEADER.size:
+                raise SnapshotError(f"{path} is truncated")
+            magic, version, self.count, self.source_size, self.source_mtime_ns, *starts = HEADER.unpack_from(self.mm)
+            if magic != MAGIC or version != VERSION:
+                raise SnapshotError(f"{path} is not a version {VERSION} question snapshot")
+            if starts[-1] > self.mm.size():
+                raise SnapshotError(f"{path} is truncated")
+            self.starts = dict(zip(SECTIONS, starts))
+            self.leadership_principles = json.loads(self.section('lps'))
+            typecode = 'H' if len(self.leadership_principles) <= 16 else 'Q'
+            view = memoryview(self.mm)
+            self.masks = self.table(view, 'masks', self.count * struct.calcsize(typecode)).cast(typecode)
+            self.offsets = {name: self.table(view, table, (self.count + 1) * 8).cast('Q')
+                            for name, table in OFFSETS.items()}
+        except (ValueError, TypeError, struct.error) as e:
+            # Views taken so far have to go before the mapping can be closed
+            for table in [getattr(self, 'masks', None), *getattr(self, 'offsets', {}).values(), view]:
+                if table is not None:
+                    table.release()
+            self.mm.close()
+            if isinstance(e, SnapshotError):
+                raise
+            raise SnapshotError(f"{path} is not a readable question snapshot: {e}")
+        self.names = {}  # mask -> LPs
+
+    def table(self, view, name, size):
+        # A fixed-size table at the start of its section; a short one means
+        # the header and the sections disagree
+        start = self.starts[name]
+        following = SECTIONS[SECTIONS.index(name) + 1]
+        if start % 8 or start + size > self.starts[following]:
+            raise SnapshotError(f"{self.path} is truncated")
+        return view[start:start + size]
+
+    def __len__(self):
+        return self.count
+
+    def section(self, name):
+        # Up to the next section, less its alignment padding
+        following = SECTIONS[SECTIONS.index(name) + 1]
+        return self.mm[self.starts[name]:self.starts[following]].rstrip(b"\0")
+
+    def is_current(self, source_stat, leadership_principles):
+        # Stale once questions.json changes or the LPs (the mask bits) do
+        return (self.source_size == source_stat.st_size and self.source_mtime_ns == source_stat.st_mtime_ns
+                and self.leadership_principles == list(leadership_principles))
+
+    def blob(self, name, row):
+        offsets = self.offsets[name]
+        start = self.starts[name]
+        return self.mm[start + offsets[row]:start + offsets[row + 1]]
+
+    def question_id(self, row):
+        return self.blob('ids', row).decode('utf-8')
+
+    def question_ids(self):
+        # Every id in row order. Ids are normally ASCII, and then the blob is
+        # decoded once and sliced at the byte offsets.
+        offsets = self.offsets['ids']
+        start = self.starts['ids']
+        data = self.mm[start:start + offsets[self.count]]
+        text = data.decode('utf-8')
+        if len(text) != len(data):
+            return [self.question_id(row) for row in range(self.count)]
+        return [text[offsets[row]:offsets[row + 1]] for row in range(self.count)]
+
+    def lps(self, row):
+        # A tuple shared by every row with the same mask
+        mask = self.masks[row]
+        names = self.names.get(mask)
+        if names is None:
+            names = self.names[mask] = tuple(lp for i, lp in enumerate(self.leadership_principles) if mask >> i & 1)
+        return names
+
+    def refs(self, row):
+        offsets = self.offsets['refs']
+        if offsets[row] == offsets[row + 1]:
+            return ()
+        # Interned: the reverse indexes hold one string per experience
+        return [sys.intern(ref) for ref in self.blob('refs', row).decode('utf-8').split("\n")]
+
+    def raw(self, row):
+        # The question's JSON text
+        return self.blob('records', row).decode('utf-8')
+
+    def record(self, row):
+        return json.loads(self.blob('records', row))
+
+    def close(self):
+        # The column views must go before the mapping can be closed
+        self.masks.release()
+        for offsets in self.offsets.values():
+            offsets.release()
+        self.mm.close()
+
+
+class SnapshotQuestions:
+    # The question bank as a list whose records stay in the snapshot until
+    # they are needed. An entry is a snapshot row number or, for questions
+    # added since, the dict itself. Rows handed out by position or through
+    # `index` are decoded once and kept, so edits to them are what gets
+    # saved; plain iteration decodes rows it does not keep, for the bulk
+    # readers (search and duplicate indexes, validation, export). Saving
+    # writes untouched rows back as the JSON text they were read as.
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.row_ids = snapshot.question_ids()
+        self.entries = list(range(len(snapshot)))
+        self.decoded = {}  # row -> question, for rows handed out
+        self.rows = {}  # id() of a decoded question -> its row
+        self.index = SnapshotIndex(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        snapshot = self.snapshot
+        for entry in list(self.entries):
+            if not isinstance(entry, int):
+                yield entry
+            else:
+                # get(), as a copy may be read while the bank drops the row
+                question = self.decoded.get(entry)
+                yield question if question is not None else snapshot.record(entry)
+
+    def copy(self):
+        # The bank as it is now, for iterating on another thread while this
+        # one is edited; rows are still decoded only as they are read
+        bank = copy.copy(self)
+        bank.entries = list(self.entries)
+        return bank
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.resolve(entry) for entry in self.entries[position]]
+        return self.resolve(self.entries[position])
+
+    def resolve(self, entry):
+        return self.decode(entry) if isinstance(entry, int) else entry
+
+    def decode(self, row):
+        question = self.decoded.get(row)
+        if question is None:
+            question = self.decoded[row] = self.snapshot.record(row)
+            self.rows[id(question)] = row
+        return question
+
+    def append(self, question):
+        self.entries.append(question)
+
+    def remove(self, question):
+        row = self.rows.pop(id(question), None)
+        if row is None:
+            self.entries.remove(question)
+        else:
+            self.entries.remove(row)
+            del self.decoded[row]
+
+    def fields(self):
+        # (id, LPs, experience references) per question in bank order,
+        # from the snapshot columns for rows that were never decoded
+        snapshot = self.snapshot
+        for entry in list(self.entries):
+            question = entry if not isinstance(entry, int) else self.decoded.get(entry)
+            if question is None:
+                yield self.row_ids[entry], snapshot.lps(entry), snapshot.refs(entry)
+            else:
+                yield question['id'], question.get('leadership_principles', []), question.get('experiences', [])
+
+    def encoded_records(self):
+        # JSON text per question, for encode_json
+        snapshot = self.snapshot
+        return [snapshot.raw(entry) if isinstance(entry, int) and entry not in self.decoded
+                else json.dumps(self.resolve(entry), ensure_ascii=False) for entry in list(self.entries)]
+
+    def snapshot_records(self):
+        # write_snapshot input; untouched rows are copied column by column
+        snapshot = self.snapshot
+        for entry in list(self.entries):
+            if isinstance(entry, int) and entry not in self.decoded:
+                yield self.row_ids[entry], snapshot.lps(entry), snapshot.refs(entry), snapshot.raw(entry)
+            else:
+                yield record_fields(self.resolve(entry))
+
+
+class SnapshotIndex(MutableMapping):
+    # Question id -> question over SnapshotQuestions; looking a question up
+    # decodes it (once)
+    def __init__(self, questions):
+        self.questions = questions
+        self.entries = {qid: row for row, qid in enumerate(questions.row_ids)}  # id -> row, or the question
+
+    def __getitem__(self, question_id):
+        return self.questions.resolve(self.entries[question_id])
+
+    def __setitem__(self, question_id, question):
+        self.entries[question_id] = question
+
+    def __delitem__(self, question_id):
+        del self.entries[question_id]
+
+    def __contains__(self, question_id):
+        return question_id in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,151 @@
+import math
+
+from amz_audio import iter_pcm_chunks
+
+numpy = None
+
+FRAME_MS = 20  # analysis frame; energy and voice activity are per frame
+BLOCK_SECONDS = 1.0  # live chunks are buffered and analyzed a block at a time
+MIN_SPEECH_DBFS = -45.0  # quieter than this is never speech
+VAD_MARGIN_DB = 12.0  # speech is this far above the noise floor (10th percentile)
+MIN_PAUSE = 0.3  # shorter gaps are part of speech (between words)
+MIN_SEGMENT = 0.1  # shorter bursts are clicks, not speech
+HESITATION_PAUSE = (0.5, 2.0)  # pauses of this length read as "um..." moments
+STAR_WINDOW = (120.0, 180.0)  # a STAR answer should take 2-3 minutes
+
+
+def load_numpy():
+    # Optional: without NumPy recordings are simply not analyzed
+    global numpy
+    if numpy is None:
+        import numpy as module
+        numpy = module
+    return numpy
+
+
+def available():
+    try:
+        load_numpy()
+    except ImportError:
+        return False
+    return True
+
+
+class SpeechAnalyzer:
+    # Speech metrics for one recording of 16-bit PCM. feed() takes chunks as
+    # they are captured (it is a StreamingWavWriter listener) and keeps only
+    # one RMS value per FRAME_MS frame, so memory stays small for long
+    # sessions; result() runs voice-activity detection over those frames.
+    # All per-sample work is vectorized a block at a time.
+    def __init__(self, rate, channels=1):
+        load_numpy()
+        self.rate = rate
+        self.channels = channels
+        self.frame_len = max(1, rate * FRAME_MS // 1000)
+        self.block_bytes = int(rate * BLOCK_SECONDS) * channels * 2
+        self.pending = []
+        self.pending_bytes = 0
+        self.carry = numpy.zeros(0, dtype=numpy.int16)
+        self.rms = []  # arrays of per-frame RMS
+
+    def feed(self, chunk):
+        self.pending.append(chunk)
+        self.pending_bytes += len(chunk)
+        if self.pending_bytes >= self.block_bytes:
+            self.process()
+
+    def process(self):
+        data = b''.join(self.pending)
+        self.pending = []
+        self.pending_bytes = 0
+        samples = numpy.frombuffer(data[:len(data) - len(data) % (2 * self.channels)], dtype='<i2')
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1).astype(numpy.int16)
+        samples = numpy.concatenate((self.carry, samples))
+        count = len(samples) // self.frame_len
+        self.carry = samples[count * self.frame_len:]
+        if count:
+            frames = samples[:count * self.frame_len].reshape(count, self.frame_len).astype(numpy.float32)
+            self.rms.append(numpy.sqrt(numpy.einsum('ij,ij->i', frames, frames) / self.frame_len))
+
+    def segments(self):
+        # Speech as (start, end) frame indexes, end exclusive
+        self.process()
+        rms = numpy.concatenate(self.rms) if self.rms else numpy.zeros(0, dtype=numpy.float32)
+        if not len(rms):
+            return rms, numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int)
+        dbfs = 20 * numpy.log10(numpy.maximum(rms, 1.0) / 32768)
+        threshold = max(float(numpy.percentile(dbfs, 10)) + VAD_MARGIN_DB, MIN_SPEECH_DBFS)
+        voiced = numpy.concatenate(([False], dbfs > threshold, [False]))
+        edges = numpy.flatnonzero(numpy.diff(voiced.astype(numpy.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+        if len(starts) > 1:
+            # Bridge the gaps between words
+            keep = starts[1:] - ends[:-1] >= self.frames(MIN_PAUSE)
+            starts = numpy.concatenate((starts[:1], starts[1:][keep]))
+            ends = numpy.concatenate((ends[:-1][keep], ends[-1:]))
+        long_enough = ends - starts >= self.frames(MIN_SEGMENT)
+        return rms, starts[long_enough], ends[long_enough]
+
+    def frames(self, seconds):
+        return max(1, int(round(seconds * 1000 / FRAME_MS)))
+
+    def result(self):
+        rms, starts, ends = self.segments()
+        seconds = FRAME_MS / 1000
+        duration = len(rms) * seconds
+        speaking = float((ends - starts).sum()) * seconds
+        pauses = (starts[1:] - ends[:-1]) * seconds
+        answer = float(ends[-1] - starts[0]) * seconds if len(starts) else 0.0
+        if len(starts):
+            voiced = numpy.concatenate([rms[s:e] for s, e in zip(starts, ends)])
+            level = 20 * math.log10(max(float(numpy.sqrt(numpy.mean(voiced.astype(numpy.float64) ** 2))), 1.0) / 32768)
+        else:
+            level = None
+        if answer < STAR_WINDOW[0]:
+            star = 'short'
+        elif answer > STAR_WINDOW[1]:
+            star = 'long'
+        else:
+            star = 'ok'
+        return {
+            'duration': round(duration, 2),
+            'speaking_time': round(speaking, 2),
+            'silence_time': round(duration - speaking, 2),
+            'speech_ratio': round(speaking / duration, 3) if duration else 0.0,
+            'answer_time': round(answer, 2),  # first word to last word
+            'segments': int(len(starts)),
+            'longest_pause': round(float(pauses.max()), 2) if len(pauses) else 0.0,
+            'hesitations': int(((pauses >= HESITATION_PAUSE[0]) & (pauses < HESITATION_PAUSE[1])).sum()),
+            'long_pauses': int((pauses >= HESITATION_PAUSE[1]).sum()),
+            'speech_level_dbfs': round(level, 1) if level is not None else None,
+            'star_window': star,
+        }
+
+
+def analyze_wav(path):
+    # Same metrics for a saved recording (PCM or mu-law), read in large chunks
+    chunks = iter_pcm_chunks(path, frames=65536)
+    channels, rate = next(chunks)
+    analyzer = SpeechAnalyzer(rate, channels)
+    for chunk in chunks:
+        analyzer.feed(chunk)
+    return analyzer.result()
+
+
+def new_analyzer(rate):
+    # For RecordingArchive(analyzer=...); None when NumPy is missing, so the
+    # import cost is only paid once something is recorded
+    return SpeechAnalyzer(rate) if available() else None
+
+
+def describe(speech):
+    # One line for the Practice tab
+    if not speech:
+        return ""
+    window = {'short': "under the 2-3 minute STAR window", 'ok': "within the 2-3 minute STAR window",
+              'long': "over the 2-3 minute STAR window"}[speech['star_window']]
+    minutes, seconds = divmod(int(round(speech['answer_time'])), 60)
+    return (f"Answer {minutes}:{seconds:02d} ({window}); speaking {speech['speech_ratio']:.0%} of the time, "
+            f"longest pause {speech['longest_pause']:.1f} s, {speech['hesitations']} hesitations, "
+            f"{speech['long_pauses']} long pauses")
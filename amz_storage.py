@@ -0,0 +1,515 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from amz_practice_log import PracticeLog, make_event
+from amz_snapshot import QuestionSnapshot, SnapshotQuestions, record_fields, write_snapshot
+
+# Store name -> (JSON file name, empty value, id field). List stores with an
+# id field are addressed by that id, other list stores by position and dict
+# stores by key. Practice history is not a store: it is an append-only stream
+# of review events (see append_practice_event).
+STORES = {
+    'questions': ("questions.json", list, 'id'),
+    'experiences': ("experiences.json", list, 'id'),
+    'lp_matrix_data': ("lp_matrix_data.json", dict, None),
+    'interview_framework': ("interview_framework.json", dict, None),
+}
+
+# Stores the JSON backend also keeps as a binary snapshot (see amz_snapshot)
+SNAPSHOTS = {
+    'questions': "questions.snapshot",
+}
+
+SQLITE_FILENAME = "interview_prep.db"
+
+
+def encode_json(data):
+    # One record per line. Each record is encoded by a single C-level
+    # json.dumps call, which no other thread can interleave with, so a store
+    # can be serialized off the main thread while the UI keeps editing it.
+    if isinstance(data, dict):
+        lines = [f"{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}"
+                 for key, value in list(data.items())]
+        return "{\n" + ",\n".join(lines) + "\n}\n" if lines else "{}\n"
+    if isinstance(data, SnapshotQuestions):
+        lines = data.encoded_records()
+    else:
+        lines = [json.dumps(item, ensure_ascii=False) for item in list(data)]
+    return "[\n" + ",\n".join(lines) + "\n]\n" if lines else "[]\n"
+
+
+def write_json_atomic(path, data):
+    # Written to a temp file and renamed over the target, so a crash leaves
+    # either the old file or the new one, never a truncated one
+    text = encode_json(data)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PersistenceWorker:
+    # Write-behind thread shared by a storage backend. submit(key, fn, *args)
+    # schedules fn(*args); a later submit with the same key replaces the
+    # pending one, so a burst of changes to one store (or row) becomes one
+    # write. Jobs run once their key has been quiet for `delay` seconds, or
+    # `max_delay` after its first change at the latest, and always on
+    # flush()/close(). Jobs must read the live data when they run.
+    def __init__(self, delay=0.5, max_delay=2.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.pending = {}  # key -> (first change, last change, fn, args), oldest first
+        self.cond = threading.Condition()
+        self.busy = False
+        self.flushing = 0
+        self.closing = False
+        self.submitted = 0
+        self.writes = 0
+        self.coalesced = 0  # submissions absorbed by a later one
+        self.errors = queue.Queue()  # messages for the UI to show
+        self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, fn, *args):
+        now = time.monotonic()
+        with self.cond:
+            self.submitted += 1
+            previous = self.pending.pop(key, None)
+            if previous is not None:
+                self.coalesced += 1
+            # Re-inserted at the end so jobs keep the order of their last change
+            self.pending[key] = (previous[0] if previous else now, now, fn, args)
+            self.cond.notify_all()
+
+    def due_at(self, first, last):
+        return min(last + self.delay, first + self.max_delay)
+
+    def run(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                urgent = self.flushing or self.closing
+                due = [key for key, (first, last, fn, args) in self.pending.items()
+                       if urgent or self.due_at(first, last) <= now]
+                if not due:
+                    if self.closing:
+                        return
+                    timeout = min((self.due_at(first, last) for first, last, fn, args in self.pending.values()),
+                                  default=None)
+                    self.cond.wait(None if timeout is None else max(0.0, timeout - now))
+                    continue
+                jobs = [(key, self.pending.pop(key)) for key in due]
+                self.busy = True
+                self.cond.release()
+                try:
+                    for key, (first, last, fn, args) in jobs:
+                        try:
+                            fn(*args)
+                            self.writes += 1
+                        except Exception as e:
+                            self.errors.put(f"Failed to save {key[0] if isinstance(key, tuple) else key}: {str(e)}")
+                finally:
+                    self.cond.acquire()
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def flush(self):
+        # Blocks until everything submitted so far is on disk
+        if threading.current_thread() is self.thread:
+            return
+        with self.cond:
+            self.flushing += 1
+            self.cond.notify_all()
+            while self.pending or self.busy:
+                self.cond.wait()
+            self.flushing -= 1
+
+    def close(self):
+        self.flush()
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.thread.join()
+
+    def drain_errors(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.errors.get_nowait())
+            except queue.Empty:
+                return messages
+
+
+class JSONStorage:
+    # One JSON file per store, rewritten atomically on every change. update()
+    # takes the record that changed (value None for a deleted one) so callers
+    # stay backend-agnostic, but a JSON file can only be written as a whole.
+    # With a PersistenceWorker, saves return at once and bursts of changes to
+    # a store are coalesced into one write on the worker thread.
+    # Stores in SNAPSHOTS can also be opened from a snapshot compiled from
+    # their JSON file; it is rewritten on close when the store was saved.
+    name = 'json'
+    supports_row_writes = False
+    supports_snapshots = True
+
+    def __init__(self, directory=".", worker=None):
+        self.directory = directory
+        self.worker = worker
+        self.practice_log = None
+        self.snapshot_lps = {}  # store -> LPs its snapshot is keyed on
+        self.snapshot_data = {}  # store -> data to write a snapshot of on close
+        self.snapshots = []  # open snapshots, unmapped on close
+
+    def path(self, store):
+        return os.path.join(self.directory, STORES[store][0])
+
+    def exists(self, store):
+        return os.path.exists(self.path(store))
+
+    def load(self, store):
+        self.flush()
+        if not self.exists(store):
+            return STORES[store][1]()
+        with open(self.path(store), "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, store, data):
+        if store in self.snapshot_lps:
+            self.snapshot_data[store] = data
+        if self.worker is None:
+            write_json_atomic(self.path(store), data)
+        else:
+            self.worker.submit((store,), write_json_atomic, self.path(store), data)
+
+    def update(self, store, data, key, value):
+        self.save(store, data)
+
+    def update_many(self, store, data, items):
+        self.save(store, data)
+
+    def iter_records(self, store):
+        # The file has to be parsed whole; SQLite streams instead
+        data = self.load(store)
+        return iter(data if isinstance(data, list) else data.items())
+
+    def snapshot_path(self, store):
+        return os.path.join(self.directory, SNAPSHOTS[store])
+
+    def load_snapshot(self, store, leadership_principles):
+        # The store's snapshot if it was compiled from the current JSON file
+        # with these LPs, else None (the caller loads the JSON and passes it
+        # to save_snapshot)
+        self.flush()
+        self.snapshot_lps[store] = list(leadership_principles)
+        try:
+            source_stat = os.stat(self.path(store))
+            snapshot = QuestionSnapshot(self.snapshot_path(store))
+        except (OSError, ValueError):
+            # SnapshotError included; the JSON file is the source of truth
+            return None
+        if not snapshot.is_current(source_stat, leadership_principles):
+            snapshot.close()
+            return None
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def save_snapshot(self, store, data):
+        # Written on close, once the JSON file is final
+        self.snapshot_data[store] = data
+
+    def write_snapshots(self):
+        # New snapshots are written to temp files first, since they copy the
+        # untouched rows out of the old ones, and renamed into place once the
+        # old ones are unmapped. Returns the error messages; a snapshot that
+        # failed is rebuilt from the JSON file on the next load.
+        errors = []
+        written = []
+        for store, data in self.snapshot_data.items():
+            path = self.snapshot_path(store)
+            records = data.snapshot_records() if isinstance(data, SnapshotQuestions) else map(record_fields, data)
+            try:
+                source_stat = os.stat(self.path(store))
+            except FileNotFoundError:
+                # Nothing saved yet (a new data directory); nothing to compile
+                continue
+            try:
+                write_snapshot(path + ".tmp", records, self.snapshot_lps[store], source_stat)
+                written.append(path)
+            except OSError as e:
+                errors.append(f"Failed to write {path}: {str(e)}")
+        self.snapshot_data.clear()
+        for snapshot in self.snapshots:
+            snapshot.close()
+        self.snapshots = []
+        for path in written:
+            try:
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                errors.append(f"Failed to replace {path}: {str(e)}")
+        return errors
+
+    def get_practice_log(self):
+        if self.practice_log is None:
+            self.practice_log = PracticeLog(self.directory)
+        return self.practice_log
+
+    def load_practice_events(self):
+        return list(self.get_practice_log().events)
+
+    def append_practice_event(self, event):
+        self.get_practice_log().append(event)
+
+    def flush(self):
+        if self.worker is not None:
+            self.worker.flush()
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+        errors = self.write_snapshots()
+        if self.practice_log is not None:
+            self.practice_log.close()
+        if errors:
+            # Raised last so everything is closed; the JSON files are saved
+            raise OSError("; ".join(errors))
+
+
+class SQLiteStorage:
+    # One (key, pos, data) table per store: key is the record id, list
+    # position or dict key and pos keeps the original order, so changing one
+    # question, experience or story only touches one row. With a
+    # PersistenceWorker, writes are queued per row (or per store for a full
+    # save) and committed on the worker thread; practice events queued within
+    # the debounce window go in as one insert.
+    name = 'sqlite'
+    supports_row_writes = True
+    supports_snapshots = False
+
+    def __init__(self, filename=SQLITE_FILENAME, worker=None):
+        self.filename = filename
+        self.worker = worker
+        self.pending_events = []
+        self.batches = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for store in STORES:
+                self.migrate_store_table(store)
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {store} (key TEXT PRIMARY KEY, pos INTEGER NOT NULL, data TEXT NOT NULL)")
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {store}_pos ON {store} (pos)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS practice_events ("
+                              "id INTEGER PRIMARY KEY AUTOINCREMENT, question_id TEXT NOT NULL, "
+                              "timestamp TEXT NOT NULL, recording TEXT, duration REAL, grade INTEGER, speech TEXT)")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(practice_events)")]
+            if 'grade' not in columns:
+                self.conn.execute("ALTER TABLE practice_events ADD COLUMN grade INTEGER")
+            if 'speech' not in columns:
+                self.conn.execute("ALTER TABLE practice_events ADD COLUMN speech TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS practice_events_question ON practice_events (question_id)")
+            self.migrate_practice_history_table()
+
+    def migrate_store_table(self, store):
+        # Early databases had (key, data) tables keyed by list position
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({store})")]
+        if not columns or 'pos' in columns:
+            return
+        rows = self.conn.execute(f"SELECT key, data FROM {store} ORDER BY key").fetchall()
+        self.conn.execute(f"DROP TABLE {store}")
+        self.conn.execute(f"CREATE TABLE {store} (key TEXT PRIMARY KEY, pos INTEGER NOT NULL, data TEXT NOT NULL)")
+        if STORES[store][1] is list:
+            data = [json.loads(value) for _, value in rows]
+        else:
+            data = {key: json.loads(value) for key, value in rows}
+        self.conn.executemany(f"INSERT INTO {store} (key, pos, data) VALUES (?, ?, ?)", self._rows(store, data))
+
+    def migrate_practice_history_table(self):
+        # Databases created before the event log kept one row per question
+        # with only the last timestamp; turn those into events once.
+        legacy = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'practice_history'").fetchone()
+        if legacy is None:
+            return
+        rows = self.conn.execute("SELECT key, data FROM practice_history").fetchall()
+        events = sorted((json.loads(data), key) for key, data in rows)
+        self.conn.executemany("INSERT INTO practice_events (question_id, timestamp) VALUES (?, ?)",
+                              [(qid, ts) for ts, qid in events])
+        self.conn.execute("DROP TABLE practice_history")
+
+    def load(self, store):
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(f"SELECT key, data FROM {store} ORDER BY pos").fetchall()
+        if STORES[store][1] is list:
+            return [json.loads(data) for _, data in rows]
+        return {key: json.loads(data) for key, data in rows}
+
+    def save(self, store, data):
+        if self.worker is None:
+            self.write_store(store, data)
+        else:
+            self.worker.submit((store,), self.write_store, store, data)
+
+    def write_store(self, store, data):
+        rows = self._rows(store, data)
+        with self.lock, self.conn:
+            self.conn.execute(f"DELETE FROM {store}")
+            self.conn.executemany(f"INSERT INTO {store} (key, pos, data) VALUES (?, ?, ?)", rows)
+
+    def update(self, store, data, key, value):
+        self.update_many(store, data, [(key, value)])
+
+    def update_many(self, store, data, items):
+        # (key, value) pairs written in one transaction; value None deletes.
+        # Queued single-row changes coalesce per row; a batch is one job.
+        items = [(str(key), value) for key, value in items]
+        if self.worker is None:
+            self.write_rows(store, items)
+        elif len(items) == 1:
+            self.worker.submit((store, items[0][0]), self.write_rows, store, items)
+        else:
+            self.batches += 1
+            self.worker.submit((store, 'batch', self.batches), self.write_rows, store, items)
+
+    def write_rows(self, store, items):
+        with self.lock, self.conn:
+            for key, value in items:
+                self._write_row(store, key, value)
+
+    def _write_row(self, store, key, value):
+        if value is None:
+            self.conn.execute(f"DELETE FROM {store} WHERE key = ?", (key,))
+            return
+        if STORES[store][1] is list and STORES[store][2] is None:
+            pos = int(key)
+        else:
+            # Keep the row's place, or append after the last one
+            row = self.conn.execute(f"SELECT pos FROM {store} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                row = self.conn.execute(f"SELECT COALESCE(MAX(pos) + 1, 0) FROM {store}").fetchone()
+            pos = row[0]
+        self.conn.execute(f"INSERT OR REPLACE INTO {store} (key, pos, data) VALUES (?, ?, ?)",
+                          (key, pos, json.dumps(value, ensure_ascii=False)))
+
+    def iter_records(self, store, page_size=1000):
+        # Records in order, read a page at a time so memory stays bounded;
+        # dict stores yield (key, value) pairs
+        self.flush()
+        last = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute(f"SELECT key, pos, data FROM {store} WHERE pos > ? ORDER BY pos LIMIT ?",
+                                         (last, page_size)).fetchall()
+            for key, pos, data in rows:
+                yield json.loads(data) if STORES[store][1] is list else (key, json.loads(data))
+            if len(rows) < page_size:
+                return
+            last = rows[-1][1]
+
+    def load_practice_events(self):
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute("SELECT question_id, timestamp, recording, duration, grade, speech "
+                                     "FROM practice_events ORDER BY id").fetchall()
+        return [make_event(*row[:5], json.loads(row[5]) if row[5] else None) for row in rows]
+
+    def append_practice_event(self, event):
+        self.append_practice_events([event])
+
+    def append_practice_events(self, events):
+        rows = [(e['question_id'], e['timestamp'], e.get('recording'), e.get('duration'), e.get('grade'),
+                 json.dumps(e['speech']) if e.get('speech') else None) for e in events]
+        if self.worker is None:
+            self.write_events(rows)
+            return
+        with self.lock:
+            self.pending_events.extend(rows)
+        self.worker.submit(('practice_events',), self.write_pending_events)
+
+    def write_pending_events(self):
+        with self.lock:
+            rows, self.pending_events = self.pending_events, []
+        self.write_events(rows)
+
+    def write_events(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT INTO practice_events (question_id, timestamp, recording, duration, grade, speech) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def _rows(self, store, data):
+        id_field = STORES[store][2]
+        # Snapshot first: a queued save runs while the UI may still be editing
+        if STORES[store][1] is list:
+            return [(str(item.get(id_field, f"#{idx}")) if id_field else str(idx), idx, json.dumps(item, ensure_ascii=False))
+                    for idx, item in enumerate(list(data))]
+        return [(key, idx, json.dumps(value, ensure_ascii=False)) for idx, (key, value) in enumerate(list(data.items()))]
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def flush(self):
+        if self.worker is not None:
+            self.worker.flush()
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+        self.conn.close()
+
+
+def migrate_json_to_sqlite(source, target):
+    # One-shot copy of every JSON store into the SQLite database. Returns the
+    # number of records copied per store; does nothing if already migrated.
+    if target.get_meta('migrated_from_json'):
+        return {}
+    counts = {}
+    for store in STORES:
+        if source.exists(store):
+            data = source.load(store)
+            if not isinstance(data, STORES[store][1]):
+                data = STORES[store][1]()
+            target.save(store, data)
+            counts[store] = len(data)
+    events = source.load_practice_events()
+    target.append_practice_events(events)
+    counts['practice_events'] = len(events)
+    source.close()
+    target.flush()
+    target.set_meta('migrated_from_json', '1')
+    return counts
+
+
+def open_storage(backend=None, directory=".", background=False, url=None):
+    # Use SQLite when asked for or when a database already exists; a new
+    # database is seeded from the JSON files on first open. With a url the
+    # stores come from an amz_server instance instead, cached in directory.
+    # background moves writes to a PersistenceWorker; close() flushes them.
+    db_path = os.path.join(directory, SQLITE_FILENAME)
+    if backend is None:
+        backend = 'remote' if url else 'sqlite' if os.path.exists(db_path) else 'json'
+    if backend not in ('json', 'sqlite', 'remote'):
+        raise ValueError(f"Unknown storage backend: {backend}")
+    if backend == 'remote' and not url:
+        raise ValueError("The remote backend needs a server URL")
+    worker = PersistenceWorker() if background else None
+    if backend == 'remote':
+        from amz_remote import RemoteStorage
+        return RemoteStorage(url, directory, worker)
+    if backend == 'json':
+        return JSONStorage(directory, worker)
+    storage = SQLiteStorage(db_path, worker)
+    migrate_json_to_sqlite(JSONStorage(directory), storage)
+    return storage
@@ -0,0 +1,122 @@
+import csv
+import json
+import os
+import re
+
+# Bulk question files. JSONL holds one question object per line; CSV has one
+# row per question with list fields (key points, experiences, leadership
+# principles) joined by newlines inside the cell. Both are read and written
+# one record at a time, so memory use does not depend on the file size.
+# Plain .json (a list, as in questions.json) is accepted too but is parsed
+# whole.
+CSV_FIELDS = ['id', 'question', 'answer', 'key_points', 'experiences', 'leadership_principles']
+LIST_FIELDS = ['key_points', 'experiences', 'leadership_principles']
+FORMATS = ('jsonl', 'csv', 'json')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext in ('.csv', '.json'):
+        return ext[1:]
+    raise ValueError(f"Cannot tell the format of {path}; use .jsonl, .csv or .json")
+
+
+def read_records(path, fmt=None):
+    # Yields (line number, record). A line that cannot be parsed yields a
+    # ValueError in place of the record so the import can report and skip it.
+    fmt = detect_format(path, fmt)
+    if fmt == 'json':
+        with open(path, "r", encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{path} does not hold a JSON list")
+        for idx, record in enumerate(data, 1):
+            yield idx, record
+    elif fmt == 'jsonl':
+        with open(path, "r", encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"invalid JSON: {str(e)}")
+    else:
+        with open(path, "r", encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            if 'question' not in (reader.fieldnames or []):
+                raise ValueError(f"{path} has no 'question' column")
+            for row in reader:
+                yield reader.line_num, row
+
+
+def write_records(questions, path, fmt=None):
+    # Streams the questions to path; returns the number written
+    fmt = detect_format(path, fmt)
+    count = 0
+    if fmt == 'json':
+        questions = list(questions)
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False, indent=2)
+        return len(questions)
+    with open(path, "w", encoding='utf-8', newline='') as f:
+        if fmt == 'jsonl':
+            for question in questions:
+                f.write(json.dumps(question, ensure_ascii=False) + "\n")
+                count += 1
+        else:
+            writer = csv.DictWriter(f, CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for question in questions:
+                row = dict(question)
+                for field in LIST_FIELDS:
+                    row[field] = "\n".join(question.get(field, []))
+                writer.writerow(row)
+                count += 1
+    return count
+
+
+def text_key(text):
+    # Questions that differ only in case, spacing or punctuation are duplicates
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split("\n") if item.strip()]
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    raise ValueError(f"expected a list, got {type(value).__name__}")
+
+
+def normalize_question(record, leadership_principles):
+    # Returns a clean question dict or raises ValueError. Leadership
+    # principles must be known ones; case differences are forgiven.
+    if not isinstance(record, dict):
+        raise ValueError("not an object")
+    text = str(record.get('question') or '').strip()
+    if not text:
+        raise ValueError("missing question text")
+    canonical = {lp.lower(): lp for lp in leadership_principles}
+    lps = []
+    for lp in as_list(record.get('leadership_principles')):
+        if lp.lower() not in canonical:
+            raise ValueError(f"unknown leadership principle: {lp}")
+        if canonical[lp.lower()] not in lps:
+            lps.append(canonical[lp.lower()])
+    question = {
+        'question': text,
+        'answer': str(record.get('answer') or '').strip(),
+        'key_points': as_list(record.get('key_points')),
+        'experiences': as_list(record.get('experiences')),
+        'leadership_principles': lps,
+    }
+    if record.get('id'):
+        question['id'] = str(record['id'])
+    return question
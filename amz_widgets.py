@@ -0,0 +1,148 @@
+from tkinter import ttk
+
+
+class VirtualTreeview(ttk.Frame):
+    # A Treeview that only materializes the rows in view plus a small buffer
+    # on either side. The full list is kept as a list of row keys (used as
+    # item iids) and values are produced on demand by row_values(key), so
+    # the cost of a refresh depends on the window size, not the list size.
+    def __init__(self, parent, columns, row_values, buffer=20, **kwargs):
+        super().__init__(parent)
+        self.row_values = row_values
+        self.buffer = buffer
+        self.keys = []
+        self.first = 0  # index of the first materialized row
+        self.top = 0  # index of the first visible row
+        self.visible = 20
+        self.selected_key = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.tree.bind('<Configure>', self.on_configure)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.top - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.top + 3))
+        self.tree.bind('<Up>', self.on_arrow)
+        self.tree.bind('<Down>', self.on_arrow)
+        self.tree.bind('<Prior>', lambda e: self.scroll_to(self.top - self.visible))
+        self.tree.bind('<Next>', lambda e: self.scroll_to(self.top + self.visible))
+        self.tree.bind('<<TreeviewSelect>>', self.on_select, add='+')
+
+    # --- data ---
+    def set_rows(self, keys):
+        self.keys = list(keys)
+        self.top = min(self.top, max(0, len(self.keys) - self.visible))
+        self.materialize()
+
+    def update_row(self, key):
+        # Refresh one row's values; nothing happens if it is off screen
+        if self.tree.exists(key):
+            self.tree.item(key, values=self.row_values(key))
+
+    def insert_row(self, key, index=None):
+        index = len(self.keys) if index is None else index
+        self.keys.insert(index, key)
+        if index < self.top + self.visible + self.buffer:
+            self.materialize()
+        else:
+            self.update_scrollbar()
+
+    def delete_row(self, key):
+        try:
+            index = self.keys.index(key)
+        except ValueError:
+            return
+        del self.keys[index]
+        if self.selected_key == key:
+            self.selected_key = None
+        if self.tree.exists(key) or index < self.first:
+            self.top = min(self.top, max(0, len(self.keys) - self.visible))
+            self.materialize()
+        else:
+            self.update_scrollbar()
+
+    # --- windowing ---
+    def materialize(self):
+        # Rebuild the materialized window around self.top
+        self.first = max(0, self.top - self.buffer)
+        last = min(len(self.keys), self.top + self.visible + self.buffer)
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for key in self.keys[self.first:last]:
+            self.tree.insert('', 'end', iid=key, values=self.row_values(key))
+        if self.selected_key is not None and self.tree.exists(self.selected_key):
+            self.tree.selection_set(self.selected_key)
+            self.tree.focus(self.selected_key)
+        self.align()
+
+    def align(self):
+        count = len(self.tree.get_children())
+        if count:
+            self.tree.yview_moveto((self.top - self.first) / count)
+        self.update_scrollbar()
+
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.keys) - self.visible))
+        if top == self.top:
+            return 'break'
+        self.top = top
+        last_materialized = self.first + len(self.tree.get_children())
+        if self.first <= top and top + self.visible <= last_materialized:
+            self.align()
+        else:
+            self.materialize()
+        return 'break'
+
+    def update_scrollbar(self):
+        total = len(self.keys)
+        if total <= self.visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / total, (self.top + self.visible) / total)
+
+    # --- events ---
+    def on_configure(self, event):
+        rowheight = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        visible = max(1, (event.height - 25) // int(rowheight))
+        if visible != self.visible:
+            self.visible = visible
+            self.materialize()
+
+    def on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            return self.scroll_to(int(float(args[0]) * len(self.keys)))
+        amount = int(args[0])
+        step = self.visible if args[1] == 'pages' else 1
+        return self.scroll_to(self.top + amount * step)
+
+    def on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_to(self.top - steps * 3)
+
+    def on_arrow(self, event):
+        # Let the Treeview move the focus, scrolling the window at its edges
+        focus = self.tree.focus()
+        if not focus:
+            return None
+        index = self.tree.index(focus) + self.first
+        target = index - 1 if event.keysym == 'Up' else index + 1
+        if not 0 <= target < len(self.keys):
+            return 'break'
+        if target < self.top:
+            self.scroll_to(target)
+        elif target >= self.top + self.visible:
+            self.scroll_to(target - self.visible + 1)
+        key = self.keys[target]
+        self.tree.selection_set(key)
+        self.tree.focus(key)
+        return 'break'
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_key = selection[0]
@@ -0,0 +1,120 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amz_core import LEADERSHIP_PRINCIPLES
+from amz_scheduler import TIMESTAMP_FORMAT
+
+# Synthetic data files in the app's on-disk format, for benchmarking:
+#   python benchmarks/generate_dataset.py /tmp/bench --questions 100000
+# Records are written one at a time, so 1M questions need no more memory
+# than 1k. The same seed always produces the same data.
+
+WORDS = ("customer team project deadline conflict metric launch outage design review hire mentor budget "
+         "cost scale latency migration data roadmap stakeholder priority risk feedback escalation quality "
+         "service release experiment failure ownership decision trade-off automation incident").split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def write_json_list(path, records):
+    # Streams a JSON list without building it in memory
+    with open(path, "w", encoding='utf-8') as f:
+        f.write("[")
+        for idx, record in enumerate(records):
+            f.write(",\n" if idx else "\n")
+            f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n]\n")
+
+
+def generate(directory, questions=1000, experiences=None, events=None, seed=0, legacy_history=False,
+             legacy_experiences=False):
+    # Writes questions.json, experiences.json, lp_matrix_data.json and the
+    # practice log (or a legacy practice_history.json). legacy_experiences
+    # cites experiences by title, as before they had ids. Returns the counts.
+    rng = random.Random(seed)
+    experiences = max(1, questions // 10) if experiences is None else experiences
+    events = questions * 2 if events is None else events
+    os.makedirs(directory, exist_ok=True)
+
+    titles = [f"Experience {i}: {sentence(rng, 3)}" for i in range(experiences)]
+    ids = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(questions)]
+    exp_ids = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(experiences)]
+    keys = titles if legacy_experiences else exp_ids  # how questions and stories cite experiences
+
+    def question_records():
+        for qid in ids:
+            yield {
+                'question': f"Tell me about a time when {sentence(rng, 8).lower()}?",
+                'answer': sentence(rng, 40),
+                'key_points': [sentence(rng, 5) for _ in range(3)],
+                'experiences': rng.sample(keys, min(2, len(keys))),
+                'leadership_principles': rng.sample(LEADERSHIP_PRINCIPLES, rng.randint(1, 3)),
+                'id': qid,
+            }
+
+    write_json_list(os.path.join(directory, "questions.json"), question_records())
+    write_json_list(os.path.join(directory, "experiences.json"),
+                    ({'title': title, 'description': sentence(rng, 60)} if legacy_experiences else
+                     {'id': exp_id, 'title': title, 'description': sentence(rng, 60)}
+                     for exp_id, title in zip(exp_ids, titles)))
+
+    # Three stories per experience, nested as experience -> LP -> story
+    with open(os.path.join(directory, "lp_matrix_data.json"), "w", encoding='utf-8') as f:
+        f.write("{")
+        for idx, key in enumerate(keys):
+            row = {lp: {'story': sentence(rng, 80)} for lp in rng.sample(LEADERSHIP_PRINCIPLES, 3)}
+            f.write(",\n" if idx else "\n")
+            f.write(f"{json.dumps(key, ensure_ascii=False)}: {json.dumps(row, ensure_ascii=False)}")
+        f.write("\n}\n")
+
+    # Reviews spread over the last year, in time order
+    start = datetime.datetime.now() - datetime.timedelta(days=365)
+    step = 365 * 86400 / max(events, 1)
+    if legacy_history:
+        history = {}
+        for n in range(events):
+            history[rng.choice(ids)] = (start + datetime.timedelta(seconds=n * step)).strftime(TIMESTAMP_FORMAT)
+        with open(os.path.join(directory, "practice_history.json"), "w", encoding='utf-8') as f:
+            json.dump(history, f)
+    else:
+        with open(os.path.join(directory, "practice_log.jsonl"), "w", encoding='utf-8') as f:
+            for n in range(events):
+                event = {
+                    'question_id': rng.choice(ids),
+                    'timestamp': (start + datetime.timedelta(seconds=n * step)).strftime(TIMESTAMP_FORMAT),
+                    'recording': None,
+                    'duration': None,
+                    'grade': rng.choice((1, 3, 4, 4, 4, 5)),
+                }
+                f.write(json.dumps(event) + "\n")
+    return {'questions': questions, 'experiences': experiences, 'stories': experiences * 3, 'events': events}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic interview prep dataset")
+    parser.add_argument('directory')
+    parser.add_argument('--questions', type=int, default=1000)
+    parser.add_argument('--experiences', type=int, help="default: questions / 10")
+    parser.add_argument('--events', type=int, help="practice reviews (default: 2 per question)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--legacy-history', action='store_true',
+                        help="write practice_history.json (last review per question) instead of the practice log")
+    parser.add_argument('--legacy-experiences', action='store_true',
+                        help="cite experiences by title, as data saved before experiences had ids")
+    args = parser.parse_args(argv)
+    counts = generate(args.directory, args.questions, args.experiences, args.events, args.seed, args.legacy_history,
+                      args.legacy_experiences)
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amz_core import InterviewPrepCore, LEADERSHIP_PRINCIPLES
+from amz_lptable import LPTable
+from amz_scheduler import ALL, GRADE_GOOD
+from amz_storage import open_storage
+from generate_dataset import generate
+
+# Times the hot paths on synthetic datasets and writes the results as JSON:
+#   python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 -o results.json
+#   python benchmarks/run_benchmarks.py -o new.json --compare results.json
+# Each benchmark runs --repeat times on a fresh storage/core so loads are cold.
+# The GUI paths (question tree, LP matrix grid, progress tab) are timed only
+# when tkinter can open a display; otherwise they are reported as skipped.
+
+
+def timed(fn, repeat, setup=None):
+    # Seconds per run; setup() (untimed) returns the argument passed to fn
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def core_benchmarks(directory, backend, repeat):
+    # Yields (name, seconds per run, calls per run)
+    open_cores = []
+
+    def fresh(*loaders):
+        for core in open_cores:
+            core.close()
+        open_cores.clear()
+        core = InterviewPrepCore(open_storage(backend, directory))
+        open_cores.append(core)
+        for loader in loaders:
+            getattr(core, loader)()
+        return core
+
+    def without_snapshot():
+        core = fresh()
+        if core.storage.supports_snapshots:
+            remove_snapshot(core.storage)
+        return core
+
+    def with_snapshot():
+        # Closing a core that loaded the questions writes the snapshot
+        fresh('load_questions')
+        return fresh()
+
+    yield 'load_questions', timed(lambda core: core.load_questions(), repeat, without_snapshot), 1
+    if fresh().storage.supports_snapshots:
+        yield 'load_questions (snapshot)', timed(lambda core: core.load_questions(), repeat, with_snapshot), 1
+    yield 'load_experiences', timed(lambda core: core.load_experiences(), repeat, fresh), 1
+    yield 'load_lp_matrix', timed(lambda core: core.load_lp_matrix(), repeat, fresh), 1
+    yield 'load_interview_framework', timed(lambda core: core.load_interview_framework(), repeat, fresh), 1
+    yield 'load_practice', timed(lambda core: core.load_practice(), repeat, lambda: fresh('load_questions')), 1
+    yield 'build_search_index', timed(lambda core: core.build_search_index(), repeat, lambda: fresh('load_questions')), 1
+    yield 'build_duplicate_index', timed(lambda core: core.build_duplicate_index(), repeat, lambda: fresh('load_questions')), 1
+    yield 'build_recommender', timed(lambda core: core.build_recommender(), repeat,
+                                     lambda: fresh('load_experiences', 'load_lp_matrix')), 1
+
+    core = fresh('load_questions', 'load_experiences', 'load_lp_matrix', 'load_practice', 'build_search_index',
+                 'build_duplicate_index', 'build_recommender')
+    qid = core.questions[len(core.questions) // 2]['id']
+    question = core.question_index[qid]
+    exp_id = core.experiences[0]['id']
+    titles = [core.experiences[0]['title'] + " (renamed)", core.experiences[0]['title']]
+
+    def rename_experience():
+        # Back and forth between two titles; references follow the id
+        titles.reverse()
+        core.save_experience(titles[0], "benchmark", exp_id)
+
+    yield 'save_questions', timed(core.save_questions, repeat), 1
+    yield 'save_question (one edit)', timed(lambda: core.save_question(dict(question), qid), repeat), 1
+    yield 'save_experiences', timed(core.save_experiences, repeat), 1
+    yield 'save_experience (one edit)', timed(lambda: core.save_experience(core.experience_title(exp_id), "benchmark",
+                                                                            exp_id), repeat), 1
+    yield 'save_experience (rename)', timed(rename_experience, repeat), 1
+    yield 'save_lp_matrix', timed(core.save_lp_matrix, repeat), 1
+    yield 'set_story (one edit)', timed(lambda: core.set_story(exp_id, LEADERSHIP_PRINCIPLES[0], "benchmark"), repeat), 1
+    yield 'record_review (one event)', timed(lambda: core.record_review(qid, GRADE_GOOD), repeat), 1
+
+    # select_flashcard: draw the next card and grade it, 1000 times
+    def practice_cycle(lp):
+        previous = None
+        for _ in range(1000):
+            question = core.next_card(lp, previous)
+            previous = question['id']
+            core.scheduler.review(previous, GRADE_GOOD)
+
+    yield 'select_flashcard (All)', timed(lambda: practice_cycle(ALL), repeat), 1000
+    yield 'select_flashcard (one LP)', timed(lambda: practice_cycle('Ownership'), repeat), 1000
+    # start_practice: first card for every LP filter
+    yield 'start_practice (each LP)', timed(lambda: [core.next_card(lp) for lp in [ALL] + LEADERSHIP_PRINCIPLES], repeat), 17
+    yield 'due_cards (50)', timed(lambda: core.due_cards(50), repeat), 1
+    yield 'search (2 terms + lp)', timed(lambda: core.search('team conf* lp:"Dive Deep"'), repeat), 1
+    # Question editor lookups, run as the user types
+    yield 'similar_questions (editor)', timed(lambda: core.similar_questions(question['question'], exclude=qid), repeat), 1
+    yield 'recommend_experiences (editor)', timed(lambda: core.recommend_experiences(
+        question['question'] + " " + question['answer'], question['leadership_principles']), repeat), 1
+    yield 'progress (summary + per LP)', timed(core.progress, repeat), 1
+    yield 'plan_session (8)', timed(lambda: core.plan_session(8), repeat), 1
+    yield 'stats', timed(core.stats, repeat), 1
+    yield 'validate', timed(core.validate, repeat), 1
+
+    # LP filters and counts: the list of dicts against the bitmask table
+    questions = list(core.questions)
+    lps = LEADERSHIP_PRINCIPLES[:3]
+    wanted = set(lps)
+    yield 'lp filter any (list of dicts)', timed(lambda: [q['id'] for q in questions
+                                                          if wanted.intersection(q['leadership_principles'])], repeat), 1
+    yield 'lp filter any (LP table)', timed(lambda: core.lp_table.select(lps), repeat), 1
+    yield 'lp filter all (list of dicts)', timed(lambda: [q['id'] for q in questions
+                                                          if wanted.issubset(q['leadership_principles'])], repeat), 1
+    yield 'lp filter all (LP table)', timed(lambda: core.lp_table.select(lps, 'all'), repeat), 1
+    yield 'lp counts (list of dicts)', timed(lambda: Counter(lp for q in questions for lp in q['leadership_principles']),
+                                             repeat), 1
+    yield 'lp counts (LP table)', timed(core.lp_table.counts, repeat), 1
+    for core in open_cores:
+        core.close()
+
+
+def remove_snapshot(storage):
+    try:
+        os.remove(storage.snapshot_path('questions'))
+    except FileNotFoundError:
+        pass
+
+
+def memory_benchmarks(directory, backend):
+    # Yields (name, bytes): the loaded question bank, parsed from JSON and
+    # opened from the snapshot; then the LP lists held by the question dicts
+    # against the bitmask table (mask column alone, and with its id list and
+    # index)
+    for label, keep_snapshot in (('questions loaded (JSON)', False), ('questions loaded (snapshot)', True)):
+        core = InterviewPrepCore(open_storage(backend, directory))
+        if not core.storage.supports_snapshots:
+            core.close()
+            break
+        if not keep_snapshot:
+            remove_snapshot(core.storage)
+        tracemalloc.start()
+        try:
+            core.load_questions()
+            yield label, tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+            core.close()
+    core = InterviewPrepCore(open_storage(backend, directory))
+    try:
+        core.load_questions()
+        tracemalloc.start()
+        lists = [list(q['leadership_principles']) for q in core.questions]
+        yield 'lp lists (list of dicts)', tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del lists
+        tracemalloc.start()
+        table = LPTable(core.leadership_principles, core.question_fields())
+        yield 'lp table (total)', tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        yield 'lp table (mask column)', table.nbytes()
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        core.close()
+
+
+def gui_benchmarks(directory, backend, repeat):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        raise RuntimeError(f"no display: {str(e)}")
+    from amz_interview import AmazonInterviewPrep
+
+    app = AmazonInterviewPrep(root, storage=open_storage(backend, directory))
+    app.load_data(['questions', 'experiences', 'lp_matrix', 'practice', 'search'])
+
+    def rebuild(tab):
+        frame, builder, data = app.tabs[tab]
+        for child in frame.winfo_children():
+            child.destroy()
+        builder(frame)
+        app.built_tabs.add(tab)
+
+    try:
+        yield 'build question bank tab', timed(lambda: rebuild('question_bank'), repeat), 1
+        yield 'update_question_tree', timed(app.update_question_tree, repeat), 1
+        yield 'build lp matrix tab', timed(lambda: rebuild('lp_matrix'), repeat), 1
+        yield 'update_lp_matrix_tree', timed(app.update_lp_matrix_tree, repeat), 1
+        yield 'build progress tab', timed(lambda: rebuild('progress'), repeat), 1
+    finally:
+        app.core.close()
+        root.destroy()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, backends, repeat, data_dir=None, gui=True, log=sys.stderr):
+    results = []
+    memory = []
+    skipped = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for backend in backends:
+                # Fresh data per backend: SQLite is seeded from the JSON files
+                directory = os.path.join(data_dir or tmp, f"{size}-{backend}")
+                if not os.path.exists(os.path.join(directory, "questions.json")):
+                    print(f"generating {size} questions in {directory}", file=log)
+                    generate(directory, size)
+                for name, size_bytes in memory_benchmarks(directory, backend):
+                    memory.append({'name': name, 'size': size, 'backend': backend, 'bytes': size_bytes})
+                    print(f"{size:>8} {backend:<7} {name:<32} {size_bytes / 1024:10.1f} KiB", file=log)
+                suites = [('core', core_benchmarks)] + ([('gui', gui_benchmarks)] if gui else [])
+                for suite, benchmarks in suites:
+                    try:
+                        for name, times, calls in benchmarks(directory, backend, repeat):
+                            result = {
+                                'suite': suite,
+                                'name': name,
+                                'size': size,
+                                'backend': backend,
+                                'calls': calls,
+                                'seconds': times,
+                                'min': min(times),
+                                'median': statistics.median(times),
+                            }
+                            results.append(result)
+                            print(f"{size:>8} {backend:<7} {name:<32} {result['median'] * 1000:10.2f} ms", file=log)
+                    except RuntimeError as e:
+                        skipped.append({'suite': suite, 'size': size, 'backend': backend, 'reason': str(e)})
+                        print(f"{size:>8} {backend:<7} {suite} benchmarks skipped: {str(e)}", file=log)
+    return {
+        'revision': git_revision(),
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+        'memory': memory,
+        'skipped': skipped,
+    }
+
+
+def compare(report, baseline, threshold):
+    # Prints median ratios against a previous report; returns the regressions
+    previous = {(r['suite'], r['name'], r['size'], r['backend']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['suite'], result['name'], result['size'], result['backend']))
+        if old is None or not old['median']:
+            continue
+        ratio = result['median'] / old['median']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['size']:>8} {result['backend']:<7} {result['name']:<32} "
+              f"{old['median'] * 1000:10.2f} -> {result['median'] * 1000:10.2f} ms  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the interview prep hot paths")
+    parser.add_argument('--sizes', default="1000,10000", help="comma-separated question counts (default: 1000,10000)")
+    parser.add_argument('--backends', default="json,sqlite", help="comma-separated storage backends")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark (default: 3)")
+    parser.add_argument('--data-dir', help="keep generated datasets here and reuse them between runs")
+    parser.add_argument('--no-gui', action='store_true', help="skip the tkinter benchmarks")
+    parser.add_argument('-o', '--output', default='-', help="JSON report file (default: stdout)")
+    parser.add_argument('--compare', help="previous JSON report to compare medians against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="median ratio counted as a regression with --compare (default: 1.2)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = run(sizes, args.backends.split(","), args.repeat, args.data_dir, not args.no_gui)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# Regression tests for the question snapshot: a damaged snapshot must fall
+# back to questions.json rather than load an empty bank.
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amz_core import InterviewPrepCore
+from amz_snapshot import QuestionSnapshot, SnapshotError
+from amz_storage import SNAPSHOTS, open_storage
+
+
+class DamagedSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.snapshot = os.path.join(self.directory, SNAPSHOTS['questions'])
+        core = self.open_core()
+        core.save_question({'question': 'Q1', 'answer': '', 'leadership_principles': [], 'experiences': []})
+        core.close()
+        core = self.open_core()  # loads the JSON and writes the snapshot
+        core.close()
+        self.assertTrue(os.path.exists(self.snapshot))
+
+    def open_core(self):
+        core = InterviewPrepCore(open_storage('json', self.directory))
+        core.load_all()
+        return core
+
+    def truncate(self, size):
+        with open(self.snapshot, "r+b") as f:
+            f.truncate(size)
+
+    def assert_falls_back(self):
+        core = self.open_core()
+        self.assertEqual([q['question'] for q in core.questions], ['Q1'])
+        core.save_question({'question': 'Q2', 'answer': '', 'leadership_principles': [], 'experiences': []})
+        core.close()
+        core = self.open_core()
+        self.assertEqual([q['question'] for q in core.questions], ['Q1', 'Q2'])
+        core.close()
+
+    def test_empty_snapshot(self):
+        self.truncate(0)
+        with self.assertRaises(SnapshotError):
+            QuestionSnapshot(self.snapshot)
+        self.assert_falls_back()
+
+    def test_truncated_snapshot(self):
+        size = os.path.getsize(self.snapshot)
+        for length in (1, 40, 100, size // 2, size - 1):
+            with self.subTest(length=length):
+                shutil.copy(self.snapshot, self.snapshot + ".bak")
+                self.truncate(length)
+                with self.assertRaises(SnapshotError):
+                    QuestionSnapshot(self.snapshot)
+                os.replace(self.snapshot + ".bak", self.snapshot)
+        self.truncate(size // 2)
+        self.assert_falls_back()
+
+
+class NewDirectoryTest(unittest.TestCase):
+    def test_close_without_questions_file(self):
+        # Nothing to compile a snapshot from until the first question is saved
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        core = InterviewPrepCore(open_storage('json', directory))
+        core.load_all()
+        core.close()
+        self.assertFalse(os.path.exists(os.path.join(directory, SNAPSHOTS['questions'])))
+
+
+if __name__ == '__main__':
+    unittest.main()